@@ -4,47 +4,122 @@ Handles all bot interactions via webhook
 @author MVAI
 """
 import os
+import sys
+import ssl
+import html
 import json
-import urllib.request
+import threading
+import http.client
 import urllib.parse
+from functools import cache
 from http.server import BaseHTTPRequestHandler
 
+# Cold start: a new instance imports this module before its first update, so
+# only what every update needs loads here; the registry, the thread pool and
+# the settings backend load on first use
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from whalefollow.render import Keyboard, Screen
+from whalefollow.routes import Router
+from whalefollow.settings import LazyStore
+from whalefollow.watchlists import WATCH_LIMIT, add_watch, parse_address
+
 # Config
 TELEGRAM_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN', '')
-
-# Whale wallets
-TRACKED_WALLETS = [
-    {'address': '0x28C6c06298d514Db089934071355E5743bf21d60', 'label': 'Binance Hot'},
-    {'address': '0x21a31Ee1afC51d94C2eFcCAa2092aD1028285549', 'label': 'Binance Cold'},
-    {'address': '0xDFd5293D8e347dFe59E90eFd55b2956a1343963d', 'label': 'Bitfinex'},
-    {'address': '0x267be1C1D684F78cb4F6a176C4911b741E4Ffdc0', 'label': 'Kraken'},
-    {'address': '0x6cC5F688a315f3dC28A7781717a9A798a59fDA7b', 'label': 'OKX'},
-    {'address': '0x47ac0Fb4F2D84898e4D9E7b4DaB3C24507a6D503', 'label': 'Binance 3'},
-    {'address': '0xF977814e90dA44bFA03b6295A0616a897441aceC', 'label': 'Binance 8'},
-    {'address': '0x8103683202aa8DA10536036EDef04CDd865C225E', 'label': 'Kraken 2'},
-    {'address': '0x2FAF487A4414Fe77e2327F0bf4AE2a264a776AD2', 'label': 'FTX/Alameda'},
-    {'address': '0xBE0eB53F46cd790Cd13851d5EFf43D12404d33E8', 'label': 'Binance 7'},
-]
-
-# User settings (in-memory for MVP)
-user_settings = {}
+TELEGRAM_API_URL = os.environ.get('TELEGRAM_API_URL', 'https://api.telegram.org')
+# Answer updates in the webhook response body instead of a separate API call
+INLINE_REPLIES = os.environ.get('WEBHOOK_INLINE_REPLIES', '1') != '0'
+
+# Whale wallets (shared registry, data/wallets.csv; loaded by the first Top Wallets tap)
+@cache
+def tracked_wallets():
+    from whalefollow.registry import get_registry
+    return [{'address': address, 'label': label} for label, address in get_registry().tracked().items()]
+
+# User settings: SETTINGS_URL must be the store bot.py uses (Redis). Instances
+# share no disk, and /tmp is wiped on every cold start
+SETTINGS_URL = os.environ.get('SETTINGS_URL')
+if not SETTINGS_URL or not SETTINGS_URL.startswith(('redis://', 'rediss://')):
+    print(f"WARNING: SETTINGS_URL is {SETTINGS_URL or 'not set'}: user settings and watchlists are per instance, "
+          f"lost on cold start and not shared with bot.py. Set SETTINGS_URL to the bot's Redis URL.",
+          file=sys.stderr)
+STORE = LazyStore(SETTINGS_URL or 'sqlite:////tmp/whalefollow.db')
 
 def get_user_settings(chat_id):
-    if chat_id not in user_settings:
-        user_settings[chat_id] = {'threshold': 100, 'paused': False}
-    return user_settings[chat_id]
+    settings = STORE.find(chat_id)
+    if settings is None:
+        # Webhook users are subscribed from their first interaction; a chat the
+        # bot already knows keeps its settings (/stop, or alerts off by choice)
+        settings = STORE.update(chat_id, alerts=True)
+    return settings
+
+def update_user_settings(chat_id, **changes):
+    if STORE.find(chat_id) is None:
+        changes = {'alerts': True, **changes}
+    return STORE.update(chat_id, **changes)
+
+# Telegram API (keep-alive pool, lives as long as the warm container)
+class ConnectionPool:
+    """Reusable HTTP(S) connections to one host; saves a TLS handshake per call"""
+
+    def __init__(self, base_url, size=4, timeout=10, ssl_context=None):
+        parts = urllib.parse.urlsplit(base_url)
+        self.https = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port
+        self.size = size
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self.opened = 0
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        self.opened += 1
+        if not self.https:
+            return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        if self.ssl_context is None:
+            self.ssl_context = ssl.create_default_context()
+        return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self.ssl_context)
+
+    def request(self, path, body):
+        """POST a JSON body, returns (status, response bytes)"""
+        for attempt in range(2):
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            reused = conn is not None
+            if conn is None:
+                conn = self._connect()
+            try:
+                conn.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                if reused and attempt == 0:
+                    continue  # idle connection was dropped by the server, retry on a fresh one
+                raise
+            with self._lock:
+                if response.will_close or len(self._idle) >= self.size:
+                    conn.close()
+                else:
+                    self._idle.append(conn)
+            return response.status, data
+
+POOL = ConnectionPool(TELEGRAM_API_URL)
+
+@cache
+def executor():
+    """Thread pool for deferred calls; most updates are answered inline and never start it"""
+    from concurrent.futures import ThreadPoolExecutor
+    return ThreadPoolExecutor(max_workers=4)
 
-# Telegram API
 def telegram_api(method, data):
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/{method}"
-    req = urllib.request.Request(
-        url,
-        data=json.dumps(data).encode('utf-8'),
-        headers={'Content-Type': 'application/json'}
-    )
     try:
-        with urllib.request.urlopen(req, timeout=10) as response:
-            return json.loads(response.read().decode('utf-8'))
+        status, body = POOL.request(f"/bot{TELEGRAM_TOKEN}/{method}", json.dumps(data).encode('utf-8'))
+        result = json.loads(body.decode('utf-8'))
+        if not result.get('ok'):
+            print(f"Telegram API error: {status} {result.get('description')}")
+        return result
     except Exception as e:
         print(f"Telegram API error: {e}")
         return {'ok': False}
@@ -64,86 +139,86 @@ def edit_message(chat_id, message_id, text, reply_markup=None):
 def answer_callback(callback_query_id):
     return telegram_api('answerCallbackQuery', {'callback_query_id': callback_query_id})
 
-# Keyboards
-MAIN_MENU = {
+def run_deferred(calls):
+    """Run (method, data) Bot API calls concurrently and wait for all of them"""
+    for future in [executor().submit(telegram_api, method, data) for method, data in calls]:
+        future.result()
+
+# Keyboards (serialized once; webhook responses embed the cached JSON)
+MAIN_MENU = Keyboard({
     'inline_keyboard': [
         [{'text': '🐋 Live Whale Alerts', 'callback_data': 'live_alerts'}],
         [{'text': '📊 Top Wallets', 'callback_data': 'top_wallets'}],
         [{'text': '💰 Recent Transfers', 'callback_data': 'recent_transfers'}],
         [{'text': '⚙️ Settings', 'callback_data': 'settings'}]
     ]
-}
+})
 
-THRESHOLD_KEYBOARD = {
+THRESHOLD_OPTIONS = (50, 100, 500, 1000)
+
+THRESHOLD_KEYBOARD = Keyboard({
     'inline_keyboard': [
         [{'text': '50 ETH', 'callback_data': 'threshold_50'}, {'text': '100 ETH', 'callback_data': 'threshold_100'}],
         [{'text': '500 ETH', 'callback_data': 'threshold_500'}, {'text': '1000 ETH', 'callback_data': 'threshold_1000'}],
         [{'text': '🔙 Back to Settings', 'callback_data': 'settings'}]
     ]
-}
+})
 
-SETTINGS_KEYBOARD = {
+SETTINGS_KEYBOARD = Keyboard({
     'inline_keyboard': [
         [{'text': '🔔 Alert Threshold', 'callback_data': 'set_threshold'}],
         [{'text': '⏸️ Pause Alerts', 'callback_data': 'pause_alerts'}],
         [{'text': '▶️ Resume Alerts', 'callback_data': 'resume_alerts'}],
         [{'text': '« Terug', 'callback_data': 'back_main'}]
     ]
-}
+})
 
-BACK_KEYBOARD = {
+BACK_KEYBOARD = Keyboard({
     'inline_keyboard': [[{'text': '« Terug naar menu', 'callback_data': 'back_main'}]]
-}
+})
 
-# Handlers
-def handle_start(chat_id, user):
-    settings = get_user_settings(chat_id)
-    first_name = user.get('first_name', '')
-    text = f"""🐋 <b>MVAI Whale Tracker</b>
+# Screens: static ones are rendered here once, per-user ones only fill in their fields
+def status_text(settings):
+    return '✅ Actief' if settings.receives_alerts else '⏸️ Gepauzeerd'
+
+START_SCREEN = Screen("""🐋 <b>MVAI Whale Tracker</b>
 
-Welkom{' ' + first_name if first_name else ''}!
+Welkom{name}!
 
 Deze bot monitort whale wallets op Ethereum en stuurt je alerts bij grote transacties.
 
 <b>Huidige instellingen:</b>
-• Alert threshold: {settings['threshold']} ETH
-• Status: {'⏸️ Gepauzeerd' if settings['paused'] else '✅ Actief'}
+• Alert threshold: {threshold} ETH
+• Status: {status}
 
-Selecteer een optie:"""
-    send_message(chat_id, text, MAIN_MENU)
+Selecteer een optie:""", MAIN_MENU, escape=html.escape)
 
-def handle_top_wallets(chat_id, message_id=None):
+def top_wallets_text():
     text = "📊 <b>Top Whale Wallets</b>\n\n"
-    for i, w in enumerate(TRACKED_WALLETS[:10], 1):
+    wallets = tracked_wallets()
+    for i, w in enumerate(wallets[:10], 1):
         short = w['address'][:6] + '...' + w['address'][-4:]
-        text += f"{i}. <b>{w['label']}</b>\n   <code>{short}</code>\n\n"
-    text += f"\n<i>Totaal {len(TRACKED_WALLETS)} wallets worden gemonitord</i>"
-    
-    if message_id:
-        edit_message(chat_id, message_id, text, BACK_KEYBOARD)
-    else:
-        send_message(chat_id, text, BACK_KEYBOARD)
+        text += f"{i}. <b>{html.escape(w['label'])}</b>\n   <code>{short}</code>\n\n"
+    text += f"\n<i>Totaal {len(wallets)} wallets worden gemonitord</i>"
+    return text.replace('{', '{{').replace('}', '}}')
 
-def handle_live_alerts(chat_id, message_id=None):
-    settings = get_user_settings(chat_id)
-    text = f"""🐋 <b>Live Whale Alerts</b>
+@cache
+def top_wallets_screen():
+    return Screen(top_wallets_text(), BACK_KEYBOARD)
 
-Status: {'⏸️ Gepauzeerd' if settings['paused'] else '✅ Actief'}
-Threshold: {settings['threshold']} ETH
+LIVE_ALERTS_SCREEN = Screen("""🐋 <b>Live Whale Alerts</b>
+
+Status: {status}
+Threshold: {threshold} ETH
 
 Je ontvangt automatisch alerts wanneer:
-• Transacties > {settings['threshold']} ETH plaatsvinden
+• Transacties > {threshold} ETH plaatsvinden
 • Grote deposits naar exchanges
 • Grote withdrawals van exchanges
 
-<i>Alerts worden real-time verstuurd zodra whale bewegingen gedetecteerd worden.</i>"""
-    
-    if message_id:
-        edit_message(chat_id, message_id, text, BACK_KEYBOARD)
-    else:
-        send_message(chat_id, text, BACK_KEYBOARD)
+<i>Alerts worden real-time verstuurd zodra whale bewegingen gedetecteerd worden.</i>""", BACK_KEYBOARD)
 
-def handle_recent_transfers(chat_id, message_id=None):
+def recent_transfers_text():
     transfers = [
         {'from': 'Binance Hot', 'to': 'Unknown', 'amount': 2450, 'time': '2 min geleden', 'emoji': '🔴'},
         {'from': 'Unknown', 'to': 'Kraken', 'amount': 1890, 'time': '8 min geleden', 'emoji': '🔴'},
@@ -158,73 +233,46 @@ def handle_recent_transfers(chat_id, message_id=None):
         text += f"   {tx['from']} → {tx['to']}\n"
         text += f"   <i>{tx['time']}</i>\n\n"
     text += "🟢 = Withdrawal (bullish)\n🔴 = Deposit (bearish)"
-    
-    if message_id:
-        edit_message(chat_id, message_id, text, BACK_KEYBOARD)
-    else:
-        send_message(chat_id, text, BACK_KEYBOARD)
+    return text
 
-def handle_settings(chat_id, message_id=None):
-    settings = get_user_settings(chat_id)
-    text = f"""⚙️ <b>Instellingen</b>
+RECENT_TRANSFERS_SCREEN = Screen(recent_transfers_text(), BACK_KEYBOARD)
+
+SETTINGS_SCREEN = Screen("""⚙️ <b>Instellingen</b>
 
 <b>Huidige configuratie:</b>
-• Alert threshold: {settings['threshold']} ETH
-• Status: {'⏸️ Gepauzeerd' if settings['paused'] else '✅ Actief'}
+• Alert threshold: {threshold} ETH
+• Status: {status}
 
-Selecteer wat je wilt aanpassen:"""
-    
-    if message_id:
-        edit_message(chat_id, message_id, text, SETTINGS_KEYBOARD)
-    else:
-        send_message(chat_id, text, SETTINGS_KEYBOARD)
+Selecteer wat je wilt aanpassen:""", SETTINGS_KEYBOARD)
 
-def handle_set_threshold(chat_id, message_id):
-    settings = get_user_settings(chat_id)
-    text = f"""🔔 <b>Alert Threshold</b>
+SET_THRESHOLD_SCREEN = Screen("""🔔 <b>Alert Threshold</b>
 
-Huidige threshold: <b>{settings['threshold']} ETH</b>
+Huidige threshold: <b>{threshold} ETH</b>
 
 Je ontvangt alleen alerts voor transacties boven dit bedrag.
 
-Selecteer nieuwe threshold:"""
-    edit_message(chat_id, message_id, text, THRESHOLD_KEYBOARD)
+Selecteer nieuwe threshold:""", THRESHOLD_KEYBOARD)
 
-def handle_threshold_change(chat_id, message_id, new_threshold):
-    settings = get_user_settings(chat_id)
-    settings['threshold'] = new_threshold
-    text = f"""✅ <b>Threshold aangepast!</b>
+THRESHOLD_CHANGED_SCREEN = Screen("""✅ <b>Threshold aangepast!</b>
 
-Nieuwe threshold: <b>{new_threshold} ETH</b>
+Nieuwe threshold: <b>{threshold} ETH</b>
 
-Je ontvangt nu alleen alerts voor transacties boven {new_threshold} ETH."""
-    edit_message(chat_id, message_id, text, BACK_KEYBOARD)
+Je ontvangt nu alleen alerts voor transacties boven {threshold} ETH.""", BACK_KEYBOARD)
 
-def handle_pause(chat_id, message_id):
-    settings = get_user_settings(chat_id)
-    settings['paused'] = True
-    text = "⏸️ <b>Alerts gepauzeerd</b>\n\nJe ontvangt tijdelijk geen whale alerts."
-    edit_message(chat_id, message_id, text, BACK_KEYBOARD)
+PAUSED_SCREEN = Screen("⏸️ <b>Alerts gepauzeerd</b>\n\nJe ontvangt tijdelijk geen whale alerts.", BACK_KEYBOARD)
 
-def handle_resume(chat_id, message_id):
-    settings = get_user_settings(chat_id)
-    settings['paused'] = False
-    text = f"▶️ <b>Alerts hervat!</b>\n\nJe ontvangt weer whale alerts voor transacties boven {settings['threshold']} ETH."
-    edit_message(chat_id, message_id, text, BACK_KEYBOARD)
+RESUMED_SCREEN = Screen(
+    "▶️ <b>Alerts hervat!</b>\n\nJe ontvangt weer whale alerts voor transacties boven {threshold} ETH.", BACK_KEYBOARD)
 
-def handle_main_menu(chat_id, message_id):
-    settings = get_user_settings(chat_id)
-    text = f"""🐋 <b>MVAI Whale Tracker</b>
+MAIN_MENU_SCREEN = Screen("""🐋 <b>MVAI Whale Tracker</b>
 
 <b>Status:</b>
-• Threshold: {settings['threshold']} ETH
-• Alerts: {'⏸️ Gepauzeerd' if settings['paused'] else '✅ Actief'}
+• Threshold: {threshold} ETH
+• Alerts: {status}
 
-Selecteer een optie:"""
-    edit_message(chat_id, message_id, text, MAIN_MENU)
+Selecteer een optie:""", MAIN_MENU)
 
-def handle_info(chat_id):
-    text = """🐋 <b>WhaleFollow Pro v1.0</b>
+INFO_SCREEN = Screen("""🐋 <b>WhaleFollow Pro v1.0</b>
 
 Real-time whale tracking voor crypto traders.
 
@@ -233,43 +281,125 @@ Real-time whale tracking voor crypto traders.
 • Exchange flow monitoring
 • Sentiment analysis
 • Customizable thresholds
+• Eigen watchlist: /watch &lt;adres&gt;
 
 <b>Support:</b> @mindvaultai
-<b>Website:</b> mindvault-ai.com"""
-    send_message(chat_id, text, MAIN_MENU)
+<b>Website:</b> mindvault-ai.com""", MAIN_MENU)
+
+# Per-user text (watchlists), already HTML
+WATCH_SCREEN = Screen("{text}", BACK_KEYBOARD)
+
+# Handlers
+def handle_start(chat_id, user):
+    settings = get_user_settings(chat_id)
+    first_name = user.get('first_name', '')
+    return START_SCREEN.reply(chat_id, name=' ' + first_name if first_name else '', threshold=settings.threshold,
+                              status=status_text(settings))
+
+def handle_top_wallets(chat_id, message_id=None):
+    return top_wallets_screen().reply(chat_id, message_id)
+
+def handle_live_alerts(chat_id, message_id=None):
+    settings = get_user_settings(chat_id)
+    return LIVE_ALERTS_SCREEN.reply(chat_id, message_id, threshold=settings.threshold, status=status_text(settings))
+
+def handle_recent_transfers(chat_id, message_id=None):
+    return RECENT_TRANSFERS_SCREEN.reply(chat_id, message_id)
+
+def handle_settings(chat_id, message_id=None):
+    settings = get_user_settings(chat_id)
+    return SETTINGS_SCREEN.reply(chat_id, message_id, threshold=settings.threshold, status=status_text(settings))
+
+def handle_set_threshold(chat_id, message_id):
+    settings = get_user_settings(chat_id)
+    return SET_THRESHOLD_SCREEN.reply(chat_id, message_id, threshold=settings.threshold)
+
+def handle_threshold_change(chat_id, message_id, new_threshold):
+    update_user_settings(chat_id, threshold=new_threshold)
+    return THRESHOLD_CHANGED_SCREEN.reply(chat_id, message_id, threshold=new_threshold)
+
+def handle_pause(chat_id, message_id):
+    update_user_settings(chat_id, paused=True)
+    return PAUSED_SCREEN.reply(chat_id, message_id)
+
+def handle_resume(chat_id, message_id):
+    settings = update_user_settings(chat_id, alerts=True, paused=False)  # an explicit opt-in
+    return RESUMED_SCREEN.reply(chat_id, message_id, threshold=settings.threshold)
+
+def handle_main_menu(chat_id, message_id):
+    settings = get_user_settings(chat_id)
+    return MAIN_MENU_SCREEN.reply(chat_id, message_id, threshold=settings.threshold, status=status_text(settings))
+
+def handle_info(chat_id):
+    return INFO_SCREEN.reply(chat_id)
+
+def watchlist_text(chat_id):
+    watched = STORE.watches(chat_id)
+    if not watched:
+        return "👁 <b>Jouw watchlist</b>\n\nLeeg. Voeg een adres toe met /watch &lt;adres&gt;"
+    text = f"👁 <b>Jouw watchlist</b> ({len(watched)}/{WATCH_LIMIT})\n\n"
+    text += ''.join(f"• {chain.title()}: <code>{address}</code>\n" for _, chain, address in watched)
+    return text + "\n/watch &lt;adres&gt; om toe te voegen, /unwatch &lt;adres&gt; of /unwatch all om te verwijderen"
+
+def handle_watch(chat_id, arg):
+    # Stored in the shared store; bot.py starts polling it at its next reload (ALERT_RELOAD)
+    if not arg:
+        return WATCH_SCREEN.reply(chat_id, text=watchlist_text(chat_id))
+    status, chain, address = add_watch(STORE, chat_id, arg)
+    if status == 'added':
+        text = (f"👁 <b>Adres toegevoegd</b>\n\n<code>{address}</code> ({chain.title()})\n\n"
+                "Je ontvangt een alert bij elke transactie.")
+    elif status == 'exists':
+        text = f"<code>{address}</code> staat al op je watchlist."
+    elif status == 'limit':
+        text = f"Je watchlist is vol ({WATCH_LIMIT} adressen). Verwijder eerst een adres met /unwatch."
+    else:
+        text = "Dat is geen Ethereum (0x...) of Solana adres.\n\nGebruik: /watch &lt;adres&gt;"
+    return WATCH_SCREEN.reply(chat_id, text=text)
+
+def handle_unwatch(chat_id, arg):
+    if not arg:
+        return WATCH_SCREEN.reply(chat_id, text=watchlist_text(chat_id))
+    if arg.lower() == 'all':
+        text = f"🛑 {STORE.unwatch(chat_id)} adres(sen) van je watchlist verwijderd."
+    elif (parsed := parse_address(arg)) is None:
+        text = "Dat is geen Ethereum (0x...) of Solana adres.\n\nGebruik: /unwatch &lt;adres&gt; of /unwatch all"
+    elif STORE.unwatch(chat_id, *parsed):
+        text = f"🛑 <code>{parsed[1]}</code> verwijderd van je watchlist."
+    else:
+        text = f"<code>{parsed[1]}</code> staat niet op je watchlist."
+    return WATCH_SCREEN.reply(chat_id, text=text)
 
 # Callback router
-def handle_callback(callback_query):
+def handle_callback(callback_query, deferred):
     chat_id = callback_query['message']['chat']['id']
     message_id = callback_query['message']['message_id']
     data = callback_query['data']
     
-    answer_callback(callback_query['id'])
-    
-    if data == 'live_alerts':
-        handle_live_alerts(chat_id, message_id)
-    elif data == 'top_wallets':
-        handle_top_wallets(chat_id, message_id)
-    elif data == 'recent_transfers':
-        handle_recent_transfers(chat_id, message_id)
-    elif data == 'settings':
-        handle_settings(chat_id, message_id)
-    elif data == 'set_threshold':
-        handle_set_threshold(chat_id, message_id)
-    elif data == 'threshold_50':
-        handle_threshold_change(chat_id, message_id, 50)
-    elif data == 'threshold_100':
-        handle_threshold_change(chat_id, message_id, 100)
-    elif data == 'threshold_500':
-        handle_threshold_change(chat_id, message_id, 500)
-    elif data == 'threshold_1000':
-        handle_threshold_change(chat_id, message_id, 1000)
-    elif data == 'pause_alerts':
-        handle_pause(chat_id, message_id)
-    elif data == 'resume_alerts':
-        handle_resume(chat_id, message_id)
-    elif data == 'back_main':
-        handle_main_menu(chat_id, message_id)
+    # The edit rides on the webhook response; the answer goes out after it
+    deferred.append(('answerCallbackQuery', {'callback_query_id': callback_query['id']}))
+    return route_callback(chat_id, message_id, data)
+
+def threshold_option(value):
+    """'threshold_<n>' callback parameter; only the keyboard's options are accepted"""
+    threshold = int(value)
+    if threshold not in THRESHOLD_OPTIONS:
+        raise ValueError(value)
+    return threshold
+
+ROUTES = Router()
+ROUTES.add('live_alerts', handle_live_alerts)
+ROUTES.add('top_wallets', handle_top_wallets)
+ROUTES.add('recent_transfers', handle_recent_transfers)
+ROUTES.add('settings', handle_settings)
+ROUTES.add('set_threshold', handle_set_threshold)
+ROUTES.add('threshold_<n>', handle_threshold_change, convert=threshold_option)
+ROUTES.add('pause_alerts', handle_pause)
+ROUTES.add('resume_alerts', handle_resume)
+ROUTES.add('back_main', handle_main_menu)
+
+def route_callback(chat_id, message_id, data):
+    return ROUTES.dispatch(data, chat_id, message_id)
 
 # Message router
 def handle_message(message):
@@ -278,34 +408,65 @@ def handle_message(message):
     user = message.get('from', {})
     
     if text.startswith('/start'):
-        handle_start(chat_id, user)
+        return handle_start(chat_id, user)
     elif text.startswith('/wallets'):
-        handle_top_wallets(chat_id)
+        return handle_top_wallets(chat_id)
     elif text.startswith('/info') or text.startswith('/help'):
-        handle_info(chat_id)
+        return handle_info(chat_id)
+    elif text.startswith(('/watch', '/unwatch')):
+        command, _, arg = text.partition(' ')
+        handle = handle_unwatch if command.startswith('/unwatch') else handle_watch
+        return handle(chat_id, arg.strip())
+
+def handle_update(update):
+    """Returns (payload for the webhook response or None, [(method, data)] to call afterwards)"""
+    deferred = []
+    payload = None
+    if 'callback_query' in update:
+        payload = handle_callback(update['callback_query'], deferred)
+    elif 'message' in update:
+        payload = handle_message(update['message'])
+    
+    if payload and not INLINE_REPLIES:
+        payload = dict(payload)
+        deferred.insert(0, (payload.pop('method'), payload))
+        payload = None
+    return payload, deferred
 
 # Vercel handler
 class handler(BaseHTTPRequestHandler):
     def do_POST(self):
+        deferred = []
         try:
             content_length = int(self.headers.get('Content-Length', 0))
             body = json.loads(self.rfile.read(content_length).decode('utf-8'))
             
-            if 'callback_query' in body:
-                handle_callback(body['callback_query'])
-            elif 'message' in body:
-                handle_message(body['message'])
+            payload, deferred = handle_update(body)
             
             self.send_response(200)
-            self.send_header('Content-Type', 'text/plain')
-            self.end_headers()
-            self.wfile.write(b'OK')
+            if payload:
+                # Telegram executes one method call returned in the webhook response
+                response = payload.body
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+            else:
+                self.send_header('Content-Type', 'text/plain')
+                self.end_headers()
+                self.wfile.write(b'OK')
         except Exception as e:
             print(f"Webhook error: {e}")
             self.send_response(200)
             self.send_header('Content-Type', 'text/plain')
             self.end_headers()
             self.wfile.write(b'Error handled')
+        
+        self.wfile.flush()
+        if deferred:
+            run_deferred(deferred)
+        # Write-behind buffer must be persisted before the container may freeze
+        STORE.flush()
     
     def do_GET(self):
         self.send_response(200)
@@ -0,0 +1,4 @@
+"""
+WhaleFollow Pro - benchmarks
+Run from the repo root: python -m bench.<name>
+"""
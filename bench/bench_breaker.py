@@ -0,0 +1,111 @@
+"""
+Benchmark: Etherscan outages and rate limits, with and without the circuit breaker
+- Outage: a TransferStream polls a mock Etherscan that goes down (hangs,
+  or answers 503) for --outage seconds mid-run. Requests sent to the dead
+  API, time each poll blocks, what the Recent Transfers view reports
+  meanwhile, and how long after recovery new transfers flow again
+- Rate limit: the mock allows --quota calls/s per key while the client is
+  configured for more (a shared or downgraded key). A fixed budget vs the
+  adaptive one vs a pool of --keys keys: transfers fetched per second and
+  the share of calls answered "Max rate limit reached"
+
+    python -m bench.bench_breaker [--wallets 40] [--outage 8] [--mode hang] [--quota 4] [--keys 2]
+"""
+
+import argparse
+import asyncio
+import time
+
+from bench.mock_servers import MockEtherscan, make_address
+from whalefollow.breaker import CircuitBreaker
+from whalefollow.chains import EthereumAdapter, TransferStream
+from whalefollow.etherscan import KeyPool, RateLimiter, fetch_wallets
+
+
+async def outage(with_breaker, args):
+    wallets = {f'Whale {i}': make_address(i) for i in range(1, args.wallets + 1)}
+    breaker = CircuitBreaker('etherscan', failures=5, reset=args.reset) if with_breaker else None
+    async with MockEtherscan(latency=0.01, history=5) as server:
+        adapter = EthereumAdapter(wallets, 'KEY', url=server.api_url, limiter=RateLimiter(500), breaker=breaker,
+                                  interval=args.interval, deadline=args.deadline)
+        stream = TransferStream([adapter])
+        reader = stream.subscribe(timeout=0.05)
+        stream.start()
+        await stream.ready(timeout=5)
+        await asyncio.sleep(args.interval)
+
+        server.outage = args.mode
+        down, before, polls = time.monotonic(), server.requests, adapter.polls
+        blocked = 0.0
+        while time.monotonic() - down < args.outage:
+            server.advance()  # mined while down: delivered once it is back
+            await reader.poll()
+            blocked = max(blocked, adapter.last_duration)
+            await asyncio.sleep(args.interval)
+        sent = server.requests - before
+        view = stream.unavailable().get('ethereum')
+
+        server.outage = None
+        up = time.monotonic()
+        recovered = None
+        while recovered is None and time.monotonic() - up < args.reset * 8 + 10:
+            server.advance()
+            if await reader.poll():
+                recovered = time.monotonic() - up
+        await stream.stop()
+
+    name = 'breaker' if with_breaker else 'no breaker'
+    age = f"marked 'data from {view[1]:.0f}s ago'" if view and view[1] is not None else 'not marked'
+    back = f"{recovered:.1f}s" if recovered is not None else 'never'
+    print(f"  {name:<11} {sent:>5,} requests to the dead API ({sent / args.outage:,.1f}/s), "
+          f"{adapter.polls - polls} polls 'completed', slowest poll {blocked:.2f}s; view {age}; "
+          f"transfers again {back} after recovery")
+    if breaker is not None:
+        print(f"              circuit: {breaker.stats()}")
+
+
+async def rate_limited(label, limiter, args):
+    wallets = {f'Whale {i}': make_address(i) for i in range(1, args.wallets + 1)}
+    async with MockEtherscan(latency=0.01, history=5, quota=args.quota) as server:
+        import httpx
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            rows = 0  # rows fetched, repeats included: the budget's useful work
+            start = time.monotonic()
+            while time.monotonic() - start < args.seconds:
+                rows += len(await fetch_wallets(client, wallets, 'KEY', limiter=limiter, url=server.api_url,
+                                                deadline=60, concurrency=4))
+            elapsed = time.monotonic() - start
+        limited = server.limited / max(server.requests, 1)
+    pacing = limiter.stats()
+    rate = pacing['rate'] if 'rate' in pacing else sum(s['rate'] for s in pacing.values())
+    print(f"  {label:<22} {rows / elapsed:6.1f} rows/s, {server.requests / elapsed:5.1f} calls/s, "
+          f"{limited:4.0%} rate limited; pacing settled at {rate:.1f} calls/s")
+
+
+async def main(args):
+    print(f"Outage: {args.wallets} wallets, Etherscan {args.mode} for {args.outage:g}s, poll every "
+          f"{args.interval:g}s, deadline {args.deadline:g}s")
+    await outage(False, args)
+    await outage(True, args)
+
+    print(f"\nRate limit: {args.quota} calls/s per key allowed, client configured for {args.rps:g}/s, "
+          f"{args.seconds:g}s each")
+    await rate_limited('fixed budget', RateLimiter(args.rps), args)
+    await rate_limited('adaptive, 1 key', RateLimiter(args.rps, floor=0.5), args)
+    keys = [f'KEY{i}' for i in range(args.keys)]
+    await rate_limited(f'adaptive, {args.keys} keys', KeyPool(keys, rate=args.rps, floor=0.5), args)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--wallets', type=int, default=40)
+    parser.add_argument('--outage', type=float, default=8.0)
+    parser.add_argument('--mode', choices=('hang', 'error'), default='hang')
+    parser.add_argument('--interval', type=float, default=0.5)
+    parser.add_argument('--deadline', type=float, default=1.0)
+    parser.add_argument('--reset', type=float, default=2.0, help='breaker cooldown before the first probe')
+    parser.add_argument('--quota', type=int, default=4)
+    parser.add_argument('--rps', type=float, default=10)
+    parser.add_argument('--keys', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=8.0)
+    asyncio.run(main(parser.parse_args()))
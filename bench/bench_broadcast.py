@@ -0,0 +1,257 @@
+"""
+Benchmark: bulk broadcast to 500k chats (dry run), naive loop vs whalefollow.broadcast
+- Recipients: a SQLite settings store of --users chats (a share with alerts
+  off, some group chats with negative ids)
+- Dry run: sends go to an in-process fake Telegram that parses each body
+  and counts messages per chat; no sockets, so the pipeline's own cost shows
+- Both go through the send queue, as every bot send does. Naive: every
+  chat id loaded into a list, a payload dict json.dumps'd per send.
+  Broadcast: recipients streamed in batches, the body pre-rendered once
+  (render.Screen), --shards shards
+- Memory held for the recipient list, ETA accuracy (predicted vs actual
+  finish at 10% / 25% / 50%), and a crash mid-run: the shards are killed
+  at --crash and restarted from their checkpoints; messages sent twice and
+  chats missed are counted, also for a clean stop()
+- Wire check: --http chats through the fake Telegram HTTP server at a
+  flood limit of --rate msg/s
+
+    python -m bench.bench_broadcast [--users 500000] [--shards 4] [--crash 0.5] [--http 2000] [--rate 200]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+import httpx
+
+from bench.mock_servers import FakeTelegram
+from whalefollow.broadcast import EVERYONE, FIRST, Broadcast, combine, unfinished
+from whalefollow.render import Screen
+from whalefollow.sendqueue import BROADCAST, RetryAfter, SendQueue
+from whalefollow.settings import SQLiteStore
+
+TEXT = ("📣 *WhaleFollow Pro update*\n\nExchange flow alerts are live: /start → Exchange Flows.\n\n"
+        "_Thanks for following the whales with us._")
+
+
+class DryTelegram:
+    """In-process Bot API stand-in: parses the body like the server would, counts per chat"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.chats = Counter()
+
+    async def send(self, body):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.chats[json.loads(body)['chat_id']] += 1
+
+    def check(self, expected):
+        duplicates = sum(count - 1 for count in self.chats.values() if count > 1)
+        missed = len(expected - self.chats.keys())
+        return duplicates, missed
+
+
+def fill(store, users):
+    for i in range(users):
+        chat_id = -(1_000_000_000 + i) if i % 50 == 0 else 100_000_000 + i  # 2% group chats
+        store.update(chat_id, alerts=i % 5 != 0)
+    store.flush()
+
+
+def recipients(store):
+    return {chat_id for batch in store.iter_batches(5000, FIRST) for chat_id, _ in batch}
+
+
+def held(source):
+    """Peak bytes allocated while consuming `source`"""
+    tracemalloc.start()
+    for _ in source():
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+async def naive(store, telegram, window):
+    chat_ids = [chat_id for batch in store.iter_batches(5000, FIRST) for chat_id, _ in batch]
+    queue = SendQueue(rate=1e9, burst=window, concurrency=window)
+    slots = asyncio.Semaphore(window)
+
+    async def one(chat_id):
+        try:
+            payload = {'chat_id': chat_id, 'text': TEXT, 'parse_mode': 'Markdown'}
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            await queue.send(lambda: telegram.send(body), chat_id=chat_id, priority=BROADCAST)
+        finally:
+            slots.release()
+
+    tasks = set()
+    for chat_id in chat_ids:
+        await slots.acquire()
+        task = asyncio.create_task(one(chat_id))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    await asyncio.gather(*tasks)
+    await queue.stop()
+
+
+def dry_sender(telegram, queue):
+    screen = Screen(TEXT, parse_mode='Markdown')  # rendered once; a send only adds the chat id
+
+    async def send(chat_id, text):
+        body = screen.reply(chat_id).body
+        await queue.send(lambda: telegram.send(body), chat_id=chat_id, priority=BROADCAST)
+
+    return send
+
+
+def jobs(store, send, args, name='announce', **kwargs):
+    return [Broadcast(store, send, name, TEXT, audience=EVERYONE, shard=shard, shards=args.shards,
+                      window=args.window, checkpoint_every=args.checkpoint, **kwargs)
+            for shard in range(args.shards)]
+
+
+async def watch_eta(shards, marks):
+    """{mark: predicted finish time} sampled as progress passes each mark"""
+    loop = asyncio.get_running_loop()
+    predicted = {}
+    while not all(job.done for job in shards):
+        progress = combine(job.progress() for job in shards)
+        share = (progress['sent'] + progress['failed']) / progress['total'] if progress['total'] else 0.0
+        for mark in marks:
+            if mark not in predicted and share >= mark and progress['eta'] is not None:
+                predicted[mark] = loop.time() + progress['eta']
+        await asyncio.sleep(0.05)
+    return predicted
+
+
+async def streamed(store, args, crash=None, clean=False):
+    telegram = DryTelegram(args.latency)
+    queue = SendQueue(rate=1e9, burst=args.window, concurrency=args.window)
+    send = dry_sender(telegram, queue)
+    loop = asyncio.get_running_loop()
+    shards = jobs(store, send, args)
+    start = loop.time()
+    running = [asyncio.create_task(job.run()) for job in shards]
+    eta = asyncio.create_task(watch_eta(shards, (0.1, 0.25, 0.5)))
+    restarted = None
+    if crash is not None:
+        while any(job.total is None for job in shards) or \
+                sum(job.sent for job in shards) < crash * sum(job.total for job in shards):
+            await asyncio.sleep(0.01)
+        if clean:
+            for job in shards:
+                job.stop()
+            await asyncio.gather(*running)
+        else:
+            for task in running:
+                task.cancel()  # killed: no final checkpoint
+            await asyncio.gather(*running, return_exceptions=True)
+            await asyncio.sleep(0.05)  # sends already handed to Telegram still land
+        eta.cancel()
+        restarted = sum(job.sent for job in shards)
+        states = unfinished(store)['announce']
+        shards = [Broadcast.resume(store, send, state, window=args.window, checkpoint_every=args.checkpoint)
+                  for state in states.values()]
+        running = [asyncio.create_task(job.run()) for job in shards]
+    await asyncio.gather(*running)
+    elapsed = loop.time() - start
+    predicted = {} if crash is not None else await eta
+    await queue.stop()
+    return telegram, elapsed, {mark: at - start for mark, at in predicted.items()}, restarted
+
+
+async def http(args):
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteStore(os.path.join(directory, 'http.db'))
+        fill(store, args.http)
+        async with FakeTelegram(flood_limit=args.rate) as server, httpx.AsyncClient(timeout=10.0) as client:
+            url = f"{server.api_url}TEST/sendMessage"
+            screen = Screen(TEXT, parse_mode='Markdown')
+            queue = SendQueue(rate=args.rate)
+
+            async def post(body):
+                response = await client.post(url, content=body, headers={'Content-Type': 'application/json'})
+                if response.status_code == 429:
+                    raise RetryAfter(response.json()['parameters']['retry_after'])
+                response.raise_for_status()
+
+            async def send(chat_id, text):
+                body = screen.reply(chat_id).body
+                await queue.send(lambda: post(body), chat_id=chat_id, priority=BROADCAST)
+
+            job = Broadcast(store, send, 'wire', TEXT, window=args.window, checkpoint_every=args.checkpoint)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            predicted = asyncio.create_task(watch_eta([job], (0.25,)))
+            await job.run()
+            elapsed = loop.time() - start
+            at = (await predicted).get(0.25)
+            await queue.stop()
+        store.close()
+    predicted = f", ETA at 25% said {at - start:.1f}s" if at is not None else ''
+    print(f"  {job.sent:,} sent in {elapsed:.1f}s ({job.sent / elapsed:,.0f} msg/s, limit {args.rate:g}), "
+          f"{server.rejected} x 429, {server.calls['sendMessage'] - job.sent} extra calls{predicted}")
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteStore(os.path.join(directory, 'settings.db'))
+        start = time.perf_counter()
+        fill(store, args.users)
+        expected = recipients(store)
+        print(f"{len(expected):,} chats in SQLite (filled in {time.perf_counter() - start:.1f}s), "
+              f"{args.shards} shards, window {args.window}, checkpoint every {args.checkpoint:g}s")
+
+        print("\nRecipients held in memory")
+        loaded = held(lambda: [[chat_id for batch in store.iter_batches(5000, FIRST) for chat_id, _ in batch]])
+        batched = held(lambda: store.iter_batches(1000, FIRST))
+        print(f"  naive list of every chat   {loaded / 2**20:7.1f} MiB")
+        print(f"  streamed, 1000 per batch   {batched / 2**20:7.1f} MiB")
+
+        print("\nDry run (in-process fake Telegram)")
+        telegram = DryTelegram(args.latency)
+        start = time.perf_counter()
+        await naive(store, telegram, args.window)
+        elapsed = time.perf_counter() - start
+        print(f"  naive      {elapsed:6.1f}s  {len(expected) / elapsed:9,.0f} msg/s, "
+              f"dup/missed {telegram.check(expected)}")
+        telegram, elapsed, predicted, _ = await streamed(store, args)
+        print(f"  broadcast  {elapsed:6.1f}s  {len(expected) / elapsed:9,.0f} msg/s, "
+              f"dup/missed {telegram.check(expected)}")
+        accuracy = ', '.join(f"at {mark:.0%}: {at:.1f}s ({(at - elapsed) / elapsed:+.0%})"
+                             for mark, at in sorted(predicted.items()))
+        print(f"  predicted finish  {accuracy}")
+
+        print(f"\nCrash at {args.crash:.0%}, restart from the checkpoints")
+        for clean in (False, True):
+            telegram, elapsed, _, restarted = await streamed(store, args, crash=args.crash, clean=clean)
+            duplicates, missed = telegram.check(expected)
+            label = 'stop() and resume' if clean else 'killed and resumed'
+            print(f"  {label:<19} {elapsed:5.1f}s, restarted after {restarted:,} sends: "
+                  f"{duplicates:,} sent twice, {missed:,} missed")
+        store.close()
+
+    print(f"\nWire check: {args.http:,} chats, fake Telegram HTTP server limited to {args.rate:g} msg/s")
+    await http(args)
+    hours = len(expected) / 30 / 3600
+    print(f"\nAt Telegram's ~30 msg/s per bot, {len(expected):,} chats take {hours:.1f}h whatever the pipeline")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=500_000)
+    parser.add_argument('--shards', type=int, default=4)
+    parser.add_argument('--window', type=int, default=64)
+    parser.add_argument('--checkpoint', type=float, default=1.0)
+    parser.add_argument('--crash', type=float, default=0.5, help='share of the sends done when the shards die')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds per dry-run send')
+    parser.add_argument('--http', type=int, default=2000)
+    parser.add_argument('--rate', type=float, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,98 @@
+"""
+Benchmark: per-chain delivery latency with a slow chain next to a fast one
+- Mock Etherscan (slow) and mock Helius/Solscan (fast) on localhost
+- Serial: one loop polls Ethereum, then Solana (a single poller)
+- Stream: TransferStream, one task, budget and pool per chain
+- Latency = mined in the mock -> received by the stream reader
+
+    python -m bench.bench_chains [--eth-latency 2.0] [--sol-latency 0.05] [--rounds 6] [--source helius]
+"""
+
+import argparse
+import asyncio
+import time
+
+from bench.mock_servers import MockEtherscan, MockSolana, make_address, make_sol_address
+from whalefollow.chains import EthereumAdapter, SolanaAdapter, TransferStream
+from whalefollow.etherscan import RateLimiter
+
+
+def pct(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(p * len(samples)))] if samples else 0.0
+
+
+def adapters(eth, sol, args):
+    eth_wallets = {f'ETH {i}': make_address(i) for i in range(1, args.wallets + 1)}
+    sol_wallets = {f'SOL {i}': make_sol_address(i) for i in range(1, args.wallets + 1)}
+    keys = {'helius_key': 'KEY'} if args.source == 'helius' else {'solscan_key': 'KEY'}
+    return [
+        EthereumAdapter(eth_wallets, 'KEY', url=eth.api_url, limiter=RateLimiter(50), interval=args.interval,
+                        deadline=args.eth_latency * 3),
+        SolanaAdapter(sol_wallets, url=sol.url, rate=50, interval=args.interval, **keys),
+    ]
+
+
+async def serial(stream, reader, stop):
+    """Both chains polled in turn by one loop: the fast chain waits for the slow one"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        for adapter in stream.adapters.values():
+            reader.push(await adapter.poll())
+        await asyncio.sleep(max(0.0, stream.adapters['ethereum'].interval - (loop.time() - started)))
+
+
+async def run(mode, args):
+    async with MockEtherscan(latency=args.eth_latency) as eth, MockSolana(latency=args.sol_latency) as sol:
+        stream = TransferStream(adapters(eth, sol, args))
+        reader = stream.subscribe(timeout=0.1)
+        latency = {'ethereum': [], 'solana': []}
+        stop = asyncio.Event()
+
+        async def consume():
+            while not stop.is_set():
+                for _, _, tx in await reader.poll():
+                    mined = (eth.mined if tx.chain == 'ethereum' else sol.mined).get(tx.hash)
+                    if mined is not None:
+                        latency[tx.chain].append(time.monotonic() - mined)
+
+        consumer = asyncio.create_task(consume())
+        if mode == 'serial':
+            poller = asyncio.create_task(serial(stream, reader, stop))
+        else:
+            stream.start()
+        await stream.ready(timeout=args.eth_latency * 4)  # first polls only seed the cursors
+        for _ in range(args.rounds):
+            eth.advance()
+            sol.advance()
+            await asyncio.sleep(args.interval)
+        await asyncio.sleep(args.eth_latency + args.interval)
+        stop.set()
+        if mode == 'serial':
+            await poller
+        await consumer
+        await stream.stop()
+
+    print(f"{mode:<7}", end='')
+    for chain, samples in latency.items():
+        print(f"  {chain} p50 {pct(samples, .5):5.2f}s max {max(samples, default=0):5.2f}s ({len(samples)})", end='')
+    print()
+
+
+async def main(args):
+    print(f"{args.wallets} wallets per chain, Etherscan {args.eth_latency:g}s/request, "
+          f"{args.source} {args.sol_latency:g}s/request, poll every {args.interval:g}s\n")
+    await run('serial', args)
+    await run('stream', args)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--wallets', type=int, default=5)
+    parser.add_argument('--eth-latency', type=float, default=2.0)
+    parser.add_argument('--sol-latency', type=float, default=0.05)
+    parser.add_argument('--interval', type=float, default=1.0)
+    parser.add_argument('--rounds', type=int, default=6)
+    parser.add_argument('--source', choices=['helius', 'solscan'], default='helius')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,132 @@
+"""
+Benchmark: api/webhook.py cold start, as a fresh serverless instance sees it
+- Import: `python -X importtime` of the webhook module in a new interpreter;
+  total, the bare interpreter's share, and the slowest imports it pulls in
+- First response: a new process imports the module, serves one webhook
+  POST on its http.server handler (as the Vercel runtime does) and exits;
+  wall time from spawn to response, for a /start message (settings read,
+  reply inline) and a menu callback
+- Medians over --runs; with --budget, exits 1 when the /start first
+  response median is over that many milliseconds (for CI)
+
+    python -m bench.bench_coldstart [--runs 15] [--top 12] [--budget 150]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVE = """
+import sys
+sys.path.insert(0, {root!r})
+from http.server import HTTPServer
+from api import webhook
+server = HTTPServer(('127.0.0.1', 0), webhook.handler)
+print(server.server_port, flush=True)
+server.handle_request()
+"""
+
+UPDATES = {
+    '/start': {'update_id': 1, 'message': {'message_id': 1, 'chat': {'id': 42}, 'from': {'first_name': 'Ann'},
+                                           'text': '/start'}},
+    'callback': {'update_id': 2, 'callback_query': {'id': '7', 'data': 'top_wallets',
+                                                    'message': {'message_id': 1, 'chat': {'id': 42}}}},
+}
+
+
+def environment(tmp):
+    env = dict(os.environ)
+    env.update({'SETTINGS_URL': f'sqlite:///{tmp}/coldstart.db', 'TELEGRAM_BOT_TOKEN': '1:bench',
+                'TELEGRAM_API_URL': 'http://127.0.0.1:9', 'PYTHONDONTWRITEBYTECODE': '1'})
+    return env
+
+
+def import_times(env):
+    """{module: (self us, cumulative us)} of one fresh `import api.webhook`, and the total wall time"""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'from api import webhook'], cwd=ROOT,
+                            env=env, capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - started
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(own), int(cumulative))
+    return times, elapsed
+
+
+def first_response(env, update):
+    """Seconds from spawning the process to the webhook's response"""
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', SERVE.format(root=ROOT)], cwd=ROOT, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        port = int(process.stdout.readline())
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        conn.request('POST', '/', body=json.dumps(update), headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        body = response.read()
+        elapsed = time.perf_counter() - started
+        conn.close()
+        assert response.status == 200 and body, (response.status, body)
+    finally:
+        process.wait(timeout=30)
+    return elapsed
+
+
+def bare(env):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], cwd=ROOT, env=env, check=True)
+    return time.perf_counter() - started
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = environment(tmp)
+        first_response(env, UPDATES['/start'])  # warms the OS file cache and creates the database
+        interpreter = statistics.median(bare(env) for _ in range(args.runs))
+        runs = [import_times(env) for _ in range(args.runs)]
+        walls = [elapsed for _, elapsed in runs]
+        totals = [times['api.webhook'][1] for times, _ in runs]
+        site = [times.get('site', (0, 0))[1] for times, _ in runs]
+        responses = {name: statistics.median(first_response(env, update) for _ in range(args.runs))
+                     for name, update in UPDATES.items()}
+
+    print(f"{args.runs} runs each, medians; Python {sys.version.split()[0]}\n")
+    print(f"  interpreter start      {interpreter * 1000:7.1f} ms  (python -c pass; site imports "
+          f"{statistics.median(site) / 1000:.1f} ms)")
+    print(f"  import api.webhook     {statistics.median(totals) / 1000:7.1f} ms  (importtime); "
+          f"process with import {statistics.median(walls) * 1000:.1f} ms")
+    for name, elapsed in responses.items():
+        print(f"  first response {name:<8}{elapsed * 1000:7.1f} ms  (spawn to webhook reply, "
+              f"{(elapsed - interpreter) * 1000:.1f} ms over the bare interpreter)")
+
+    # Slowest imports under api.webhook in the median run, by self time (their own module body)
+    times = sorted(runs, key=lambda run: run[0]['api.webhook'][1])[len(runs) // 2][0]
+    names = list(times)
+    below = names[names.index('site') + 1:] if 'site' in names else names
+    print(f"\n  slowest imports (self / cumulative us) of {len(below)} loaded by the webhook:")
+    for name in sorted(below, key=lambda name: times[name][0], reverse=True)[:args.top]:
+        print(f"    {times[name][0]:>7,} {times[name][1]:>9,}  {name}")
+
+    budget = responses['/start'] * 1000
+    if args.budget and budget > args.budget:
+        print(f"\nOver budget: /start first response {budget:.1f} ms > {args.budget:g} ms")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=15)
+    parser.add_argument('--top', type=int, default=12)
+    parser.add_argument('--budget', type=float, help='max /start first response, ms')
+    main(parser.parse_args())
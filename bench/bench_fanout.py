@@ -0,0 +1,72 @@
+"""
+Benchmark: sequential per-wallet txlist loop vs concurrent fan-out
+Latency against a local mock Etherscan, by wallet count.
+
+Fan-out can only win while a call takes longer than the budget's spacing
+(1/rps). Sequential takes n * max(latency, 1/rps), fan-out (n - 1) / rps +
+latency, so the speedup tends to latency * rps as n grows. The default
+0.8s latency at 5 req/s allows up to 4x; with --latency 0.2 both are
+paced by the budget alone and tie.
+
+    python -m bench.bench_fanout [--latency 0.8] [--rps 5]
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from bench.mock_servers import MockEtherscan, make_address
+from whalefollow.etherscan import RateLimiter, fetch_txlist, fetch_wallets
+
+
+async def sequential(client, wallets, url, rps):
+    """The old fetch_whale_transactions loop: one wallet after another"""
+    limiter = RateLimiter(rps)
+    rows = []
+    for name, address in wallets.items():
+        for tx in await fetch_txlist(client, address, 'KEY', limiter=limiter, url=url):
+            rows.append((name, address, tx))
+    return rows
+
+
+async def fanout(client, wallets, url, rps, deadline):
+    return await fetch_wallets(client, wallets, 'KEY', limiter=RateLimiter(rps), url=url,
+                               concurrency=max(1, int(rps)), deadline=deadline)
+
+
+async def timed(coro):
+    start = time.perf_counter()
+    rows = await coro
+    return time.perf_counter() - start, len(rows)
+
+
+async def main(args):
+    counts = [1, 2, 5, 10, 20, 40]
+    async with MockEtherscan(latency=args.latency) as server:
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            print(f"mock latency {args.latency * 1000:.0f} ms, budget {args.rps:g} req/s: "
+                  f"fan-out can be up to {max(1.0, args.latency * args.rps):.1f}x faster\n")
+            print(f"{'wallets':>8} {'sequential':>12} {'fan-out':>10} {'speedup':>8} {'expected':>9}")
+            for n in counts:
+                wallets = {f'W{i}': make_address(i) for i in range(n)}
+                seq, _ = await timed(sequential(client, wallets, server.api_url, args.rps))
+                fan, _ = await timed(fanout(client, wallets, server.api_url, args.rps, 60))
+                expected = n * max(args.latency, 1 / args.rps) / ((n - 1) / args.rps + args.latency)
+                print(f"{n:>8} {seq:>11.2f}s {fan:>9.2f}s {seq / fan:>7.1f}x {expected:>8.1f}x")
+
+            # One wallet hangs: the deadline bounds the reply
+            wallets = {f'W{i}': make_address(i) for i in range(8)}
+            server.slow[make_address(3)] = 30
+            fan, rows = await timed(fanout(client, wallets, server.api_url, args.rps, args.deadline))
+            print(f"\n8 wallets, one stuck for 30s, deadline {args.deadline:g}s: "
+                  f"{fan:.2f}s, {rows} txs from 7 wallets")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.8)
+    parser.add_argument('--rps', type=float, default=5)
+    parser.add_argument('--deadline', type=float, default=3)
+    asyncio.run(main(parser.parse_args()))
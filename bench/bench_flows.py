@@ -0,0 +1,134 @@
+"""
+Benchmark: exchange flow aggregation replayed from a fixture at 10k transfers/s
+- Fixture: JSON lines of txlist rows plus a usd field, between exchange
+  wallets (data/wallets.csv) and random addresses; generated once, reusable
+- Paced: replays at --rate in 10 ms batches and reports whether it keeps up
+- Unpaced: max transfers/s and per-transfer cost; snapshot read time
+- Checks the ring totals against a brute-force sum over the fixture
+
+    python -m bench.bench_flows [--transfers 300000] [--rate 10000] [--fixture flows.jsonl]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+from bench.mock_servers import make_tx
+from whalefollow.chains import SOLANA_WALLETS_FILE
+from whalefollow.flows import FlowTracker, exchange_lookup
+from whalefollow.registry import get_registry, read_csv
+from whalefollow.txstream import Tx
+
+START = 1_700_000_000
+
+
+def make_fixture(path, count):
+    """`count` transfers of tracked exchange wallets spread over one day of block time"""
+    rng = random.Random(11)
+    registry = get_registry()
+    exchanges = [address for address in registry.tracked().values() if registry.lookup(address).category == 'exchange']
+    with open(path, 'w') as f:
+        for i in range(count):
+            row = make_tx(rng, rng.choice(exchanges), 0)
+            if rng.random() < 0.05:  # exchange to exchange
+                row['to'] = rng.choice(exchanges)
+            row['timeStamp'] = str(START + i * 86_400 // count)
+            row['usd'] = rng.lognormvariate(11, 1.5)  # median ~$60k
+            f.write(json.dumps(row) + '\n')
+
+
+def load_fixture(path):
+    txs = []
+    with open(path) as f:
+        for line in f:
+            row = json.loads(line)
+            tx = Tx.from_row(row)
+            tx.usd = row['usd']
+            txs.append(tx)
+    return txs
+
+
+def tracker():
+    return FlowTracker(exchange_lookup(get_registry(), read_csv(SOLANA_WALLETS_FILE, chain='solana')))
+
+
+async def paced(txs, rate, seconds):
+    """Replay the first rate * seconds transfers in real time"""
+    flows = tracker()
+    batch = max(1, rate // 100)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    worst = 0.0
+    for n, i in enumerate(range(0, min(len(txs), rate * seconds), batch)):
+        due = start + n * batch / rate
+        await asyncio.sleep(max(0.0, due - loop.time()))
+        worst = max(worst, loop.time() - due)
+        for tx in txs[i:i + batch]:
+            flows.add(tx)
+    elapsed = loop.time() - start
+    print(f"  paced    {flows.transfers:,} transfers in {elapsed:.2f}s ({flows.transfers / elapsed:,.0f}/s target "
+          f"{rate:,}/s), worst batch lag {worst * 1000:.1f} ms")
+
+
+def check(flows, txs, now):
+    """Brute-force 1h totals per exchange vs the running ring totals"""
+    exchange_of = flows.exchange_of
+    width = 3600 // 60
+    cut = (now // width - 60 + 1) * width  # the ring covers whole 60s buckets
+    expected = {}
+    for tx in txs:
+        if cut <= tx.timestamp <= now:
+            source, target = exchange_of(tx.chain, tx.sender), exchange_of(tx.chain, tx.to)
+            if source == target:
+                continue
+            if target:
+                expected.setdefault(target, [0.0, 0.0])[0] += tx.usd
+            if source:
+                expected.setdefault(source, [0.0, 0.0])[1] += tx.usd
+    snapshot = {e['exchange']: e['windows']['1h'] for e in flows.snapshot(now)['exchanges']}
+    worst = max(max(abs(snapshot[name][0] - i) / max(i, 1), abs(snapshot[name][1] - o) / max(o, 1))
+                for name, (i, o) in expected.items())
+    print(f"  1h totals vs brute force: max relative error {worst:.1e}")
+    assert worst < 1e-6
+
+
+def main(args):
+    path = args.fixture or os.path.join(tempfile.gettempdir(), f'whalefollow-flows-{args.transfers}.jsonl')
+    if not os.path.exists(path):
+        make_fixture(path, args.transfers)
+    txs = load_fixture(path)
+    print(f"{len(txs):,} transfers from {path}\n")
+
+    asyncio.run(paced(txs, args.rate, args.seconds))
+
+    flows = tracker()
+    start = time.perf_counter()
+    for tx in txs:
+        flows.add(tx)
+    elapsed = time.perf_counter() - start
+    print(f"  unpaced  {len(txs) / elapsed:,.0f} transfers/s ({elapsed / len(txs) * 1e6:.2f} us each), "
+          f"{flows.counted:,} counted, {len(flows.rings)} exchanges")
+
+    now = txs[-1].timestamp
+    rounds = 1000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        snapshot = flows.snapshot(now)
+    elapsed = (time.perf_counter() - start) / rounds
+    flagged = [e['exchange'] for e in snapshot['exchanges'] if e['anomaly']]
+    print(f"  snapshot {elapsed * 1e6:.0f} us for {len(snapshot['exchanges'])} exchanges x "
+          f"{len(flows.windows)} windows; sentiment {snapshot['sentiment']}, anomalies {flagged or 'none'}")
+    check(flows, txs, now)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--transfers', type=int, default=300_000)
+    parser.add_argument('--rate', type=int, default=10_000)
+    parser.add_argument('--seconds', type=int, default=5)
+    parser.add_argument('--fixture')
+    main(parser.parse_args())
@@ -0,0 +1,169 @@
+"""
+Benchmark: health server on its own thread vs on the bot's event loop
+- thread: http.server.HTTPServer on a daemon thread, as before
+- loop: whalefollow.server.HealthServer (aiohttp) on the event loop
+A client process scrapes /metrics and /healthz while the loop runs bot-like
+work in small CPU slices; reports loop lag, work done, scrape latency and
+thread count. Then webhook mode end to end: callback updates POSTed to the
+health server reach bot.py's handlers and their edits reach a fake Bot API.
+
+    python -m bench.bench_health [--seconds 5] [--updates 100]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+os.environ.setdefault('SETTINGS_URL', 'memory://')
+os.environ['PORT'] = '0'
+
+import bot
+from bench.mock_servers import FakeTelegram
+from whalefollow.metrics import LOOP_LAG_SECONDS, METRICS, Histogram, watch_loop_lag
+from whalefollow.server import HealthServer
+
+# Scrapes /metrics and /healthz alternately for `seconds`; prints latencies (s) as JSON
+CLIENT = """
+import http.client, json, sys, time
+port, seconds = int(sys.argv[1]), float(sys.argv[2])
+latencies, paths, deadline = [], ('/metrics', '/healthz'), time.monotonic() + seconds
+while time.monotonic() < deadline:
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request('GET', paths[len(latencies) % 2])
+    conn.getresponse().read()
+    conn.close()
+    latencies.append(time.perf_counter() - start)
+print(json.dumps(latencies))
+"""
+
+
+def pct(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(p * len(samples)))] if samples else 0.0
+
+
+class ThreadHandler(BaseHTTPRequestHandler):
+    """The old health handler"""
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            body = METRICS.exposition().encode()
+        else:
+            body = json.dumps(bot.healthz()[1]).encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def populate():
+    """Label sets like a bot that has been up a while"""
+    for route in bot.ROUTES.all():
+        for i in range(50):
+            route.timings.observe(i * 0.0005)
+            route.calls += 1
+
+
+async def work(deadline):
+    """Bot-like load: 0.2 ms CPU slices (handler work), yielding in between"""
+    slices = 0
+    histogram = Histogram()
+    while time.monotonic() < deadline:
+        end = time.perf_counter() + 0.0002
+        while time.perf_counter() < end:
+            histogram.observe(0.001)
+        slices += 1
+        await asyncio.sleep(0)
+    return slices
+
+
+async def run(mode, seconds):
+    LOOP_LAG_SECONDS.values.clear()
+    if mode == 'thread':
+        server = HTTPServer(('127.0.0.1', 0), ThreadHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_address[1]
+    else:
+        server = HealthServer(bot.health_stats, bot.healthz, host='127.0.0.1', port=0)
+        await server.start()
+        port = server.port
+    watcher = asyncio.create_task(watch_loop_lag(0.005))
+    client = await asyncio.create_subprocess_exec(sys.executable, '-c', CLIENT, str(port), str(seconds),
+                                                  stdout=subprocess.PIPE)
+    threads = threading.active_count()
+    slices = await work(time.monotonic() + seconds)
+    latencies = json.loads((await client.communicate())[0])
+    watcher.cancel()
+    if mode == 'thread':
+        server.shutdown()
+    else:
+        await server.stop()
+    lag = LOOP_LAG_SECONDS.labels()
+    print(f"  {mode:<6}  threads {threads}, work {slices / seconds:,.0f} slices/s, loop lag p50 "
+          f"{lag.quantile(0.5) * 1000:.2f} ms p99 {lag.quantile(0.99) * 1000:.2f} ms, {len(latencies) / seconds:,.0f} "
+          f"scrapes/s p50 {pct(latencies, .5) * 1000:.1f} ms p99 {pct(latencies, .99) * 1000:.1f} ms")
+
+
+def callback_update(i):
+    chat = {'id': 1000 + i % 50, 'type': 'private'}
+    return {'update_id': i, 'callback_query': {
+        'id': str(i), 'chat_instance': '1', 'data': 'wallets',
+        'from': {'id': chat['id'], 'is_bot': False, 'first_name': 'Ann'},
+        'message': {'message_id': i, 'date': 0, 'chat': chat, 'text': 'menu'},
+    }}
+
+
+async def webhook_mode(updates):
+    import aiohttp
+    async with FakeTelegram() as telegram:
+        bot.WEBHOOK_URL = 'https://bench.invalid'
+        app = bot.build_app('1:bench', base_url=telegram.api_url)
+        stopping = asyncio.Event()
+        runner = asyncio.create_task(bot.run_webhook(app, stopping))
+        while 'health_server' not in app.bot_data or not telegram.calls['setWebhook']:
+            await asyncio.sleep(0.01)
+        server = app.bot_data['health_server']
+        url = f'http://127.0.0.1:{server.port}{bot.WEBHOOK_PATH}'
+        headers = {'X-Telegram-Bot-Api-Secret-Token': bot.WEBHOOK_SECRET}
+        start = time.perf_counter()
+        async with aiohttp.ClientSession() as session:
+            async def post(i):
+                async with session.post(url, json=callback_update(i), headers=headers) as response:
+                    assert response.status == 200
+            await asyncio.gather(*(post(i) for i in range(updates)))
+            acked = time.perf_counter() - start
+            async with session.post(url, json=callback_update(0)) as response:
+                forged = response.status
+        while telegram.calls['editMessageText'] < updates and time.perf_counter() - start < 30:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        stopping.set()
+        await runner
+    print(f"  webhook {updates} callback updates acknowledged in {acked * 1000:.0f} ms, "
+          f"{telegram.calls['editMessageText']} edits and {telegram.calls['answerCallbackQuery']} answers at the "
+          f"fake Bot API after {elapsed:.2f}s (send queue paced); update without the secret: HTTP {forged}")
+
+
+def main(args):
+    populate()
+    print(f"{args.seconds:g}s of scraping per mode against 0.2 ms work slices on the loop\n")
+    for mode in ('thread', 'loop'):
+        asyncio.run(run(mode, args.seconds))
+    asyncio.run(webhook_mode(args.updates))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--updates', type=int, default=100)
+    main(parser.parse_args())
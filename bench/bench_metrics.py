@@ -0,0 +1,101 @@
+"""
+Benchmark: cost of recording metrics on the event loop, and of scraping them
+- Per-record cost: Counter.inc, Histogram observe, upstream_call() around a no-op
+- Exposition time for the bot's families with --series label sets each
+- Event-loop lag (whalefollow.metrics.watch_loop_lag) while a thread scrapes
+  /metrics-style exposition() in a tight loop and the loop records metrics
+
+    python -m bench.bench_metrics [--records 500000] [--series 50] [--seconds 3]
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+
+from whalefollow.metrics import LOOP_LAG_SECONDS, METRICS, Metrics, upstream_call, watch_loop_lag
+
+
+def per_record(records):
+    metrics = Metrics()
+    counter = metrics.counter('c_total', 'c', ('type',))
+    histogram = metrics.histogram('h_seconds', 'h', ('method',))
+
+    def run(fn):
+        start = time.perf_counter()
+        for i in range(records):
+            fn(i)
+        return (time.perf_counter() - start) / records * 1e9
+
+    def call(i):
+        with upstream_call('bench', 'noop'):
+            pass
+
+    print(f"  Counter.inc       {run(lambda i: counter.inc('message')):6.0f} ns")
+    print(f"  Histogram observe {run(lambda i: histogram.observe(i * 1e-7, 'txlist')):6.0f} ns")
+    print(f"  upstream_call()   {run(call):6.0f} ns")
+
+
+def exposition(series):
+    metrics = Metrics()
+    families = [metrics.histogram(f'bench_{i}_seconds', 'bench', ('route',)) for i in range(5)]
+    families += [metrics.counter(f'bench_{i}_total', 'bench', ('route',)) for i in range(5)]
+    for family in families:
+        for j in range(series):
+            if family.kind == 'histogram':
+                family.observe(j * 0.001, f'route_{j}')
+            else:
+                family.inc(f'route_{j}')
+    rounds = 50
+    start = time.perf_counter()
+    for _ in range(rounds):
+        text = metrics.exposition()
+    elapsed = (time.perf_counter() - start) / rounds
+    print(f"  exposition        {elapsed * 1000:6.2f} ms for {len(text.splitlines()):,} lines "
+          f"({len(families)} families x {series} series)")
+    return metrics
+
+
+async def lag_under_scrape(metrics, seconds):
+    stop = threading.Event()
+    scrapes = 0
+
+    def scraper():
+        nonlocal scrapes
+        while not stop.is_set():
+            metrics.exposition()
+            METRICS.exposition()
+            scrapes += 1
+
+    watcher = asyncio.create_task(watch_loop_lag(0.01))
+    thread = threading.Thread(target=scraper)
+    thread.start()
+    family = metrics.families['bench_0_seconds']
+    records = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for _ in range(1000):
+            family.observe(0.002, 'route_1')
+        records += 1000
+        await asyncio.sleep(0)
+    stop.set()
+    thread.join()
+    watcher.cancel()
+    lag = LOOP_LAG_SECONDS.labels()
+    print(f"  under scrape      {records:,} records on the loop and {scrapes:,} scrapes in {seconds:g}s; "
+          f"loop lag p50 {lag.quantile(0.5) * 1000:.1f} ms, p99 {lag.quantile(0.99) * 1000:.1f} ms")
+
+
+def main(args):
+    print(f"{args.records:,} records per metric\n")
+    per_record(args.records)
+    metrics = exposition(args.series)
+    asyncio.run(lag_under_scrape(metrics, args.seconds))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=500_000)
+    parser.add_argument('--series', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,51 @@
+"""
+Benchmark: wallet registry size and lookup rate at tens of thousands of labels
+- build(): CSV rows -> binary table
+- lookup(): hits (labeled) and misses (random addresses), both from and to
+- .bin on disk, memory-mapped vs built in memory
+
+    python -m bench.bench_registry [--addresses 50000] [--labels 5000] [--lookups 200000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from whalefollow.registry import WalletRegistry, build
+
+
+def main(args):
+    rng = random.Random(9)
+    categories = ('exchange', 'fund', 'market_maker', 'bridge', 'defi')
+    rows = [('0x' + rng.randbytes(20).hex(), f'Entity {i % args.labels}', categories[i % len(categories)], i < 20)
+            for i in range(args.addresses)]
+    print(f"{args.addresses:,} addresses, {args.labels:,} distinct labels")
+
+    start = time.perf_counter()
+    data = build(rows)
+    print(f"  build                  {(time.perf_counter() - start) * 1000:>10.0f} ms")
+    print(f"  size                   {len(data) / 1e6:>10.2f} MB ({len(data) / args.addresses:.0f} B/address incl. labels)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'wallets.bin')
+        with open(path, 'wb') as f:
+            f.write(data)
+        for label, registry in (('in memory', WalletRegistry(data)), ('mmap', WalletRegistry.open(path))):
+            hits = [rng.choice(rows)[0].upper().replace('0X', '0x') for _ in range(args.lookups // 2)]
+            misses = ['0x' + rng.randbytes(20).hex() for _ in range(args.lookups // 2)]
+            start = time.perf_counter()
+            found = sum(registry.lookup(address) is not None for address in hits + misses)
+            elapsed = time.perf_counter() - start
+            assert found == len(hits)
+            print(f"  lookup, {label:<14} {args.lookups / elapsed:>10,.0f}/s  "
+                  f"({elapsed / args.lookups * 1e6:.2f} us, 50% misses)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--addresses', type=int, default=50_000)
+    parser.add_argument('--labels', type=int, default=5_000)
+    parser.add_argument('--lookups', type=int, default=200_000)
+    main(parser.parse_args())
@@ -0,0 +1,116 @@
+"""
+Benchmark: handler CPU time per update with pre-rendered screens
+- Webhook: a mix of /start and menu callbacks through handle_update();
+  per-call rendering (list texts rebuilt, payload json.dumps'd, as before)
+  vs pre-rendered screens serialized from cached fragments (payload.body)
+- Bot: the Recent Transfers view rendered per tap vs the shared
+  CachedRender, with a new block (and a re-render) every --taps-per-block taps
+
+    python -m bench.bench_render [--updates 20000] [--blocks 50] [--taps-per-block 200]
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+
+os.environ.setdefault('SETTINGS_URL', 'memory://')
+
+from api import webhook
+from bench.mock_servers import make_block
+from whalefollow.chains import EthereumAdapter, TransferStream
+
+ROUTES = ['live_alerts', 'top_wallets', 'recent_transfers', 'settings', 'set_threshold', 'back_main']
+
+
+def make_updates(count):
+    rng = random.Random(5)
+    updates = []
+    for i in range(count):
+        chat = {'id': 1000 + rng.randrange(500)}
+        if rng.random() < 0.2:
+            updates.append({'message': {'chat': chat, 'text': '/start', 'from': {'first_name': 'Ann <3'}}})
+        else:
+            updates.append({'callback_query': {'id': str(i), 'data': rng.choice(ROUTES),
+                                               'message': {'message_id': i, 'chat': chat}}})
+    return updates
+
+
+def per_call(update):
+    """Rendering as before: list texts rebuilt and the payload json.dumps'd on every update"""
+    payload, _ = webhook.handle_update(update)
+    data = update.get('callback_query', {}).get('data')
+    if data == 'top_wallets':
+        webhook.top_wallets_text()
+    elif data == 'recent_transfers':
+        webhook.recent_transfers_text()
+    return json.dumps(dict(payload)).encode('utf-8')
+
+
+def prerendered(update):
+    payload, _ = webhook.handle_update(update)
+    return payload.body
+
+
+def cpu(fn, items):
+    start = time.process_time()
+    for item in items:
+        fn(item)
+    return (time.process_time() - start) / len(items)
+
+
+def bench_webhook(args):
+    webhook.INLINE_REPLIES = True
+    updates = make_updates(args.updates)
+    for update in updates[:500]:  # same bodies either way
+        assert json.loads(per_call(update)) == json.loads(prerendered(update))
+    for update in updates:  # settings cache warm for both runs
+        webhook.handle_update(update)
+    before, after = cpu(per_call, updates), cpu(prerendered, updates)
+    print(f"  webhook  per-call rendering {before * 1e6:.1f} us/update, pre-rendered {after * 1e6:.1f} us/update "
+          f"({before / after:.1f}x)")
+
+
+def bench_transfers(args):
+    import bot
+    rng = random.Random(9)
+    registry = bot.REGISTRY
+    tracked = list(registry.tracked().values())
+    adapter = EthereumAdapter({}, None, registry=registry, ws_url='ws://unused')
+    adapter.ready.set()
+    bot.STREAM = TransferStream([adapter], prices=bot.PRICES)
+    blocks = [make_block(rng, 19_000_000 + i, tracked, txs=150, hit_rate=0.1) for i in range(args.blocks)]
+
+    def run(render):
+        elapsed = 0.0
+        for block in blocks:
+            adapter.blocks.scan([block])
+            bot.STREAM.version += 1  # as TransferStream._run does after a poll with rows
+            start = time.process_time()
+            for _ in range(args.taps_per_block):
+                render()
+            elapsed += time.process_time() - start
+        return elapsed / (len(blocks) * args.taps_per_block)
+
+    before = run(bot.transfers_text)
+    adapter.blocks._recent.clear()
+    after = run(bot.TRANSFERS_VIEW)
+    stats = bot.TRANSFERS_VIEW.stats()
+    print(f"  bot      transfers view per tap {before * 1e6:.1f} us, cached {after * 1e6:.2f} us "
+          f"({before / after:.0f}x); {stats['renders']} renders, {stats['hits']:,} hits over "
+          f"{len(adapter.blocks):,} rows")
+
+
+def main(args):
+    print(f"{args.updates:,} webhook updates; {args.blocks} blocks x {args.taps_per_block} transfer-view taps\n")
+    bench_webhook(args)
+    bench_transfers(args)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--updates', type=int, default=20_000)
+    parser.add_argument('--blocks', type=int, default=50)
+    parser.add_argument('--taps-per-block', type=int, default=200)
+    main(parser.parse_args())
@@ -0,0 +1,63 @@
+"""
+Benchmark: callback dispatch cost vs number of routes
+- ladder: `if data == ...` checked in order, as the handlers did before
+- router: whalefollow.routes.Router (dict lookup, prefix lookup for
+  'threshold_<n>'), with and without its timing/counting wrapper
+Callbacks are drawn uniformly over every route, so the ladder's average
+depth is half its length.
+
+    python -m bench.bench_routes [--calls 200000]
+"""
+
+import argparse
+import random
+import time
+
+from whalefollow.routes import Router
+
+
+def handler(chat_id, message_id, threshold=None):
+    return chat_id
+
+
+def ladder(names):
+    """The if/elif chain: first matching name wins"""
+    def route(data, chat_id, message_id):
+        for name in names:
+            if data == name:
+                return handler(chat_id, message_id)
+        if data.startswith('threshold_'):
+            return handler(chat_id, message_id, int(data[10:]))
+    return route
+
+
+def timed(fn, calls):
+    start = time.perf_counter()
+    for data in calls:
+        fn(data, 1, 2)
+    return (time.perf_counter() - start) / len(calls) * 1e9
+
+
+def main(args):
+    rng = random.Random(2)
+    print(f"{args.calls:,} callbacks per run, ns per dispatch\n")
+    print(f"  {'routes':>6}  {'ladder':>8}  {'router':>8}  {'router.match':>12}")
+    for count in (10, 100, 1000):
+        names = [f'screen_{i}x' for i in range(count - 1)]
+        router = Router()
+        for name in names:
+            router.add(name, handler)
+        router.add('threshold_<n>', handler, convert=int)
+        calls = [rng.choice(names) if rng.random() > 1 / count else f'threshold_{rng.choice((50, 100))}'
+                 for _ in range(args.calls)]
+        route = ladder(names)
+        match = lambda data, chat_id, message_id: router.match(data)  # noqa: E731
+        print(f"  {count:>6}  {timed(route, calls):>8.0f}  {timed(router.dispatch, calls):>8.0f}  "
+              f"{timed(match, calls):>12.0f}")
+    print("\n  router includes a per-route latency histogram and call counts; router.match is the lookup alone")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200_000)
+    main(parser.parse_args())
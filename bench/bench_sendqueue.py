@@ -0,0 +1,87 @@
+"""
+Benchmark: outbound SendQueue vs naive sends against a flood-limited fake Telegram
+- Naive: every alert sent at once, 429s counted as lost
+- Queue: same alerts as BROADCAST plus interactive replies arriving meanwhile
+
+    python -m bench.bench_sendqueue [--alerts 150] [--replies 20] [--rate 30] [--queue-rate 45]
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from bench.mock_servers import FakeTelegram
+from whalefollow.sendqueue import BROADCAST, INTERACTIVE, RetryAfter, SendQueue
+
+
+async def post(client, url, payload):
+    response = await client.post(url, json=payload)
+    body = response.json()
+    if response.status_code == 429:
+        raise RetryAfter(body['parameters']['retry_after'])
+    response.raise_for_status()
+    return body
+
+
+def pct(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(p * len(samples)))] if samples else 0.0
+
+
+async def naive(args):
+    async with FakeTelegram(flood_limit=args.rate) as telegram:
+        url = f"{telegram.api_url}TEST/sendMessage"
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            results = await asyncio.gather(*[post(client, url, {'chat_id': 1000 + i, 'text': 'alert'})
+                                             for i in range(args.alerts)], return_exceptions=True)
+    lost = sum(isinstance(r, Exception) for r in results)
+    print(f"naive:  {args.alerts} alerts at once -> {telegram.rejected} x 429, {lost} lost")
+
+
+async def queued(args):
+    async with FakeTelegram(flood_limit=args.rate) as telegram:
+        url = f"{telegram.api_url}TEST/sendMessage"
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            queue = SendQueue(rate=args.queue_rate or args.rate)
+            loop = asyncio.get_running_loop()
+
+            async def timed(chat_id, priority):
+                start = loop.time()
+                await queue.send(lambda: post(client, url, {'chat_id': chat_id, 'text': 'x'}),
+                                 chat_id=chat_id, priority=priority)
+                return loop.time() - start
+
+            start = time.perf_counter()
+            alerts = [asyncio.create_task(timed(1000 + i, BROADCAST)) for i in range(args.alerts)]
+            replies = []
+            for i in range(args.replies):
+                await asyncio.sleep(0.1)
+                replies.append(asyncio.create_task(timed(i % 5, INTERACTIVE)))
+            alert_lat = await asyncio.gather(*alerts)
+            reply_lat = await asyncio.gather(*replies)
+            elapsed = time.perf_counter() - start
+            await queue.stop()
+
+    print(f"queue:  {len(alert_lat)} alerts + {len(reply_lat)} replies in {elapsed:.1f}s, "
+          f"{telegram.rejected} x 429 (retried), {queue.failed} lost")
+    print(f"        interactive latency p50 {pct(reply_lat, .5) * 1000:.0f} ms, "
+          f"p95 {pct(reply_lat, .95) * 1000:.0f} ms")
+    print(f"        broadcast latency   p50 {pct(alert_lat, .5):.1f} s, p95 {pct(alert_lat, .95):.1f} s")
+    print(f"        stats: {queue.stats()}")
+
+
+async def main(args):
+    print(f"fake Telegram limit: {args.rate:g} msg/s, 4 msg/s per chat\n")
+    await naive(args)
+    await queued(args)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--alerts', type=int, default=150)
+    parser.add_argument('--replies', type=int, default=20)
+    parser.add_argument('--rate', type=float, default=30)
+    parser.add_argument('--queue-rate', type=float, help='send faster than the fake allows to exercise 429s')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,82 @@
+"""
+Benchmark: settings store reads/writes per second at 1M users
+- update(): taps through the write-behind buffer
+- flush(): durable batched writes
+- get(): random point reads, get_many(): batched reads for alert fan-out
+- iter_batches(): full ordered scan (subscriber reload, broadcasts)
+
+    python -m bench.bench_settings [--users 1000000] [--redis-url redis://localhost:6379/15]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from whalefollow.settings import MemoryStore, SQLiteStore, open_store
+
+
+def rate(count, elapsed):
+    return f"{count / elapsed:>12,.0f}/s"
+
+
+def bench(label, store, users, reads, flush_pending):
+    rng = random.Random(3)
+    ids = [100_000_000 + i for i in range(users)]
+    print(f"\n{label}")
+
+    start = time.perf_counter()
+    for i, chat_id in enumerate(ids):
+        store.update(chat_id, alerts=True, threshold=(50, 100, 500, 1000)[i % 4], paused=i % 10 == 0)
+    elapsed = time.perf_counter() - start
+    print(f"  update (write-behind)  {rate(users, elapsed)}")
+
+    if flush_pending:
+        start = time.perf_counter()
+        store.flush()
+        print(f"  flush remainder        {(time.perf_counter() - start) * 1000:>10.0f} ms "
+              f"(buffer flushes every {flush_pending:,} writes or 0.5 s)")
+
+    sample = rng.sample(ids, reads)
+    start = time.perf_counter()
+    for chat_id in sample:
+        store.get(chat_id)
+    print(f"  get                    {rate(reads, time.perf_counter() - start)}")
+
+    start = time.perf_counter()
+    for i in range(0, reads, 1000):
+        store.get_many(sample[i:i + 1000])
+    print(f"  get_many (1000/batch)  {rate(reads, time.perf_counter() - start)}")
+
+    start = time.perf_counter()
+    scanned = sum(len(batch) for batch in store.iter_batches(batch_size=5000))
+    print(f"  iter_batches (5000)    {rate(scanned, time.perf_counter() - start)}  ({scanned:,} rows)")
+
+
+def main(args):
+    print(f"{args.users:,} users, {args.reads:,} random reads")
+    bench('memory', MemoryStore(), args.users, args.reads, None)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'settings.db')
+        store = SQLiteStore(path, flush_pending=args.flush_pending)
+        bench('sqlite (WAL)', store, args.users, args.reads, args.flush_pending)
+        store.close()
+        size = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp))
+        print(f"  on disk                {size / 1e6:>10.1f} MB ({size / args.users:.0f} B/user incl. WAL)")
+
+    if args.redis_url:
+        store = open_store(args.redis_url)
+        store.client.delete(store.key, store.ids_key)
+        bench(f'redis ({args.redis_url})', store, args.users, args.reads, store.flush_pending)
+        store.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--reads', type=int, default=100_000)
+    parser.add_argument('--flush-pending', type=int, default=10_000)
+    parser.add_argument('--redis-url', help='also benchmark a Redis-compatible server (its keys are overwritten)')
+    main(parser.parse_args())
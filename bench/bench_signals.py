@@ -0,0 +1,198 @@
+"""
+Benchmark: copy-trade signal engine replayed over a month of transfers
+- Fixture: JSON lines of txlist rows (plus wallet, address and usd) for
+  --wallets tracked wallets over 30 days, a few very active, most quiet, with
+  --episodes planted accumulation / distribution bursts; generated once
+- Incremental: whalefollow.signals.SignalEngine over the whole month:
+  transfers/s, memory of the position arrays, planted bursts found
+- Recompute: the same rules re-deriving each wallet's position and window
+  from its full history on every transfer, over the first --naive transfers;
+  must raise the same signals
+- Checks every series' window totals against a brute-force sum
+
+    python -m bench.bench_signals [--transfers 500000] [--wallets 1000] [--episodes 40] [--fixture signals.jsonl]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from bench.mock_servers import make_address, make_tx
+from whalefollow.signals import SignalEngine
+from whalefollow.txstream import Tx
+
+START = 1_700_000_000
+MONTH = 30 * 86400
+ETH_USD = 3200.0
+
+
+def row_for(rng, wallet, address, timestamp, usd, incoming):
+    counterparty = make_address(10**9 + rng.randrange(10**6))
+    row = make_tx(rng, address, 0, counterparty=counterparty)
+    row['from'], row['to'] = (counterparty, address) if incoming else (address, counterparty)
+    row.update({'timeStamp': str(timestamp), 'value': str(int(usd / ETH_USD * 10**18)), 'usd': usd,
+                'wallet': wallet, 'address': address})
+    return row
+
+
+def make_fixture(path, count, wallets, episodes):
+    """Background transfers (random direction, median ~$60k) plus planted one-way bursts"""
+    rng = random.Random(21)
+    addresses = [make_address(i + 1) for i in range(wallets)]
+    weights = [1 / (i + 1) for i in range(wallets)]  # a few busy wallets, a long quiet tail
+    rows = []
+    for wallet_index in rng.choices(range(wallets), weights, k=count):
+        rows.append(row_for(rng, f'Whale {wallet_index + 1}', addresses[wallet_index],
+                            START + rng.randrange(MONTH), rng.lognormvariate(11, 1.5), rng.random() < 0.5))
+    planted = []
+    for _ in range(episodes):
+        wallet_index = rng.randrange(wallets // 2, wallets)
+        incoming = rng.random() < 0.5
+        start = START + rng.randrange(MONTH - 86400)
+        for _ in range(5):
+            rows.append(row_for(rng, f'Whale {wallet_index + 1}', addresses[wallet_index],
+                                start + rng.randrange(6 * 3600), rng.uniform(500_000, 800_000), incoming))
+        planted.append({'address': addresses[wallet_index], 'start': start,
+                        'kind': 'accumulation' if incoming else 'distribution'})
+    rows.sort(key=lambda row: int(row['timeStamp']))
+    with open(path, 'w') as f:
+        f.write(json.dumps({'planted': planted}) + '\n')
+        for row in rows:
+            f.write(json.dumps(row) + '\n')
+
+
+def load_fixture(path):
+    rows = []
+    with open(path) as f:
+        planted = json.loads(f.readline())['planted']
+        for line in f:
+            row = json.loads(line)
+            tx = Tx.from_row(row)
+            tx.usd = row['usd']
+            rows.append((row['wallet'], row['address'], tx))
+    return rows, planted
+
+
+class Recompute:
+    """SignalEngine's rules, with each wallet's position and window summed from its full history every time"""
+
+    def __init__(self, engine):
+        self.rules = engine
+        self.history = {}  # key -> [(timestamp, amount, usd)]
+        self.state = {}
+        self.signals = []
+
+    def add(self, name, address, tx):
+        outgoing = tx.is_from(address)
+        sign = -1.0 if outgoing else 1.0
+        history = self.history.setdefault((tx.chain, address, tx.symbol), [])
+        history.append((max(tx.timestamp, history[-1][0]) if history else tx.timestamp,
+                        sign * tx.amount, sign * tx.usd))
+        now = history[-1][0]
+        position = sum(amount for _, amount, _ in history)
+        window = [(amount, usd) for t, amount, usd in history if t > now - self.rules.window]
+        usd = sum(u for _, u in window)
+        inbound = sum(1 for amount, _ in window if amount >= 0)
+        outbound = len(window) - inbound
+        rules, key, kind = self.rules, (tx.chain, address, tx.symbol), None
+        if len(window) >= rules.min_transfers:
+            if usd >= rules.min_usd and inbound >= rules.dominance * len(window):
+                kind = 'accumulation'
+            elif usd <= -rules.min_usd and outbound >= rules.dominance * len(window):
+                kind = 'distribution'
+        if kind is None:
+            if self.state.get(key) is not None and abs(usd) < rules.min_usd / 2:
+                self.state[key] = None
+            return
+        if kind != self.state.get(key):
+            self.state[key] = kind
+            self.signals.append((kind, address, now, usd, position))
+
+
+def found(signals, planted, window):
+    """Planted bursts answered by a signal of their kind for their wallet within the window"""
+    by_wallet = {}
+    for signal in signals:
+        by_wallet.setdefault(signal.address, []).append(signal)
+    return sum(any(s.kind == p['kind'] and p['start'] <= s.timestamp <= p['start'] + window
+                   for s in by_wallet.get(p['address'], ())) for p in planted)
+
+
+def check(engine, rows):
+    """Window totals of every series at the end of the month vs a brute-force sum"""
+    end = rows[-1][2].timestamp
+    expected = {}
+    for _, address, tx in rows:
+        if tx.timestamp > end - engine.window:
+            sign = -1.0 if tx.is_from(address) else 1.0
+            expected[address] = expected.get(address, 0.0) + sign * tx.usd
+    worst = 0.0
+    for (_, address, _), series in engine.series.items():
+        usd = series.since(end - engine.window)[1]
+        worst = max(worst, abs(usd - expected.get(address, 0.0)) / max(abs(expected.get(address, 0.0)), 1.0))
+    print(f"  window totals vs brute force: max relative error {worst:.1e}")
+    assert worst < 1e-6
+
+
+def main(args):
+    path = args.fixture or os.path.join(
+        tempfile.gettempdir(), f'whalefollow-signals-{args.transfers}-{args.wallets}-{args.episodes}.jsonl')
+    if not os.path.exists(path):
+        make_fixture(path, args.transfers, args.wallets, args.episodes)
+    rows, planted = load_fixture(path)
+    days = (rows[-1][2].timestamp - rows[0][2].timestamp) / 86400
+    print(f"{len(rows):,} transfers of {args.wallets:,} wallets over {days:.0f} days, "
+          f"{len(planted)} planted bursts, from {path}\n")
+
+    engine = SignalEngine()
+    start = time.perf_counter()
+    signals = [signal for signal in map(lambda row: engine.add(*row), rows) if signal is not None]
+    elapsed = time.perf_counter() - start
+    stats = engine.stats()
+    print(f"  incremental  {len(rows) / elapsed:,.0f} transfers/s ({elapsed / len(rows) * 1e6:.2f} us each), "
+          f"month in {elapsed:.2f}s")
+    print(f"               {stats['points']:,} points in {stats['series']:,} series: {stats['bytes'] / 2**20:.1f} MiB "
+          f"of arrays ({stats['bytes'] / max(stats['points'], 1):.0f} B/point)")
+    print(f"               {len(signals)} signals ({dict(engine.signals)}), planted bursts found "
+          f"{found(signals, planted, engine.window)}/{len(planted)}")
+
+    prefix = rows[:args.naive]
+    naive = Recompute(SignalEngine())
+    start = time.perf_counter()
+    for row in prefix:
+        naive.add(*row)
+    naive_elapsed = time.perf_counter() - start
+    incremental = SignalEngine()
+    start = time.perf_counter()
+    raised = [s for s in map(lambda row: incremental.add(*row), prefix) if s is not None]
+    prefix_elapsed = time.perf_counter() - start
+    same = len(raised) == len(naive.signals) and all(
+        (s.kind, s.address, s.timestamp) == n[:3] and abs(s.net_usd - n[3]) <= 1e-6 * abs(n[3])
+        and abs(s.position - n[4]) <= 1e-6 * max(abs(n[4]), 1.0) for s, n in zip(raised, naive.signals))
+    print(f"  recompute    first {len(prefix):,} transfers: {naive_elapsed / len(prefix) * 1e6:.1f} us each vs "
+          f"{prefix_elapsed / len(prefix) * 1e6:.2f} us incremental ({naive_elapsed / prefix_elapsed:,.0f}x), "
+          f"signals {'identical' if same else 'DIFFER'} ({len(raised)})")
+    assert same
+
+    end = rows[-1][2].timestamp
+    rounds = 100
+    start = time.perf_counter()
+    for _ in range(rounds):
+        snapshot = engine.snapshot(end)
+    top = f"{snapshot[0]['wallet']} {snapshot[0]['net_usd']:+,.0f} USD" if snapshot else 'none'
+    print(f"  snapshot     {(time.perf_counter() - start) / rounds * 1000:.2f} ms over {stats['series']:,} series; "
+          f"largest 24h net flow: {top}")
+    check(engine, rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--transfers', type=int, default=500_000)
+    parser.add_argument('--wallets', type=int, default=1000)
+    parser.add_argument('--episodes', type=int, default=40)
+    parser.add_argument('--naive', type=int, default=50_000)
+    parser.add_argument('--fixture')
+    main(parser.parse_args())
@@ -0,0 +1,80 @@
+"""
+Benchmark: whole-body response.json() vs streaming txlist parse
+- Synthetic txlist body with every field Etherscan returns
+- Peak Python memory (tracemalloc) with results kept alive, best-of-3 parse time
+- Streaming with early stop: first 2 transfers over 10 ETH
+
+    python -m bench.bench_txstream [--txs 10000] [--chunk 65536]
+"""
+
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from bench.mock_servers import make_address, make_tx
+from whalefollow.txstream import iter_txlist
+
+FULL_ROW = {  # the fields make_tx leaves out
+    'nonce': '123456', 'blockHash': '0x' + 'ab' * 32, 'transactionIndex': '87',
+    'txreceipt_status': '1', 'contractAddress': '', 'cumulativeGasUsed': '14372011',
+    'gasUsed': '21000', 'methodId': '0x', 'functionName': '',
+}
+
+
+def make_body(count):
+    rng = random.Random(5)
+    address = make_address(1)
+    result = [{**make_tx(rng, address, 19_000_000 - i), **FULL_ROW} for i in range(count)]
+    # Most hot-wallet traffic is small; 1 in 50 is a whale-sized transfer
+    for tx in result:
+        if rng.random() > 0.02:
+            tx['value'] = str(rng.randint(1, 10**18))
+    return json.dumps({'status': '1', 'message': 'OK', 'result': result}).encode()
+
+
+def chunked(body, size):
+    return (body[i:i + size] for i in range(0, len(body), size))
+
+
+def measure(label, body, parse, args):
+    elapsed = float('inf')
+    for _ in range(3):  # timed untraced: tracemalloc slows allocation-heavy code unevenly
+        start = time.perf_counter()
+        parse(chunked(body, args.chunk))
+        elapsed = min(elapsed, time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    kept = parse(chunked(body, args.chunk))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<30} {elapsed * 1000:>8.1f} ms  peak {peak / 1e6:>7.2f} MB  kept {len(kept):>6,}")
+    return kept
+
+
+def whole_body(chunks):
+    # What response.json() does: buffer the body, then build every dict
+    return json.loads(b''.join(chunks))['result']
+
+
+def main(args):
+    body = make_body(args.txs)
+    print(f"{args.txs:,} transactions, {len(body) / 1e6:.1f} MB body, {args.chunk // 1024} KB chunks\n")
+
+    rows = measure('response.json()', body, whole_body, args)
+    txs = measure('streaming, all rows', body, lambda c: list(iter_txlist(c)), args)
+    assert [tx['hash'] for tx in txs] == [row['hash'] for row in rows]
+
+    whale = 10 * 10**18
+    measure('streaming, value > 10 ETH', body, lambda c: list(iter_txlist(c, keep=lambda tx: tx.value > whale)), args)
+    measure('streaming, first 2 > 10 ETH', body,
+            lambda c: list(iter_txlist(c, keep=lambda tx: tx.value > whale, limit=2)), args)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--txs', type=int, default=10_000)
+    parser.add_argument('--chunk', type=int, default=65_536)
+    main(parser.parse_args())
@@ -0,0 +1,96 @@
+"""
+Benchmark: per-transfer vs batch USD valuation of mixed ETH/ERC-20 transfers
+- Naive: per transfer, look up the token's metadata, compute 10**decimals,
+  look up its price and divide (what a straightforward formatter does)
+- Batch: PriceFeed.value(), one table lookup and multiply per transfer
+- Plus: streaming tokentx parse with the token filter against MockEtherscan
+
+    python -m bench.bench_valuation [--transfers 10000] [--rounds 20]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+from bench.mock_servers import TOKENS, MockEtherscan, make_address, make_token_tx, make_tx
+from whalefollow.tokens import PriceFeed, TokenSet, fetch_tokentx
+from whalefollow.txstream import Tx
+
+PRICES = {'ethereum': 3200.0, 'tether': 1.0, 'usd-coin': 1.0, 'dai': 1.0, 'wrapped-bitcoin': 64000.0,
+          'chainlink': 14.0, 'solana': 150.0}
+
+
+def make_transfers(tokens, count):
+    rng = random.Random(7)
+    address = make_address(1)
+    rows = []
+    for i in range(count):
+        if rng.random() < 0.4:
+            rows.append(Tx.from_row(make_tx(rng, address, 18_000_000 + i)))
+        else:
+            tx = tokens.record(make_token_tx(rng, address, 18_000_000 + i))
+            if tx is not None:  # untracked contracts are dropped while parsing
+                rows.append(tx)
+    return rows
+
+
+def naive(txs, metadata, prices):
+    for tx in txs:
+        contract = tx.token.contract if tx.token is not None else ''
+        meta = metadata[contract]
+        price = prices.get(meta['price_id'])
+        tx.usd = tx.value / 10 ** meta['decimals'] * price if price is not None else None
+
+
+def best_of(rounds, fn):
+    elapsed = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        elapsed = min(elapsed, time.perf_counter() - start)
+    return elapsed
+
+
+async def parse(args, tokens):
+    async with MockEtherscan(latency=0, history=args.history) as eth, httpx.AsyncClient() as client:
+        address = make_address(1)
+        start = time.perf_counter()
+        txs = await fetch_tokentx(client, address, 'KEY', tokens=tokens, url=eth.api_url, limiter=None,
+                                  offset=args.history)
+        elapsed = time.perf_counter() - start
+    tracked = sum(1 for tx in eth.token_txs[address] if tokens.get(tx['contractAddress']))
+    print(f"  tokentx parse: {args.history} rows in {elapsed * 1000:.1f} ms, kept {len(txs)} "
+          f"tracked ({tracked} expected), resolved {tokens.resolved} token(s) from the rows")
+
+
+def main(args):
+    tokens = TokenSet.load()
+    feed = PriceFeed(tokens)
+    feed.prices.update(PRICES)
+    txs = make_transfers(tokens, args.transfers)
+    for contract, symbol, _ in TOKENS:  # LINK ships without decimals; the rows above resolved it
+        assert tokens.get(contract) is None or tokens.get(contract).decimals is not None, symbol
+    metadata = {token.contract: {'decimals': token.decimals, 'price_id': token.price_id} for token in tokens
+                if token.chain == 'ethereum'}
+    print(f"{len(txs):,} transfers, {len(tokens)} tracked assets, best of {args.rounds}\n")
+
+    slow = best_of(args.rounds, lambda: naive(txs, metadata, PRICES))
+    expected = [tx.usd for tx in txs]
+    fast = best_of(args.rounds, lambda: feed.value(txs))
+    assert all(abs(tx.usd - usd) <= 1e-9 * usd for tx, usd in zip(txs, expected))
+
+    print(f"  per transfer  {slow * 1000:>7.2f} ms  {slow / len(txs) * 1e9:>6.0f} ns/transfer")
+    print(f"  batch         {fast * 1000:>7.2f} ms  {fast / len(txs) * 1e9:>6.0f} ns/transfer  "
+          f"({slow / fast:.1f}x)")
+    asyncio.run(parse(args, TokenSet.load()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--transfers', type=int, default=10_000)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--history', type=int, default=2_000)
+    main(parser.parse_args())
@@ -0,0 +1,109 @@
+"""
+Benchmark: per-user watchlists, deduplicated polling and inverted-index routing
+- --users chats each /watch up to WATCH_LIMIT addresses drawn from a pool
+  where a few addresses are popular (everyone watches the big whales) and
+  most are watched by one chat
+- Polling: one TransferPoller over the merged set against a mock Etherscan;
+  Etherscan requests per cycle vs the users x addresses a per-user poll
+  would make
+- Routing: each new transfer to its watchers through the inverted index vs
+  scanning every watchlist; both must deliver the same (chat, tx) pairs
+
+    python -m bench.bench_watchlists [--users 10000] [--pool 5000] [--cycles 3]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+from bench.mock_servers import MockEtherscan, make_address
+from whalefollow.etherscan import RateLimiter
+from whalefollow.poller import TransferPoller
+from whalefollow.settings import MemoryStore
+from whalefollow.watchlists import WATCH_LIMIT, WatchIndex, add_watch, short_address
+
+TRACKED = 20  # whales the bot already follows; some users watch them too
+
+
+def naive_route(store_rows, rows):
+    """Every watchlist checked against every transfer"""
+    lists = {}
+    for chat_id, chain, address in store_rows:
+        lists.setdefault(chat_id, set()).add((chain, address))
+    routed = []
+    for row in reversed(rows):
+        tx = row[2]
+        keys = {(tx.chain, tx.sender.lower()), (tx.chain, tx.to.lower())}
+        chats = [chat_id for chat_id, watched in lists.items() if keys & watched]
+        if chats:
+            routed.append((chats, row))
+    return routed
+
+
+async def main(args):
+    rng = random.Random(22)
+    pool = [make_address(i) for i in range(args.pool)]
+    weights = [1 / (i + 1) ** 0.8 for i in range(args.pool)]
+    store = MemoryStore()
+    start = time.perf_counter()
+    requests = statuses = 0
+    for chat_id in range(1, args.users + 1):
+        for address in rng.choices(pool, weights, k=rng.randint(1, args.limit)):
+            statuses += add_watch(store, chat_id, address, limit=args.limit)[0] == 'added'
+            requests += 1
+    elapsed = time.perf_counter() - start
+    rows = store.watches()
+    index = WatchIndex(rows)
+    stats = index.stats()
+    print(f"{args.users:,} chats, {stats['watches']:,} watches of {stats['addresses']:,} unique addresses "
+          f"({requests:,} /watch calls, {statuses:,} added, {elapsed / requests * 1e6:.1f} us each)\n")
+
+    tracked = {f'Whale {i + 1}': pool[i] for i in range(TRACKED)}
+    async with MockEtherscan(latency=args.latency, history=5) as server:
+        poller = TransferPoller(tracked, 'KEY', url=server.api_url, limiter=RateLimiter(args.rps),
+                                concurrency=args.concurrency, deadline=120)
+        start = time.perf_counter()
+        poller.watch({address: short_address(address) for address in index.addresses('ethereum')})
+        watch_elapsed = time.perf_counter() - start
+        async with httpx.AsyncClient(timeout=30.0, limits=httpx.Limits(max_connections=args.concurrency)) as client:
+            await poller.poll(client)  # seeds every cursor
+            for cycle in range(1, args.cycles + 1):
+                server.advance(1)
+                before = server.requests
+                start = time.perf_counter()
+                new = await poller.poll(client)
+                poll_elapsed = time.perf_counter() - start
+                requests = server.requests - before
+
+                start = time.perf_counter()
+                routed = index.route(new)
+                route_elapsed = time.perf_counter() - start
+                start = time.perf_counter()
+                naive = naive_route(rows, new)
+                naive_elapsed = time.perf_counter() - start
+                same = sorted((tuple(chats), row[2].hash) for chats, row in routed) == \
+                    sorted((tuple(sorted(chats)), row[2].hash) for chats, row in naive)
+                deliveries = sum(len(chats) for chats, _ in routed)
+                print(f"  cycle {cycle}: {requests:,} Etherscan requests ({len(poller.wallets):,} polled, "
+                      f"{TRACKED} tracked) vs {stats['watches'] + TRACKED:,} polling per user "
+                      f"({(stats['watches'] + TRACKED) / requests:.1f}x); poll {poll_elapsed:.2f}s")
+                print(f"           {len(new):,} new transfers -> {deliveries:,} deliveries: index "
+                      f"{route_elapsed * 1000:.2f} ms vs scanning watchlists {naive_elapsed * 1000:.0f} ms "
+                      f"({naive_elapsed / max(route_elapsed, 1e-9):,.0f}x), {'identical' if same else 'DIFFER'}")
+                assert same and deliveries >= stats['watches']
+    print(f"\n  watch() of the merged set: {watch_elapsed * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--pool', type=int, default=5_000)
+    parser.add_argument('--limit', type=int, default=WATCH_LIMIT)
+    parser.add_argument('--cycles', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--rps', type=float, default=10_000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    asyncio.run(main(parser.parse_args()))
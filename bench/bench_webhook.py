@@ -0,0 +1,106 @@
+"""
+Benchmark: api/webhook.py wall time per callback update
+- before: urllib.request per call (new TCP + TLS connection), answer then edit
+- pool: keep-alive ConnectionPool, answer concurrent with the edit
+- inline: edit returned in the webhook response, answer sent after it
+Runs against a local HTTPS stand-in that charges `--rtt` per round trip.
+
+    python -m bench.bench_webhook [--updates 50] [--rtt 0.02]
+"""
+
+import argparse
+import json
+import ssl
+import statistics
+import time
+import urllib.request
+
+from api import webhook
+from bench.mock_servers import TelegramStandIn, self_signed_cert
+
+
+def callback_update(i):
+    return {
+        'id': str(i),
+        'data': 'top_wallets',
+        'message': {'message_id': i, 'chat': {'id': 1000 + i % 7}},
+    }
+
+
+def urllib_api(base_url, context):
+    """telegram_api as it was before the pool"""
+    def telegram_api(method, data):
+        req = urllib.request.Request(
+            f"{base_url}/bot{webhook.TELEGRAM_TOKEN}/{method}",
+            data=json.dumps(data).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}
+        )
+        with urllib.request.urlopen(req, timeout=10, context=context) as response:
+            return json.loads(response.read().decode('utf-8'))
+    return telegram_api
+
+
+def before(update):
+    """Old handle_callback: blocking answer, then the edit"""
+    webhook.answer_callback(update['id'])
+    payload = dict(webhook.route_callback(update['message']['chat']['id'], update['message']['message_id'],
+                                          update['data']))
+    webhook.telegram_api(payload.pop('method'), payload)
+
+
+def out_of_band(update):
+    webhook.INLINE_REPLIES = False
+    _, deferred = webhook.handle_update({'callback_query': update})
+    webhook.run_deferred(deferred)
+
+
+def inline(update):
+    """Returns when the response could be written; deferred calls run after"""
+    webhook.INLINE_REPLIES = True
+    _, deferred = webhook.handle_update({'callback_query': update})
+    return deferred
+
+
+def run(label, handle, updates):
+    times, totals, any_deferred = [], [], False
+    for i in range(updates):
+        start = time.perf_counter()
+        deferred = handle(callback_update(i))
+        times.append(time.perf_counter() - start)
+        if deferred:
+            any_deferred = True
+            webhook.run_deferred(deferred)
+        totals.append(time.perf_counter() - start)
+    line = (f"{label:<8} first {times[0] * 1000:6.1f} ms | warm mean {statistics.mean(times[1:]) * 1000:6.1f} ms, "
+            f"p95 {sorted(times)[int(len(times) * .95)] * 1000:6.1f} ms")
+    if any_deferred:
+        line += f" | incl. deferred {statistics.mean(totals[1:]) * 1000:6.1f} ms"
+    print(line)
+
+
+def main(args):
+    cert, key = self_signed_cert()
+    context = ssl.create_default_context(cafile=cert)
+    original = webhook.telegram_api
+
+    with TelegramStandIn(rtt=args.rtt, certfile=cert, keyfile=key) as server:
+        print(f"HTTPS stand-in, {args.rtt * 1000:.0f} ms per round trip, {args.updates} updates\n")
+
+        webhook.telegram_api = urllib_api(server.url, context)
+        run('before', before, args.updates)
+        webhook.telegram_api = original
+        opened = server.connections
+
+        webhook.POOL = webhook.ConnectionPool(server.url, ssl_context=context)
+        run('pool', out_of_band, args.updates)
+        run('inline', inline, args.updates)
+
+    print(f"\nconnections opened: before {opened}, pool + inline {server.connections - opened}")
+    print("inline: time until the webhook response is written (what Telegram waits on)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--updates', type=int, default=50)
+    parser.add_argument('--rtt', type=float, default=0.02)
+    main(parser.parse_args())
@@ -0,0 +1,129 @@
+"""
+Benchmark: bot.py in webhook mode, handlers in the front vs in worker processes
+- Starts `python bot.py` with WEBHOOK_URL against a fake Bot API, once per
+  --workers count (0: handlers in the front process)
+- POSTs callback updates at --rate per second for --seconds, spread over
+  --chats chats, and times each update from POST to the edit reaching the
+  fake Bot API: p50/p99 and throughput
+- Checks that every chat's edits arrive in the order its updates were sent
+
+    python -m bench.bench_webhook_workers [--workers 0,1,4] [--rate 100] [--seconds 5] [--chats 200]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from bench.mock_servers import FakeTelegram
+
+ROUTES = ('wallets', 'stats', 'referral', 'settings', 'trade', 'menu')
+SECRET = 'bench-secret'
+
+
+class TimedTelegram(FakeTelegram):
+    """Records when the edit for each update's message arrives, per chat in arrival order"""
+
+    def __init__(self):
+        super().__init__()
+        self.edited = {}  # message_id -> time.perf_counter()
+        self.order = {}  # chat_id -> [message_id, ...]
+
+    def answer(self, method, data):
+        if method == 'editMessageText':
+            message_id = int(data['message_id'])
+            self.edited[message_id] = time.perf_counter()
+            self.order.setdefault(int(data['chat_id']), []).append(message_id)
+        return super().answer(method, data)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def callback_update(i, chats):
+    chat = {'id': 10_000 + i % chats, 'type': 'private'}
+    return {'update_id': i, 'callback_query': {
+        'id': str(i), 'chat_instance': '1', 'data': ROUTES[i % len(ROUTES)],
+        'from': {'id': chat['id'], 'is_bot': False, 'first_name': 'Ann'},
+        'message': {'message_id': i, 'date': 0, 'chat': chat, 'text': 'menu'},
+    }}
+
+
+def pct(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(p * len(samples)))] if samples else 0.0
+
+
+async def run(workers, args):
+    async with TimedTelegram() as telegram:
+        port = free_port()
+        env = {key: value for key, value in os.environ.items()
+               if key not in ('ETHERSCAN_API', 'ETHERSCAN_KEY', 'HELIUS_KEY', 'SOLSCAN_API', 'ETH_WS_URL')}
+        env.update(BOT_TOKEN='1:bench', WEBHOOK_URL='https://bench.invalid', WEBHOOK_SECRET=SECRET,
+                   WEBHOOK_WORKERS=str(workers), PORT=str(port), TELEGRAM_API_URL=telegram.api_url,
+                   SETTINGS_URL=f'sqlite:///{tempfile.mkdtemp(prefix="whalefollow-bench-")}/settings.db',
+                   SEND_RATE='100000', SEND_BURST='1000', SEND_CHAT_RATE='1000', SEND_CHAT_BURST='1000')
+        process = await asyncio.create_subprocess_exec(sys.executable, 'bot.py', env=env,
+                                                       stderr=asyncio.subprocess.DEVNULL)
+        # Ready once the webhook is registered and every worker has fetched getMe
+        deadline = time.monotonic() + 60
+        while not telegram.calls['setWebhook'] or telegram.calls['getMe'] < workers + 1:
+            if time.monotonic() > deadline or process.returncode is not None:
+                raise RuntimeError(f"bot.py with {workers} workers did not start")
+            await asyncio.sleep(0.05)
+
+        url = f'http://127.0.0.1:{port}/telegram'
+        headers = {'X-Telegram-Bot-Api-Secret-Token': SECRET}
+        total = int(args.rate * args.seconds)
+        posted = {}
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+            async def post(i):
+                posted[i] = time.perf_counter()
+                async with session.post(url, json=callback_update(i, args.chats), headers=headers) as response:
+                    assert response.status == 200, response.status
+
+            # Open loop: update i is sent at i / rate, however far behind the bot is
+            start = time.perf_counter()
+            tasks = []
+            for i in range(1, total + 1):
+                delay = start + i / args.rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(post(i)))
+            await asyncio.gather(*tasks)
+        while len(telegram.edited) < total and time.perf_counter() - start < args.seconds + 60:
+            await asyncio.sleep(0.01)
+        elapsed = max(telegram.edited.values(), default=start) - start
+        process.terminate()
+        await process.wait()
+
+    latencies = [telegram.edited[i] - posted[i] for i in posted if i in telegram.edited]
+    in_order = all(ids == sorted(ids) for ids in telegram.order.values())
+    label = f"{workers} workers" if workers else "in front"
+    print(f"  {label:<10}  {len(latencies):,}/{total:,} edited, {len(latencies) / elapsed:,.0f} updates/s, "
+          f"p50 {pct(latencies, .5) * 1000:.1f} ms, p99 {pct(latencies, .99) * 1000:.1f} ms, "
+          f"per-chat order {'kept' if in_order else 'BROKEN'}")
+
+
+def main(args):
+    print(f"{args.rate:g} callback updates/s for {args.seconds:g}s over {args.chats} chats, "
+          f"{os.cpu_count()} CPU(s)\n")
+    for workers in args.workers:
+        asyncio.run(run(workers, args))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=lambda s: [int(n) for n in s.split(',')], default=[0, 1, 4])
+    parser.add_argument('--rate', type=float, default=100)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--chats', type=int, default=100)
+    main(parser.parse_args())
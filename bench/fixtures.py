@@ -0,0 +1,192 @@
+"""
+WhaleFollow Pro - recorded upstream fixtures for benchmarks
+- Fixture: HTTP exchanges with Etherscan, the Bot API, the price feed, ...
+  in one gzipped JSON-lines file, each distinct body stored once
+- Recorder: proxy in front of the upstreams that records every exchange;
+  the bot reaches it through its *_URL settings (route())
+- ReplayServer: serves a fixture back at `speed` times the recorded pace
+  (0: no delay); each request key replays its responses in recorded order,
+  then keeps answering with the last one
+
+Request keys leave out credentials (the token in Bot API paths, API key
+parameters) and the cursors that move between polls (startblock...), so a
+replay matches however far the recording got. Bodies are stored as
+recorded: a Bot API recording holds whatever users sent the bot.
+"""
+
+import asyncio
+import gzip
+import json
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+
+import aiohttp
+from aiohttp import web
+
+from bench.mock_servers import MockServer
+
+FORMAT = 'whalefollow-fixture'
+VERSION = 1
+
+# Upstreams the bot calls: name -> (setting that points the bot at it, default URL)
+UPSTREAMS = {
+    'etherscan': ('ETHERSCAN_URL', 'https://api.etherscan.io/api'),
+    'telegram': ('TELEGRAM_API_URL', 'https://api.telegram.org/bot'),
+    'prices': ('PRICE_URL', 'https://api.coingecko.com/api/v3/simple/price'),
+    'helius': ('HELIUS_URL', 'https://api.helius.xyz'),
+    'solscan': ('SOLSCAN_URL', 'https://pro-api.solscan.io'),
+}
+
+# Left out of request keys: secrets and per-poll cursors
+IGNORED_PARAMS = frozenset({'apikey', 'api-key', 'api_key', 'startblock', 'endblock', 'before', 'until'})
+
+
+def request_key(path, query):
+    """'<path>?<sorted query>', without the Bot API token and IGNORED_PARAMS"""
+    path = '/'.join('bot' if part.startswith('bot') and ':' in part else part for part in path.split('/'))
+    params = '&'.join(f'{k}={v}' for k, v in sorted(query.items()) if k.lower() not in IGNORED_PARAMS)
+    return path + ('?' + params if params else '')
+
+
+class Fixture:
+    """Recorded exchanges in order: (upstream, key, status, latency s, content type, body bytes).
+
+    At most `per_key` responses are kept per request key; a fan-out of 100k
+    sendMessage calls needs a few answers, not all of them.
+    """
+
+    def __init__(self, upstreams=None, per_key=100):
+        self.upstreams = dict(upstreams or {})  # name -> base URL recorded from
+        self.per_key = per_key
+        self.exchanges = []
+        self._counts = Counter()  # (upstream, key) -> exchanges kept
+
+    def __len__(self):
+        return len(self.exchanges)
+
+    def add(self, upstream, key, status, latency, content_type, body):
+        if self._counts[upstream, key] >= self.per_key:
+            return
+        self._counts[upstream, key] += 1
+        self.exchanges.append((upstream, key, status, latency, content_type, body))
+
+    def stats(self):
+        return {'exchanges': len(self.exchanges), 'keys': len(self._counts),
+                'upstreams': dict(Counter(exchange[0] for exchange in self.exchanges))}
+
+    def save(self, path):
+        """Header line, then ["b", body] the first time a body occurs and
+        ["x", upstream, key, status, latency, content type, body number]"""
+        bodies = {}
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            f.write(json.dumps({'format': FORMAT, 'version': VERSION, 'upstreams': self.upstreams,
+                                'per_key': self.per_key}) + '\n')
+            for upstream, key, status, latency, content_type, body in self.exchanges:
+                if body not in bodies:
+                    bodies[body] = len(bodies)
+                    f.write(json.dumps(['b', body.decode('utf-8', 'replace')], ensure_ascii=False) + '\n')
+                f.write(json.dumps(['x', upstream, key, status, round(latency, 4), content_type, bodies[body]]) + '\n')
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            if header.get('format') != FORMAT or header.get('version') != VERSION:
+                raise ValueError(f"{path}: not a {FORMAT} v{VERSION} file")
+            fixture = cls(header['upstreams'], header['per_key'])
+            bodies = []
+            for line in f:
+                row = json.loads(line)
+                if row[0] == 'b':
+                    bodies.append(row[1].encode())
+                else:
+                    _, upstream, key, status, latency, content_type, body = row
+                    fixture.add(upstream, key, status, latency, content_type, bodies[body])
+        return fixture
+
+
+class _Upstreams(MockServer):
+    """Serves /<upstream name>/<path of the real URL>"""
+
+    def __init__(self):
+        super().__init__()
+        self.app.router.add_route('*', '/{upstream}', self.handle)
+        self.app.router.add_route('*', '/{upstream}/{path:.*}', self.handle)
+
+    def route(self, name, url):
+        """Where the bot should call instead of `url` (an upstream URL as in its settings)"""
+        return f'{self.url}/{name}{urlsplit(url).path}'
+
+    @staticmethod
+    def path(request):
+        return '/' + request.match_info.get('path', '')
+
+
+class Recorder(_Upstreams):
+    """Forwards each request to its real upstream and records the exchange in `fixture`"""
+
+    def __init__(self, fixture=None):
+        super().__init__()
+        self.fixture = fixture if fixture is not None else Fixture()
+        self._session = None
+
+    def route(self, name, url):
+        parts = urlsplit(url)
+        self.fixture.upstreams[name] = f'{parts.scheme}://{parts.netloc}'
+        return super().route(name, url)
+
+    async def __aenter__(self):
+        await super().__aenter__()
+        self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=120))
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+        await super().__aexit__(*exc)
+
+    async def handle(self, request):
+        name = request.match_info['upstream']
+        base = self.fixture.upstreams.get(name)
+        if base is None:
+            return web.Response(status=404)
+        path = self.path(request)
+        headers = {k: v for k, v in request.headers.items()
+                   if k.lower() not in ('host', 'content-length', 'accept-encoding', 'connection')}
+        started = time.perf_counter()
+        async with self._session.request(request.method, base + path, params=request.query,
+                                         data=await request.read(), headers=headers) as response:
+            body = await response.read()
+            status, content_type = response.status, response.content_type
+        self.requests += 1
+        self.fixture.add(name, request_key(path, request.query), status, time.perf_counter() - started,
+                         content_type, body)
+        return web.Response(body=body, status=status, content_type=content_type)
+
+
+class ReplayServer(_Upstreams):
+    """Answers from a Fixture; unknown keys get a 404 and are counted in `misses`"""
+
+    def __init__(self, fixture, speed=1.0):
+        super().__init__()
+        self.speed = speed
+        self.recorded = defaultdict(list)  # (upstream, key) -> exchanges in recorded order
+        for exchange in fixture.exchanges:
+            self.recorded[exchange[0], exchange[1]].append(exchange)
+        self.served = Counter()  # (upstream, key) -> responses served
+        self.misses = Counter()  # upstream -> requests without a recording
+
+    async def handle(self, request):
+        name = request.match_info['upstream']
+        key = (name, request_key(self.path(request), request.query))
+        recorded = self.recorded.get(key)
+        self.requests += 1
+        if not recorded:
+            self.misses[name] += 1
+            return web.json_response({'ok': False, 'error_code': 404, 'description': f'not in fixture: {key[1]}'},
+                                     status=404)
+        _, _, status, latency, content_type, body = recorded[min(self.served[key], len(recorded) - 1)]
+        self.served[key] += 1
+        if self.speed:
+            await asyncio.sleep(latency / self.speed)
+        return web.Response(body=body, status=status, content_type=content_type)
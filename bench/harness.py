@@ -0,0 +1,297 @@
+"""
+Benchmark harness: bot.py end to end against recorded upstreams, with a JSON
+report for regression comparison
+- Replays a fixture (bench.fixtures; record one from the real APIs with
+  bench.record) of Etherscan, the price feed and the Bot API at --speed
+  times the recorded pace (0: no upstream delay)
+- Without --fixture, or if the file does not exist yet, first records one
+  from the local mock upstreams (--record does only that)
+- Scenarios, run through bot.py's own handlers, stream and alert engine:
+    menu       menu taps and /start: per-update latency, updates/s
+    transfers  first poll of the tracked wallets, then Recent Transfers taps
+    fanout     one whale transfer to --users subscribers (10k, 100k) through
+               the alert engine and send queue
+- Telegram and alert rate limits are lifted and the Etherscan budget raised
+  (ETHERSCAN_RPS=1000): the numbers are the bot's own cost
+- --baseline compares with an earlier report and exits 1 when a latency or
+  throughput metric is worse by more than --tolerance
+
+    python -m bench.harness [--fixture F] [--record] [--speed 1] [--scenarios menu,transfers,fanout]
+                            [--users 10000,100000] [--taps 300] [--report out.json] [--baseline old.json]
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from functools import partial
+
+from bench.fixtures import UPSTREAMS, Fixture, Recorder, ReplayServer
+from bench.mock_servers import FakeTelegram, MockEtherscan, MockPrices, make_tx
+
+DEFAULT_FIXTURE = os.path.join(tempfile.gettempdir(), 'whalefollow-harness.jsonl.gz')
+SCENARIOS = ('menu', 'transfers', 'fanout')
+MENU = ('menu', 'wallets', 'settings', 'trade', 'stats', 'referral', 'alerts', 'flows', 'api_status')
+THRESHOLDS = (10, 50, 100, 250, 500, 1000, 5000)
+ALERT_ETH = 1000  # the fan-out transfer; reaches the subscribers with thresholds up to this
+
+# Set before bot.py is imported: its settings are read at import time
+BENCH_ENV = {
+    'BOT_TOKEN': '1:harness', 'ETHERSCAN_API': 'harness', 'SETTINGS_URL': 'memory://', 'ETHERSCAN_RPS': '1000',
+    'SEND_RATE': '1e9', 'SEND_BURST': '1e9', 'SEND_CHAT_RATE': '1e9', 'SEND_CHAT_BURST': '1e9', 'ALERT_RPS': '1e9',
+}
+UNSET_ENV = ('HELIUS_KEY', 'SOLSCAN_API', 'ETH_WS_URL', 'WEBHOOK_URL', 'WEBHOOK_WORKERS')
+HARNESS_UPSTREAMS = ('etherscan', 'telegram', 'prices')
+
+
+def pct(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(p * len(samples)))] if samples else 0.0
+
+
+def ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def import_bot(server, urls=None):
+    """bot.py with its upstreams on `server`: a ReplayServer, or a Recorder in front of `urls`"""
+    for name in HARNESS_UPSTREAMS:
+        setting, default = UPSTREAMS[name]
+        os.environ[setting] = server.route(name, (urls or {}).get(name, default))
+    os.environ.update(BENCH_ENV)
+    for name in UNSET_ENV:
+        os.environ.pop(name, None)
+    return importlib.import_module('bot')
+
+
+def callback_update(i, data):
+    chat = {'id': 500_000 + i % 1000, 'type': 'private'}
+    return {'update_id': i, 'callback_query': {
+        'id': str(i), 'chat_instance': '1', 'data': data,
+        'from': {'id': chat['id'], 'is_bot': False, 'first_name': 'Ann'},
+        'message': {'message_id': i, 'date': 0, 'chat': chat, 'text': 'menu'},
+    }}
+
+
+def command_update(i, text):
+    chat = {'id': 500_000 + i % 1000, 'type': 'private'}
+    return {'update_id': i, 'message': {
+        'message_id': i, 'date': 0, 'chat': chat, 'text': text,
+        'from': {'id': chat['id'], 'is_bot': False, 'first_name': 'Ann'},
+        'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(text)}],
+    }}
+
+
+async def timed_updates(bot, app, updates):
+    """Process updates one at a time; [(seconds)] per update"""
+    latencies = []
+    for data in updates:
+        update = bot.Update.de_json(data, app.bot)
+        started = time.perf_counter()
+        await app.process_update(update)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def menu(bot, app, args):
+    updates = [command_update(i, '/start') if i % (len(MENU) + 1) == len(MENU)
+               else callback_update(i, MENU[i % (len(MENU) + 1)]) for i in range(args.taps)]
+    started = time.perf_counter()
+    latencies = await timed_updates(bot, app, updates)
+    elapsed = time.perf_counter() - started
+    return {'updates': len(updates), 'p50_ms': ms(pct(latencies, .5)), 'p99_ms': ms(pct(latencies, .99)),
+            'updates_per_s': round(len(updates) / elapsed, 1)}
+
+
+async def transfers(bot, app, args):
+    started = time.perf_counter()
+    bot.STREAM.start()
+    await bot.STREAM.ready(timeout=60)
+    first_poll = time.perf_counter() - started
+    rows = len(bot.STREAM.latest())
+    updates = [callback_update(i, 'transfers') for i in range(args.taps)]
+    started = time.perf_counter()
+    latencies = await timed_updates(bot, app, updates)
+    elapsed = time.perf_counter() - started
+    await bot.STREAM.stop()
+    view = bot.TRANSFERS_VIEW.stats()
+    return {'wallets': len(bot.WHALE_WALLETS), 'transfers': rows, 'first_poll_s': round(first_poll, 3),
+            'taps': len(updates), 'p50_ms': ms(pct(latencies, .5)), 'p99_ms': ms(pct(latencies, .99)),
+            'taps_per_s': round(len(updates) / elapsed, 1), 'renders': view['renders'], 'render_hits': view['hits']}
+
+
+class OnePoll:
+    """Poller stand-in: one batch of transfers, then nothing (blocks like a StreamReader)"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def poll(self, client):
+        if not self.rows:
+            await asyncio.Event().wait()
+        rows, self.rows = self.rows, []
+        return rows
+
+
+async def fanout(bot, app, users):
+    from whalefollow.alerts import AlertEngine, format_alert
+    from whalefollow.settings import MemoryStore
+    from whalefollow.txstream import Tx
+
+    rng = random.Random(users)
+    store = MemoryStore()
+    expected = 0
+    for i in range(users):
+        threshold = rng.choice(THRESHOLDS)
+        store.update(100_000_000 + i, alerts=True, threshold=threshold)
+        expected += threshold <= ALERT_ETH
+    name, address = next(iter(bot.WHALE_WALLETS.items()))
+    row = make_tx(rng, address, 18_000_000)
+    row.update({'from': address, 'value': str(ALERT_ETH * 10**18)})
+    bot.SEND_QUEUE.latencies.clear()
+    engine = AlertEngine(OnePoll([(name, address, Tx.from_row(row))]), lambda: None,
+                         lambda chat_id, text: bot.send_alert(app.bot, chat_id, text), interval=0,
+                         store=store, prices=bot.PRICES, formatter=partial(format_alert, labels=bot.STREAM.label))
+    started = time.perf_counter()
+    task = asyncio.create_task(engine.run())
+    while engine.matched < expected:  # reload from the store, match, queue
+        await asyncio.sleep(0.001)
+    matched = time.perf_counter() - started
+    await engine.queue.join()
+    elapsed = time.perf_counter() - started
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    sends = bot.SEND_QUEUE.stats()
+    return {'users': users, 'alerts': engine.sent, 'failed': engine.failed, 'match_ms': ms(matched),
+            'delivery_s': round(elapsed, 3), 'alerts_per_s': round(engine.sent / elapsed, 1),
+            'send_p50_ms': ms(sends['latency_p50']), 'send_p95_ms': ms(sends['latency_p95'])}
+
+
+async def run_scenarios(bot, args):
+    results = {}
+    app = bot.build_app()
+    async with app:  # initialize (getMe) / shutdown
+        for scenario in args.scenarios:
+            if scenario == 'fanout':
+                for users in args.users:
+                    print(f"  fanout {users:,} users...", flush=True)
+                    results[f'fanout_{users}'] = await fanout(bot, app, users)
+            else:
+                print(f"  {scenario}...", flush=True)
+                results[scenario] = await globals()[scenario](bot, app, args)
+    return results
+
+
+async def record(args):
+    """Run the scenarios against the mock upstreams through a Recorder"""
+    async with MockEtherscan(latency=0.2) as eth, FakeTelegram(latency=0.02) as telegram, \
+            MockPrices(latency=0.1) as prices, Recorder(Fixture(per_key=args.per_key)) as recorder:
+        bot = import_bot(recorder, {'etherscan': eth.api_url, 'telegram': telegram.api_url, 'prices': prices.api_url})
+        await run_scenarios(bot, args)
+    recorder.fixture.save(args.fixture)
+    stats = recorder.fixture.stats()
+    print(f"Recorded {stats['exchanges']:,} exchanges ({stats['keys']:,} request keys) to {args.fixture}")
+
+
+async def replay(args):
+    fixture = Fixture.load(args.fixture)
+    async with ReplayServer(fixture, speed=args.speed) as server:
+        bot = import_bot(server)
+        scenarios = await run_scenarios(bot, args)
+    return {
+        'harness': 1,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'fixture': {'path': args.fixture, **fixture.stats()},
+        'speed': args.speed,
+        'replay_misses': dict(server.misses),
+        'scenarios': scenarios,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def direction(metric):
+    """+1 if higher is better, -1 if lower is better, None for counts"""
+    if metric.endswith('_per_s'):
+        return 1
+    if metric.endswith(('_ms', '_s')):
+        return -1
+    return None
+
+
+def compare(report, baseline, tolerance):
+    """Print every timed metric against the baseline; returns the regressions"""
+    regressions = []
+    print(f"\nAgainst {baseline.get('commit') or 'baseline'} ({baseline.get('created')}), tolerance {tolerance:.0%}:")
+    for scenario, metrics in report['scenarios'].items():
+        old = baseline.get('scenarios', {}).get(scenario, {})
+        for metric, value in metrics.items():
+            better = direction(metric)
+            if better is None or not old.get(metric):
+                continue
+            change = (value - old[metric]) / old[metric]
+            worse = change * better < -tolerance
+            if worse:
+                regressions.append(f'{scenario}.{metric}')
+            print(f"  {scenario + '.' + metric:<28} {old[metric]:>12,.3f} -> {value:>12,.3f}  {change:+7.1%}"
+                  + ('  REGRESSION' if worse else ''))
+    return regressions
+
+
+def main(args):
+    if args.record:
+        asyncio.run(record(args))
+        return
+    if not os.path.exists(args.fixture):
+        print(f"No fixture at {args.fixture}: recording one from the mock upstreams")
+        # Separate process: bot.py reads its upstream URLs once, at import
+        subprocess.run([sys.executable, '-m', 'bench.harness', '--record', '--fixture', args.fixture,
+                        '--scenarios', ','.join(args.scenarios), '--users', ','.join(map(str, args.users)),
+                        '--taps', str(args.taps), '--per-key', str(args.per_key)], check=True)
+    print(f"Replaying {args.fixture} at speed {args.speed:g}")
+    report = asyncio.run(replay(args))
+    print(json.dumps(report['scenarios'], indent=2))
+    if report['replay_misses']:
+        print(f"Requests missing from the fixture: {report['replay_misses']}")
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.report}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fixture', default=DEFAULT_FIXTURE)
+    parser.add_argument('--record', action='store_true', help='record --fixture from the mock upstreams and exit')
+    parser.add_argument('--speed', type=float, default=1.0)
+    parser.add_argument('--scenarios', type=lambda s: s.split(','), default=list(SCENARIOS))
+    parser.add_argument('--users', type=lambda s: [int(n) for n in s.split(',')], default=[10_000, 100_000])
+    parser.add_argument('--taps', type=int, default=300)
+    parser.add_argument('--per-key', type=int, default=100)
+    parser.add_argument('--report')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    main(parser.parse_args())
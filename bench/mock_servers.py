@@ -0,0 +1,571 @@
+"""
+WhaleFollow Pro - local upstream stand-ins for benchmarks
+- MockEtherscan: account/txlist and account/tokentx with configurable latency,
+  a per-key rate quota ("Max rate limit reached") and forced outages
+- MockSolana: Helius parsed-transaction history and Solscan v2 transfers
+- MockPrices: CoinGecko simple/price with fixed USD quotes
+- MockEthNode: WebSocket JSON-RPC node replaying recorded (or synthetic)
+  blocks and Transfer logs as newHeads, with forced disconnects
+- FakeTelegram: Bot API endpoint that records calls, optionally answering
+  429 + retry_after when Telegram's flood limits are exceeded
+- TelegramStandIn: blocking HTTP(S) Bot API on a thread, for the sync webhook,
+  with simulated round trips for handshakes and requests
+"""
+
+import asyncio
+import json
+import os
+import random
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from aiohttp import web
+
+
+def make_address(i):
+    return '0x' + f'{i:040x}'
+
+
+def make_tx(rng, address, block, counterparty=None):
+    """Synthetic Etherscan txlist row for `address`"""
+    counterparty = counterparty or '0x' + ''.join(rng.choice('0123456789abcdef') for _ in range(40))
+    outgoing = rng.random() < 0.5
+    return {
+        'blockNumber': str(block),
+        'timeStamp': str(1_700_000_000 + block * 12),
+        'hash': '0x' + ''.join(rng.choice('0123456789abcdef') for _ in range(64)),
+        'from': address if outgoing else counterparty,
+        'to': counterparty if outgoing else address,
+        'value': str(rng.randint(1, 5_000) * 10**18),
+        'gas': '21000',
+        'gasPrice': '20000000000',
+        'isError': '0',
+        'input': '0x',
+        'confirmations': '12',
+    }
+
+
+# contract, symbol, decimals: the ERC-20s of data/tokens.csv plus one untracked
+TOKENS = [
+    ('0xdac17f958d2ee523a2206206994597c13d831ec7', 'USDT', 6),
+    ('0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48', 'USDC', 6),
+    ('0x6b175474e89094c44da98b954eedeac495271d0f', 'DAI', 18),
+    ('0x2260fac5e5542a773aa44fbcfedf7c193bc2c599', 'WBTC', 8),
+    ('0x514910771af9ca656af840dff83e8264ecf986ca', 'LINK', 18),
+    ('0x95ad61b0a150d79219dcf64e1e6cc01f0b64c4ce', 'SHIB', 18),
+]
+
+
+def make_token_tx(rng, address, block, counterparty=None):
+    """Synthetic Etherscan tokentx row for `address`"""
+    tx = make_tx(rng, address, block, counterparty)
+    contract, symbol, decimals = rng.choice(TOKENS)
+    tx.update({
+        'value': str(rng.randint(1, 5_000_000) * 10**decimals),
+        'contractAddress': contract,
+        'tokenName': symbol,
+        'tokenSymbol': symbol,
+        'tokenDecimal': str(decimals),
+    })
+    return tx
+
+
+class MockServer:
+    """aiohttp app on 127.0.0.1:<random port>, usable as an async context manager"""
+
+    def __init__(self):
+        self.app = web.Application()
+        self.requests = 0
+        self._runner = None
+        self.url = None
+
+    async def __aenter__(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://127.0.0.1:{port}'
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._runner.cleanup()
+
+
+class MockEtherscan(MockServer):
+    """Serves /api?module=account&action=txlist|tokentx from a synthetic chain history"""
+
+    def __init__(self, latency=0.2, slow=None, history=50, seed=1, quota=None):
+        super().__init__()
+        self.latency = latency
+        self.slow = slow or {}  # address -> latency override
+        self.quota = quota  # calls per second per API key; more get a "rate limit" result
+        self.outage = None  # 'error': HTTP 503, 'hang': no answer for 30s
+        self.limited = 0
+        self.keys = Counter()  # apikey -> requests
+        self._calls = {}  # apikey -> deque of recent call times
+        self.history = history
+        self.rng = random.Random(seed)
+        self.txs = {}  # address -> [tx, ...] oldest first
+        self.token_txs = {}  # address -> [tokentx row, ...] oldest first
+        self.mined = {}  # tx hash -> time.monotonic() when advance() created it
+        self.head = 18_000_000
+        self.app.router.add_get('/api', self.handle)
+
+    def wallet(self, address):
+        if address not in self.txs:
+            self.txs[address] = [make_tx(self.rng, address, self.head - self.history + i)
+                                 for i in range(self.history)]
+        return self.txs[address]
+
+    def token_wallet(self, address):
+        if address not in self.token_txs:
+            self.token_txs[address] = [make_token_tx(self.rng, address, self.head - self.history + i)
+                                       for i in range(self.history)]
+        return self.token_txs[address]
+
+    def advance(self, blocks=1, per_wallet=1):
+        """Mine `blocks` new blocks with `per_wallet` transfers for each known wallet"""
+        for _ in range(blocks):
+            self.head += 1
+            for history, make in ((self.txs, make_tx), (self.token_txs, make_token_tx)):
+                for address, txs in history.items():
+                    for _ in range(per_wallet):
+                        txs.append(make(self.rng, address, self.head))
+                        self.mined[txs[-1]['hash']] = time.monotonic()
+
+    @property
+    def api_url(self):
+        return self.url + '/api'
+
+    async def handle(self, request):
+        self.requests += 1
+        q = request.query
+        address = q.get('address', '').lower()
+        self.keys[q.get('apikey')] += 1
+        if self.outage == 'error':
+            return web.Response(status=503, text='Service Unavailable')
+        if self.outage == 'hang':
+            await asyncio.sleep(30)
+        if self.quota:
+            now = time.monotonic()
+            calls = self._calls.setdefault(q.get('apikey'), deque())
+            while calls and calls[0] <= now - 1.0:
+                calls.popleft()
+            if len(calls) >= self.quota:
+                self.limited += 1
+                return web.json_response({'status': '0', 'message': 'NOTOK', 'result': 'Max rate limit reached'})
+            calls.append(now)
+        await asyncio.sleep(self.slow.get(address, self.latency))
+
+        startblock = int(q.get('startblock', 0))
+        offset = int(q.get('offset', 10_000))
+        history = self.token_wallet(address) if q.get('action') == 'tokentx' else self.wallet(address)
+        result = [tx for tx in history if int(tx['blockNumber']) >= startblock]
+        if q.get('sort', 'asc') == 'desc':
+            result = result[::-1]
+        page = int(q.get('page', 1))
+        result = result[(page - 1) * offset:page * offset]
+
+        if not result:
+            return web.json_response({'status': '0', 'message': 'No transactions found', 'result': []})
+        return web.json_response({'status': '1', 'message': 'OK', 'result': result})
+
+
+B58 = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+
+def make_sol_address(i):
+    rng = random.Random(f'sol-{i}')
+    return ''.join(rng.choice(B58) for _ in range(44))
+
+
+class MockSolana(MockServer):
+    """Serves Helius /v0/addresses/{address}/transactions and Solscan
+    /v2.0/account/transfer from one synthetic slot history"""
+
+    def __init__(self, latency=0.05, history=50, seed=2):
+        super().__init__()
+        self.latency = latency
+        self.history = history
+        self.rng = random.Random(seed)
+        self.txs = {}  # address -> [transfer dict, ...] oldest first
+        self.mined = {}  # signature -> time.monotonic() when advance() created it
+        self.slot = 250_000_000
+        self.app.router.add_get('/v0/addresses/{address}/transactions', self.helius)
+        self.app.router.add_get('/v2.0/account/transfer', self.solscan)
+
+    def make_transfer(self, address, slot):
+        counterparty = ''.join(self.rng.choice(B58) for _ in range(44))
+        outgoing = self.rng.random() < 0.5
+        return {
+            'signature': ''.join(self.rng.choice(B58) for _ in range(88)),
+            'slot': slot,
+            'timestamp': int(time.time()),
+            'from': address if outgoing else counterparty,
+            'to': counterparty if outgoing else address,
+            'lamports': self.rng.randint(1, 50_000) * 10**9,
+        }
+
+    def wallet(self, address):
+        if address not in self.txs:
+            self.txs[address] = [self.make_transfer(address, self.slot - self.history + i)
+                                 for i in range(self.history)]
+        return self.txs[address]
+
+    def advance(self, slots=1, per_wallet=1):
+        for _ in range(slots):
+            self.slot += 1
+            for address, txs in self.txs.items():
+                for _ in range(per_wallet):
+                    txs.append(self.make_transfer(address, self.slot))
+                    self.mined[txs[-1]['signature']] = time.monotonic()
+
+    async def newest(self, address, limit):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return self.wallet(address)[::-1][:limit]
+
+    async def helius(self, request):
+        address = request.match_info['address']
+        rows = await self.newest(address, int(request.query.get('limit', 100)))
+        return web.json_response([{
+            'signature': t['signature'], 'slot': t['slot'], 'timestamp': t['timestamp'],
+            'type': 'TRANSFER', 'fee': 5000, 'feePayer': t['from'],
+            'nativeTransfers': [{'fromUserAccount': t['from'], 'toUserAccount': t['to'], 'amount': t['lamports']}],
+            'tokenTransfers': [],
+        } for t in rows])
+
+    async def solscan(self, request):
+        q = request.query
+        rows = await self.newest(q['address'], int(q.get('page_size', 10)))
+        return web.json_response({'success': True, 'data': [{
+            'block_id': t['slot'], 'trans_id': t['signature'], 'block_time': t['timestamp'],
+            'activity_type': 'ACTIVITY_SPL_TRANSFER', 'from_address': t['from'], 'to_address': t['to'],
+            'token_address': q.get('token'), 'token_decimals': 9, 'amount': t['lamports'],
+            'flow': 'out' if t['from'] == q['address'] else 'in',
+        } for t in rows]})
+
+
+def _random_hex(rng, length):
+    return '0x' + ''.join(rng.choice('0123456789abcdef') for _ in range(length))
+
+
+def make_block(rng, number, tracked, txs=150, hit_rate=0.02):
+    """Synthetic eth_getBlockByNumber(.., true) result; `hit_rate` of its txs touch a `tracked` address"""
+    transactions = []
+    for i in range(txs):
+        sender, to = _random_hex(rng, 40), _random_hex(rng, 40)
+        if rng.random() < hit_rate:
+            if rng.random() < 0.5:
+                sender = rng.choice(tracked)
+            else:
+                to = rng.choice(tracked)
+        transactions.append({
+            'hash': _random_hex(rng, 64), 'blockNumber': hex(number), 'transactionIndex': hex(i),
+            'from': sender, 'to': to, 'value': hex(rng.randint(0, 5_000) * 10**18),
+            'gas': hex(21_000), 'gasPrice': hex(20 * 10**9), 'nonce': hex(rng.randint(0, 10_000)), 'input': '0x',
+        })
+    return {
+        'number': hex(number), 'hash': _random_hex(rng, 64), 'parentHash': _random_hex(rng, 64),
+        'timestamp': hex(1_700_000_000 + number * 12), 'gasUsed': hex(21_000 * txs), 'transactions': transactions,
+    }
+
+
+def make_transfer_log(rng, number, contract, sender, to, value):
+    """Synthetic ERC-20 Transfer log"""
+    return {
+        'address': contract, 'blockNumber': hex(number), 'transactionHash': _random_hex(rng, 64),
+        'logIndex': hex(rng.randint(0, 300)), 'data': hex(value),
+        'topics': ['0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef',
+                   '0x' + sender[2:].rjust(64, '0'), '0x' + to[2:].rjust(64, '0')],
+    }
+
+
+# USD quotes by CoinGecko id for the tokens of data/tokens.csv
+PRICES = {'ethereum': 3200.0, 'solana': 150.0, 'tether': 1.0, 'usd-coin': 1.0, 'dai': 1.0,
+          'wrapped-bitcoin': 64000.0, 'chainlink': 15.0}
+
+
+class MockPrices(MockServer):
+    """Serves /api/v3/simple/price?ids=...&vs_currencies=usd from PRICES"""
+
+    def __init__(self, latency=0.05, prices=PRICES):
+        super().__init__()
+        self.latency = latency
+        self.prices = prices
+        self.app.router.add_get('/api/v3/simple/price', self.handle)
+
+    @property
+    def api_url(self):
+        return self.url + '/api/v3/simple/price'
+
+    async def handle(self, request):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        ids = request.query.get('ids', '').split(',')
+        return web.json_response({i: {'usd': self.prices[i]} for i in ids if i in self.prices})
+
+
+class MockEthNode(MockServer):
+    """WebSocket JSON-RPC node at ws_url replaying `blocks` (full blocks, oldest first).
+
+    Serves eth_subscribe('newHeads'), eth_blockNumber, eth_getBlockByNumber
+    and eth_getLogs over `logs`, for blocks up to the current head. mine()
+    advances the head and notifies subscribers; drop(outage) closes every
+    socket and refuses connections for `outage` seconds while mining goes on.
+    """
+
+    def __init__(self, blocks, logs=(), start=1, latency=0.0):
+        super().__init__()
+        self.blocks = {int(block['number'], 16): block for block in blocks}
+        self.logs = list(logs)
+        self.first = min(self.blocks)
+        self.head = self.first + start - 1
+        self.latency = latency
+        self.mined = {}  # tx hash -> time.monotonic() when mine() announced its block
+        self.sockets = set()
+        self.down_until = 0.0
+        self.connections = 0
+        self.app.router.add_get('/', self.handle)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """Replay a recording: {"blocks": [...], "logs": [...]}"""
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data['blocks'], data.get('logs', ()), **kwargs)
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'blocks': list(self.blocks.values()), 'logs': self.logs}, f)
+
+    @property
+    def ws_url(self):
+        return self.url.replace('http://', 'ws://') + '/'
+
+    @property
+    def last(self):
+        return max(self.blocks)
+
+    async def mine(self):
+        """Announce the next block; returns False once the recording is exhausted"""
+        if self.head >= self.last:
+            return False
+        self.head += 1
+        block = self.blocks[self.head]
+        now = time.monotonic()
+        for tx in block['transactions']:
+            self.mined[tx['hash']] = now
+        for log in self.logs:
+            if int(log['blockNumber'], 16) == self.head:
+                self.mined[log['transactionHash']] = now
+        header = {key: block[key] for key in ('number', 'hash', 'parentHash', 'timestamp')}
+        for ws in list(self.sockets):
+            try:
+                await ws.send_json({'jsonrpc': '2.0', 'method': 'eth_subscription',
+                                    'params': {'subscription': '0x1', 'result': header}})
+            except ConnectionError:
+                self.sockets.discard(ws)
+        return True
+
+    async def drop(self, outage):
+        self.down_until = time.monotonic() + outage
+        for ws in list(self.sockets):
+            await ws.close()
+        self.sockets.clear()
+
+    def answer(self, method, params):
+        if method == 'eth_subscribe':
+            return '0x1'
+        if method == 'eth_blockNumber':
+            return hex(self.head)
+        if method == 'eth_getBlockByNumber':
+            number = int(params[0], 16)
+            return self.blocks.get(number) if number <= self.head else None
+        if method == 'eth_getLogs':
+            query = params[0]
+            first, last = int(query['fromBlock'], 16), min(int(query['toBlock'], 16), self.head)
+            addresses = set(query.get('address') or ())
+            return [log for log in self.logs if first <= int(log['blockNumber'], 16) <= last
+                    and (not addresses or log['address'] in addresses)]
+        raise ValueError(f"method {method} not supported")
+
+    async def handle(self, request):
+        if time.monotonic() < self.down_until:
+            return web.Response(status=503)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        async for message in ws:
+            request = json.loads(message.data)
+            self.requests += 1
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            try:
+                reply = {'result': self.answer(request['method'], request.get('params') or [])}
+            except ValueError as e:
+                reply = {'error': {'code': -32601, 'message': str(e)}}
+            if request['method'] == 'eth_subscribe':
+                self.sockets.add(ws)
+            await ws.send_json({'jsonrpc': '2.0', 'id': request['id'], **reply})
+        self.sockets.discard(ws)
+        return ws
+
+
+class FakeTelegram(MockServer):
+    """Bot API stand-in: POST /bot<token>/<method> answers ok and counts calls.
+
+    Point PTB at it with base_url=server.api_url, raw clients with
+    f"{server.api_url}{token}/{method}". With `flood_limit` set, more than
+    that many calls in one second (or `chat_limit` per chat) get a 429.
+    """
+
+    def __init__(self, latency=0.0, flood_limit=None, chat_limit=4, retry_after=1):
+        super().__init__()
+        self.latency = latency
+        self.flood_limit = flood_limit
+        self.chat_limit = chat_limit
+        self.retry_after = retry_after
+        self.calls = Counter()  # method -> count
+        self.chats = Counter()  # chat_id -> messages
+        self.rejected = 0
+        self.message_id = 0
+        self._recent = deque()  # call times in the last second
+        self._recent_chat = {}  # chat_id -> deque of call times
+        self.app.router.add_post('/bot{token}/{method}', self.handle)
+
+    def flooded(self, chat_id):
+        now = time.monotonic()
+        windows = [self._recent]
+        if chat_id is not None:
+            windows.append(self._recent_chat.setdefault(chat_id, deque()))
+        for window, limit in zip(windows, (self.flood_limit, self.chat_limit)):
+            while window and now - window[0] >= 1.0:
+                window.popleft()
+            if len(window) >= limit:
+                return True
+        for window in windows:
+            window.append(now)
+        return False
+
+    @property
+    def api_url(self):
+        return self.url + '/bot'
+
+    async def payload(self, request):
+        if request.content_type == 'application/json':
+            return await request.json()
+        return dict(await request.post())
+
+    async def handle(self, request):
+        self.requests += 1
+        method = request.match_info['method']
+        data = await self.payload(request)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.flood_limit and self.flooded(data.get('chat_id')):
+            self.rejected += 1
+            return web.json_response({
+                'ok': False, 'error_code': 429,
+                'description': f'Too Many Requests: retry after {self.retry_after}',
+                'parameters': {'retry_after': self.retry_after},
+            }, status=429)
+        return web.json_response(self.answer(method, data))
+
+    def answer(self, method, data):
+        self.calls[method] += 1
+        if method == 'getMe':
+            return {'ok': True, 'result': {'id': 1, 'is_bot': True, 'first_name': 'Fake', 'username': 'fake_bot'}}
+        if 'chat_id' not in data:
+            return {'ok': True, 'result': True}
+        self.chats[data['chat_id']] += 1
+        self.message_id += 1
+        return {'ok': True, 'result': {
+            'message_id': self.message_id,
+            'date': int(time.time()),
+            'chat': {'id': int(data['chat_id']), 'type': 'private'},
+            'text': data.get('text', ''),
+        }}
+
+
+def self_signed_cert(directory=None):
+    """(certfile, keyfile) for 127.0.0.1, generated with the openssl CLI"""
+    directory = directory or tempfile.mkdtemp(prefix='whalefollow-bench-')
+    cert, key = os.path.join(directory, 'cert.pem'), os.path.join(directory, 'key.pem')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                    '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1',
+                    '-keyout', key, '-out', cert], check=True, capture_output=True)
+    return cert, key
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        if isinstance(self.request, ssl.SSLSocket):
+            self.request.do_handshake()
+        super().setup()
+        # TCP + TLS handshakes cost round trips before the first request
+        time.sleep(self.server.rtt * (2 if self.server.tls else 1))
+        self.server.connections += 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.server.rtt)
+        method = self.path.rsplit('/', 1)[-1]
+        payload = json.loads(body or b'{}')
+        with self.server.lock:
+            self.server.calls[method] += 1
+        response = json.dumps({'ok': True, 'result': {'message_id': 1, 'chat': {'id': payload.get('chat_id', 0)}}})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TelegramStandIn(ThreadingHTTPServer):
+    """Bot API stand-in for blocking clients; `rtt` seconds per round trip.
+
+    With `certfile`/`keyfile` it serves HTTPS; `url` is the base API URL.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, rtt=0.02, certfile=None, keyfile=None):
+        super().__init__(('127.0.0.1', 0), _StandInHandler)
+        self.rtt = rtt
+        self.tls = None
+        if certfile:
+            self.tls = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            self.tls.load_cert_chain(certfile, keyfile)
+        self.calls = Counter()
+        self.connections = 0
+        self.lock = threading.Lock()
+        scheme = 'https' if self.tls else 'http'
+        self.url = f'{scheme}://127.0.0.1:{self.server_address[1]}'
+
+    def get_request(self):
+        sock, addr = super().get_request()
+        if self.tls:
+            # Handshake runs on the handler thread, not the accept loop
+            sock = self.tls.wrap_socket(sock, server_side=True, do_handshake_on_connect=False)
+        return sock, addr
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
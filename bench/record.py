@@ -0,0 +1,49 @@
+"""
+Record a fixture: run a command (normally the bot) with its upstreams routed
+through a recording proxy
+- Every upstream of bench.fixtures.UPSTREAMS is proxied; the command gets the
+  proxied URLs in ETHERSCAN_URL, TELEGRAM_API_URL, PRICE_URL, ... (taken
+  from the current environment, else the public defaults)
+- Stops after --seconds (SIGINT, then SIGTERM) or when the command exits,
+  and writes the fixture for bench.harness --fixture
+
+    python -m bench.record --out fixture.jsonl.gz [--seconds 600] [--per-key 100] -- python bot.py
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+
+from bench.fixtures import UPSTREAMS, Fixture, Recorder
+
+
+async def main(args):
+    fixture = Fixture(per_key=args.per_key)
+    async with Recorder(fixture) as recorder:
+        env = dict(os.environ)
+        for name, (setting, default) in UPSTREAMS.items():
+            env[setting] = recorder.route(name, os.environ.get(setting, default))
+        process = await asyncio.create_subprocess_exec(*args.command, env=env)
+        try:
+            await asyncio.wait_for(process.wait(), args.seconds)
+        except asyncio.TimeoutError:
+            process.send_signal(signal.SIGINT)
+            try:
+                await asyncio.wait_for(process.wait(), 15)
+            except asyncio.TimeoutError:
+                process.terminate()
+                await process.wait()
+    fixture.save(args.out)
+    stats = fixture.stats()
+    print(f"Recorded {stats['exchanges']:,} exchanges ({stats['keys']:,} request keys) to {args.out}: "
+          + ', '.join(f"{name} {count:,}" for name, count in stats['upstreams'].items()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--out', required=True)
+    parser.add_argument('--seconds', type=float, default=600)
+    parser.add_argument('--per-key', type=int, default=100)
+    parser.add_argument('command', nargs='+')
+    asyncio.run(main(parser.parse_args()))
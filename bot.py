@@ -1,20 +1,49 @@
 """
 WhaleFollow Pro - Telegram Bot v4.0
-- Health check endpoint (port 8000)
+- Health check endpoint (port 8000): /healthz, Prometheus /metrics, on the bot's event loop
+- Long polling, or Telegram webhooks on the same server (WEBHOOK_URL), optionally
+  handled by worker processes sharded by chat (WEBHOOK_WORKERS)
 - Live whale data via Etherscan
+- Copy-trade signals from the tracked wallets' net positions
+- Per-user watchlists (/watch, /unwatch), polled once per unique address
+- Admin broadcasts (/broadcast) and a daily whale digest, resumable after a restart
 - Full navigation (back + menu)
 - Error handling
 - Affiliate integration
 """
 
 import os
+import time
+import signal
+import hashlib
 import logging
 import asyncio
-import threading
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes
+from datetime import datetime, timedelta, timezone
+from functools import partial
 import httpx
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest, Forbidden, NetworkError
+from telegram.helpers import escape_markdown
+from telegram.ext import Application, BaseRateLimiter, CommandHandler, CallbackQueryHandler, ContextTypes, TypeHandler
+
+from whalefollow.alerts import ALERT_RELOAD, AlertEngine, ThresholdIndex, format_alert
+from whalefollow.blocks import ETH_WS_URL
+from whalefollow.broadcast import EVERYONE, SUBSCRIBED, Broadcast, checkpoint_name, combine, format_progress, unfinished
+from whalefollow.chains import SOLANA_WALLETS_FILE, EthereumAdapter, SolanaAdapter, TransferStream, solana_wallets
+from whalefollow.etherscan import ETHERSCAN_DEADLINE, TXLIST_CACHE, key_pool
+from whalefollow.flows import FlowTracker, exchange_lookup
+from whalefollow.metrics import LOOP_LAG, METRICS, upstream_call, watch_loop_lag
+from whalefollow.registry import get_registry, read_csv
+from whalefollow.render import CachedRender, Template
+from whalefollow.routes import Router
+from whalefollow.sendqueue import BROADCAST, INTERACTIVE, SEND_RATE, SendQueue
+from whalefollow.server import HealthServer
+from whalefollow.settings import MemoryStore, open_store
+from whalefollow.signals import SignalEngine, format_signal
+from whalefollow.tokens import PriceFeed, TokenSet
+from whalefollow.watchlists import WATCH_LIMIT, WatchIndex, add_watch, parse_address, short_address
+from whalefollow.workers import WEBHOOK_WORKERS, ChatOrderedProcessor, WorkerPool, chat_shard, open_link, read_frames, \
+    write_frame
 
 # Logging
 logging.basicConfig(
@@ -27,125 +56,164 @@ logger = logging.getLogger(__name__)
 # ENVIRONMENT VARIABLES (beide naming conventions supported)
 # =============================================================================
 BOT_TOKEN = os.environ.get('BOT_TOKEN') or os.environ.get('TELEGRAM_BOT_TOKEN') or os.environ.get('TELEGRAM_TOKEN')
-ETHERSCAN_API = os.environ.get('ETHERSCAN_API') or os.environ.get('ETHERSCAN_KEY')
+ETHERSCAN_API = os.environ.get('ETHERSCAN_API') or os.environ.get('ETHERSCAN_KEY')  # key1,key2: rotated
 HELIUS_KEY = os.environ.get('HELIUS_KEY')
 SOLSCAN_API = os.environ.get('SOLSCAN_API')
+MIN_TRANSFER_USD = float(os.environ.get('MIN_TRANSFER_USD', 50_000))
+UPDATE_CONCURRENCY = int(os.environ.get('UPDATE_CONCURRENCY', 16))  # updates handled at once
+TRANSFERS_CONCURRENCY = int(os.environ.get('TRANSFERS_CONCURRENCY', 4))  # of those, Recent Transfers views
+HEALTH_MAX_POLL_AGE = float(os.environ.get('HEALTH_MAX_POLL_AGE', 300))  # /healthz fails past this
+
+# Webhook mode: Telegram posts updates to WEBHOOK_URL + WEBHOOK_PATH on the health server's port
+WEBHOOK_URL = os.environ.get('WEBHOOK_URL')
+WEBHOOK_PATH = '/telegram'
+WEBHOOK_SECRET = os.environ.get('WEBHOOK_SECRET') or hashlib.sha256(f"webhook:{BOT_TOKEN}".encode()).hexdigest()[:32]
+WORKER_PROCESSES = WEBHOOK_WORKERS if WEBHOOK_URL else 0  # webhook mode only
+VIEW_PUSH_INTERVAL = float(os.environ.get('VIEW_PUSH_INTERVAL', 1.0))  # front -> workers, seconds
+TELEGRAM_API_URL = os.environ.get('TELEGRAM_API_URL')  # Bot API base URL, e.g. a local Bot API server
+ADMIN_IDS = {int(i) for i in os.environ.get('ADMIN_IDS', '').replace(',', ' ').split()}  # may use /broadcast
+DIGEST_HOUR = int(os.environ.get('DIGEST_HOUR', -1))  # UTC hour of the daily digest; -1: off
+BROADCAST_REPORT = float(os.environ.get('BROADCAST_REPORT', 15))  # seconds between progress updates
 
 # Affiliate codes
 BITUNIX_CODE = os.environ.get('BITUNIX_CODE', 'xc6jzk')
 MEXC_CODE = os.environ.get('MEXC_CODE', 'BPM0e8Rm')
 BLOFIN_CODE = os.environ.get('BLOFIN_CODE', 'b996a0111c1b4497b53d9b3cc82e4539')
 
+# User settings (shared with api/webhook.py when both point at the same store)
+STORE = open_store(os.environ.get('SETTINGS_URL', 'sqlite:///whalefollow.db'))
+
 # =============================================================================
-# HEALTH CHECK SERVER (Port 8000)
+# HEALTH CHECK SERVER (PORT, default 8000; whalefollow.server)
 # =============================================================================
-class HealthHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.end_headers()
-        response = '{"status":"ok","bot":"WhaleFollow Pro","version":"4.0"}'
-        self.wfile.write(response.encode())
-    
-    def log_message(self, format, *args):
-        pass  # Suppress logging
+def healthz():
+    """(ok, body): fails once a chain has not delivered data for HEALTH_MAX_POLL_AGE seconds"""
+    ages = STREAM.poll_ages() if STREAM.started else {}
+    stale = sorted(chain for chain, age in ages.items() if age > HEALTH_MAX_POLL_AGE)
+    body = {"status": "stale" if stale else "ok", "stale": stale,
+            "poll_age": {chain: round(age, 1) for chain, age in ages.items()}}
+    return not stale, body
 
-def run_health_server():
-    server = HTTPServer(('0.0.0.0', 8000), HealthHandler)
-    logger.info("Health check server running on port 8000")
-    server.serve_forever()
+def health_stats():
+    return {
+        "status": "ok", "bot": "WhaleFollow Pro", "version": "4.0",
+        "mode": "webhook" if WEBHOOK_URL else "polling",
+        "loop": {"lag": round(LOOP_LAG.values.get((), 0.0), 4), "tasks": len(asyncio.all_tasks())},
+        "cache": TXLIST_CACHE.stats(), "send_queue": SEND_QUEUE.stats(), "chains": STREAM.stats(),
+        "prices": PRICES.stats(), "flows": FLOWS.stats(), "signals": SIGNALS.stats(),
+        "watchlists": WATCHES.stats(), "transfers_view": TRANSFERS_VIEW.stats(), "routes": ROUTES.stats(),
+        "workers": POOL.stats() if POOL else [],
+    }
 
 # =============================================================================
 # WHALE DATA FUNCTIONS
 # =============================================================================
-WHALE_WALLETS = {
-    "Binance Hot": "0x28c6c06298d514db089934071355e5743bf21d60",
-    "Binance Cold": "0x21a31ee1afc51d94c2efccaa2092ad1028285549",
-    "Binance 3": "0x47ac0fb4f2d84898e4d9e7b4dab3c24507a6d503",
-    "Bitfinex": "0x8894e0a0c962cb723c1976a4421c95949be2d4e3",
-    "Kraken": "0x2910543af39aba0cd09dbb2d50200b3e800a63d2",
-    "Coinbase": "0x71660c4005ba85c37ccec55d0c4493e66fe775d3",
-    "Jump Trading": "0x9a9dcd6b52b45a78cd13b395723c245dabfbab71",
-    "Wintermute": "0x0000006daea1723962647b7e189d311d757fb793",
-}
-
-async def fetch_whale_transactions():
-    """Fetch real whale transactions from Etherscan"""
-    if not ETHERSCAN_API:
-        return None
-    
+REGISTRY = get_registry()  # data/wallets.csv (WALLETS_FILE)
+WHALE_WALLETS = REGISTRY.tracked()
+SOLANA_WALLETS, SOLANA_LABELS = solana_wallets()
+TOKENS = TokenSet.load()  # data/tokens.csv (TOKENS_FILE)
+PRICES = PriceFeed(TOKENS)
+
+# One adapter per configured chain, each with its own poll loop, budget and pool
+ADAPTERS = []
+if ETHERSCAN_API or ETH_WS_URL:
+    # ETH_WS_URL: scan new blocks against the registry instead of polling txlist per wallet
+    ADAPTERS.append(EthereumAdapter(WHALE_WALLETS, ETHERSCAN_API, registry=REGISTRY, tokens=TOKENS,
+                                    ws_url=ETH_WS_URL, limiter=key_pool(ETHERSCAN_API)))
+if HELIUS_KEY or SOLSCAN_API:
+    ADAPTERS.append(SolanaAdapter(SOLANA_WALLETS, helius_key=HELIUS_KEY, solscan_key=SOLSCAN_API,
+                                  labels=SOLANA_LABELS))
+STREAM = TransferStream(ADAPTERS, prices=PRICES)
+FLOWS = FlowTracker(exchange_lookup(REGISTRY, read_csv(SOLANA_WALLETS_FILE, chain='solana')))
+# Exchange wallets move their customers' funds: no positions to copy
+SIGNALS = SignalEngine(skip=lambda chain, address: FLOWS.exchange_of(chain, address) is not None)
+
+def is_whale_transfer(tx):
+    """USD floor once priced; unpriced native coins fall back to the chain's coin floor"""
+    if tx.usd is not None:
+        return tx.usd >= MIN_TRANSFER_USD
+    return tx.token is None and tx.amount > STREAM.adapters[tx.chain].min_amount
+
+def whale_transactions():
+    """Recent large transfers on every chain, from the background pollers"""
     transactions = []
+    per_wallet = {}
     
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        for name, address in list(WHALE_WALLETS.items())[:5]:
-            try:
-                url = f"https://api.etherscan.io/api?module=account&action=txlist&address={address}&startblock=0&endblock=99999999&page=1&offset=5&sort=desc&apikey={ETHERSCAN_API}"
-                response = await client.get(url)
-                data = response.json()
-                
-                if data.get('status') == '1' and data.get('result'):
-                    for tx in data['result'][:2]:
-                        value_eth = int(tx.get('value', 0)) / 1e18
-                        if value_eth > 10:
-                            transactions.append({
-                                'wallet': name,
-                                'hash': tx['hash'][:10] + '...',
-                                'value': round(value_eth, 2),
-                                'to': tx['to'][:10] + '...' if tx.get('to') else 'Contract',
-                                'type': 'OUT' if tx['from'].lower() == address.lower() else 'IN'
-                            })
-            except Exception as e:
-                logger.error(f"Error fetching {name}: {e}")
-                continue
+    for name, address, tx in STREAM.latest():
+        if not is_whale_transfer(tx):
+            continue
+        # Newest two per wallet
+        per_wallet[name] = per_wallet.get(name, 0) + 1
+        if per_wallet[name] > 2:
+            continue
+        transactions.append({
+            'wallet': name,
+            'hash': tx['hash'][:10] + '...',
+            'value': round(tx.amount, 2),
+            'symbol': tx.symbol,
+            'usd': tx.usd,
+            'from': STREAM.label(tx.chain, tx.sender, 'Unknown'),
+            'to': STREAM.label(tx.chain, tx.to, 'Unknown') if tx.to else 'Contract',
+            'type': 'OUT' if tx.is_from(address) else 'IN'
+        })
     
     return transactions if transactions else None
 
-# =============================================================================
-# KEYBOARD BUILDERS
-# =============================================================================
-def main_menu_keyboard():
-    return InlineKeyboardMarkup([
-        [InlineKeyboardButton("🐋 Live Whale Alerts", callback_data="alerts")],
-        [InlineKeyboardButton("📊 Top Wallets", callback_data="wallets")],
-        [InlineKeyboardButton("💰 Recent Transfers", callback_data="transfers")],
-        [InlineKeyboardButton("⚙️ Settings", callback_data="settings")],
-        [InlineKeyboardButton("💎 Trade Now", callback_data="trade")]
-    ])
-
-def back_menu_keyboard():
-    return InlineKeyboardMarkup([
-        [InlineKeyboardButton("« Back", callback_data="back"),
-         InlineKeyboardButton("🏠 Menu", callback_data="menu")]
-    ])
-
-def settings_keyboard():
-    return InlineKeyboardMarkup([
-        [InlineKeyboardButton("📈 Your Stats", callback_data="stats")],
-        [InlineKeyboardButton("🎁 Earn Rewards", callback_data="referral")],
-        [InlineKeyboardButton("ℹ️ API Status", callback_data="api_status")],
-        [InlineKeyboardButton("« Back", callback_data="back"),
-         InlineKeyboardButton("🏠 Menu", callback_data="menu")]
-    ])
-
-def trade_keyboard():
-    return InlineKeyboardMarkup([
-        [InlineKeyboardButton("🔥 Bitunix (20% bonus)", url=f"https://www.bitunix.com/register?vipCode={BITUNIX_CODE}")],
-        [InlineKeyboardButton("💎 MEXC (40% fees)", url=f"https://www.mexc.com/register?inviteCode={MEXC_CODE}")],
-        [InlineKeyboardButton("⚡ BloFin", url=f"https://blofin.com/register?referral_code={BLOFIN_CODE}")],
-        [InlineKeyboardButton("« Back", callback_data="back"),
-         InlineKeyboardButton("🏠 Menu", callback_data="menu")]
-    ])
+def usd_short(value):
+    """Signed compact USD: +$1.2M, -$850K"""
+    sign = '+' if value >= 0 else '-'
+    value = abs(value)
+    for unit, size in (('B', 1e9), ('M', 1e6), ('K', 1e3)):
+        if value >= size:
+            return f"{sign}${value / size:.1f}{unit}"
+    return f"{sign}${value:.0f}"
+
+def flows_text():
+    """Exchange net flows view (Markdown)"""
+    snapshot = FLOWS.snapshot()
+    sentiment = {'bullish': '🟢 Bullish', 'bearish': '🔴 Bearish', 'neutral': '⚪ Neutral'}
+    text = "📊 *Exchange Flows*\n\n"
+    if not snapshot['exchanges']:
+        return text + "No exchange flows yet. Flows build up as transfers arrive.\n\n_Net = withdrawals − deposits_"
+    for e in snapshot['exchanges'][:8]:
+        nets = ' | '.join(f"{name}: {usd_short(net)}" for name, (_, _, net) in e['windows'].items())
+        text += f"*{e['exchange']}* {sentiment[e['sentiment']]}\n   {nets}\n"
+        if e['anomaly']:
+            text += f"   ⚠️ Unusual 5m flow (z = {e['z']:+.1f})\n"
+        text += "\n"
+    nets = ' | '.join(f"{name}: {usd_short(net)}" for name, (_, _, net) in snapshot['windows'].items())
+    text += f"*All exchanges* {sentiment[snapshot['sentiment']]}\n   {nets}\n\n"
+    text += "_Net = withdrawals − deposits; sentiment over 1h_"
+    return text
+
+def signals_text():
+    """Copy-trade signals view (Markdown)"""
+    hours = f"{SIGNALS.window / 3600:g}h"
+    text = "📡 *Copy Trade Signals*\n\n"
+    if SIGNALS.recent:
+        for signal in list(SIGNALS.recent)[:-9:-1]:  # newest 8
+            emoji, verb = ('🟢', 'accumulating') if signal.kind == 'accumulation' else ('🔴', 'distributing')
+            text += (f"{emoji} *{signal.wallet}* {verb} {signal.asset}: {usd_short(signal.net_usd)} "
+                     f"({signal.transfers} transfers)\n")
+    else:
+        text += "No signals yet.\n"
+    positions = SIGNALS.snapshot(limit=6)
+    if positions:
+        text += f"\n*Net flows ({hours})*\n"
+        for p in positions:
+            emoji = '🟢' if p['net_usd'] >= 0 else '🔴'
+            text += (f"{emoji} *{p['wallet']}* {p['asset']}: {usd_short(p['net_usd'])} "
+                     f"({p['inbound']} in / {p['outbound']} out)\n")
+    text += (f"\n_Signal: net flow of one asset past {usd_short(SIGNALS.min_usd)[1:]} in {hours}, "
+             f"{SIGNALS.dominance:.0%} of transfers one way. Not financial advice._")
+    return text
 
 # =============================================================================
-# BOT HANDLERS
+# SCREENS (rendered once; per-user screens only fill in their fields)
 # =============================================================================
-async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Start command - main menu"""
-    user = update.effective_user
-    
-    text = f"""🐋 *MVAI Whale Tracker*
+START_TEXT = Template("""🐋 *MVAI Whale Tracker*
 
-Welcome {user.first_name}!
+Welcome {first_name}!
 
 Track whale wallets in real-time.
 Follow the smart money.
@@ -155,71 +223,20 @@ Follow the smart money.
 • Multi-chain tracking
 • Copy trade signals
 • Risk management alerts
+• Your own watchlist: /watch `<address>`
 
-Select an option below:"""
-    
-    if update.callback_query:
-        await update.callback_query.edit_message_text(
-            text, 
-            reply_markup=main_menu_keyboard(),
-            parse_mode='Markdown'
-        )
-    else:
-        await update.message.reply_text(
-            text, 
-            reply_markup=main_menu_keyboard(),
-            parse_mode='Markdown'
-        )
+Select an option below:""", escape=escape_markdown)
 
-async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle all button callbacks"""
-    query = update.callback_query
-    await query.answer()
-    
-    data = query.data
-    
-    # Navigation
-    if data in ["back", "menu"]:
-        await start(update, context)
-        return
-    
-    # Alerts
-    if data == "alerts":
-        context.user_data['alerts_enabled'] = True
-        text = """✅ *Whale Alerts Activated*
+ALERTS_ON_TEXT = Template("""✅ *Whale Alerts Activated*
 
-You will receive notifications when whales make significant moves.
+You will receive notifications when whales move more than {threshold} ETH.
 
-Use /stop to disable alerts."""
-        await query.edit_message_text(text, reply_markup=back_menu_keyboard(), parse_mode='Markdown')
-        return
-    
-    # Wallets
-    if data == "wallets":
-        wallet_text = "🐋 *Tracked Whale Wallets*\n\n"
-        for name, addr in WHALE_WALLETS.items():
-            short_addr = addr[:6] + "..." + addr[-4:]
-            wallet_text += f"• *{name}*\n  `{short_addr}`\n"
-        
-        await query.edit_message_text(wallet_text, reply_markup=back_menu_keyboard(), parse_mode='Markdown')
-        return
-    
-    # Transfers
-    if data == "transfers":
-        await query.edit_message_text("⏳ Fetching live data...", parse_mode='Markdown')
-        
-        transactions = await fetch_whale_transactions()
-        
-        if transactions:
-            text = "📊 *Recent Large Transfers*\n\n"
-            for tx in transactions[:8]:
-                emoji = "🟢" if tx['type'] == 'IN' else "🔴"
-                text += f"{emoji} *{tx['wallet']}*\n"
-                text += f"   {tx['type']}: {tx['value']} ETH → {tx['to']}\n\n"
-            
-            text += "_Live data from Etherscan_"
-        else:
-            text = """📊 *Recent Large Transfers*
+Use /stop to disable alerts.""")
+
+WALLETS_TEXT = "🐋 *Tracked Whale Wallets*\n\n" + ''.join(
+    f"• *{name}*\n  `{addr[:6]}...{addr[-4:]}`\n" for name, addr in {**WHALE_WALLETS, **SOLANA_WALLETS}.items())
+
+SAMPLE_TRANSFERS_TEXT = """📊 *Recent Large Transfers*
 
 ⚠️ API connection issue.
 Showing sample data:
@@ -229,86 +246,830 @@ Showing sample data:
 • Whale → Coinbase: 850 ETH
 
 _Configure API keys for live data_"""
-        
-        await query.edit_message_text(text, reply_markup=back_menu_keyboard(), parse_mode='Markdown')
-        return
-    
-    # Settings
-    if data == "settings":
-        text = """⚙️ *Settings*
+
+SETTINGS_TEXT = """⚙️ *Settings*
 
 Configure your whale tracking preferences."""
-        await query.edit_message_text(text, reply_markup=settings_keyboard(), parse_mode='Markdown')
-        return
-    
-    # Trade
-    if data == "trade":
-        text = """💎 *Trade Now*
+
+TRADE_TEXT = """💎 *Trade Now*
 
 Use our partner exchanges and earn rewards:
 
 🔥 *Bitunix* - 20% fee discount
 💎 *MEXC* - 40% fee rebate  
 ⚡ *BloFin* - Premium features"""
-        await query.edit_message_text(text, reply_markup=trade_keyboard(), parse_mode='Markdown')
-        return
-    
-    # Stats
-    if data == "stats":
-        user_id = update.effective_user.id
-        ref_code = f"{user_id:X}"[-8:].upper()
-        
-        text = f"""📈 *YOUR STATS*
+
+STATS_TEXT = Template(f"""📈 *YOUR STATS*
 
 • Tier: FREE
 • Alerts: 0
-• Code: `{ref_code}`
+• Code: `{{ref_code}}`
 
-*APIs:* ETH {'✅' if ETHERSCAN_API else '❌'} | SOL {'✅' if SOLSCAN_API else '❌'}"""
-        await query.edit_message_text(text, reply_markup=back_menu_keyboard(), parse_mode='Markdown')
-        return
-    
-    # Referral
-    if data == "referral":
-        user_id = update.effective_user.id
-        ref_code = f"{user_id:X}"[-8:].upper()
-        bot_username = (await context.bot.get_me()).username
-        
-        text = f"""🎁 *EARN REWARDS*
+*APIs:* ETH {'✅' if ETHERSCAN_API or ETH_WS_URL else '❌'} | SOL {'✅' if HELIUS_KEY or SOLSCAN_API else '❌'}""")
+
+REFERRAL_TEXT = Template("""🎁 *EARN REWARDS*
 
 Share and earn 30%!
 
 Code: `{ref_code}`
-Link: https://t.me/{bot_username}?start={ref_code}"""
-        await query.edit_message_text(text, reply_markup=back_menu_keyboard(), parse_mode='Markdown')
-        return
-    
-    # API Status
-    if data == "api_status":
-        text = f"""ℹ️ *API Status*
+Link: https://t.me/{bot_username}?start={ref_code}""")
+
+def transfers_text():
+    """Recent large transfers view (Markdown)"""
+    transactions = whale_transactions()
+    if not transactions:
+        return SAMPLE_TRANSFERS_TEXT
+    text = "📊 *Recent Large Transfers*\n\n"
+    for tx in transactions[:8]:
+        emoji = "🟢" if tx['type'] == 'IN' else "🔴"
+        text += f"{emoji} *{tx['wallet']}*\n"
+        usd = f" (${tx['usd']:,.0f})" if tx['usd'] is not None else ''
+        text += f"   {tx['type']}: {tx['value']:,} {tx['symbol']}{usd} ({tx['from']} → {tx['to']})\n\n"
+    text += f"_Live data: {', '.join(STREAM.adapters)}_"
+    return text
+
+# Shared by every user; re-rendered only after a poll brings new transfers or prices refresh
+TRANSFERS_VIEW = CachedRender(transfers_text, key=lambda: (STREAM.version, PRICES.refreshes))
+
+def age_text(seconds):
+    if seconds < 90:
+        return f"{seconds:.0f}s"
+    return f"{seconds / 60:.0f} min" if seconds < 5400 else f"{seconds / 3600:.1f} h"
+
+def unavailable_text():
+    """One line per chain whose API circuit is open: the view shows its last data, with that data's age"""
+    return ''.join(
+        f"\n⚠️ _{upstream.title()} unavailable: {chain} data from {age_text(age)} ago_" if age is not None
+        else f"\n⚠️ _{upstream.title()} unavailable: no {chain} data yet_"
+        for chain, (upstream, age) in STREAM.unavailable().items())
+
+def transfers_view():
+    if not STREAM.adapters:
+        return SAMPLE_TRANSFERS_TEXT
+    # The age line is per tap, outside the cached render: it changes while the data doesn't
+    return TRANSFERS_VIEW() + unavailable_text()
+
+def circuit_text(circuit):
+    if circuit is None or circuit['state'] == 'closed':
+        return ''
+    return f" ⚠️ circuit {circuit['state'].replace('_', '-')}, probe in {circuit['retry_after']:.0f}s"
+
+def api_status_text():
+    """API status view (Markdown)"""
+    cache = TXLIST_CACHE.stats()
+    chain_lines = ''.join(
+        f"• {chain.title()}: {s['polls']} polls, last {s['last_poll_age'] if s['last_poll_age'] is not None else '-'}s ago"
+        f" ({s['last_poll_seconds']}s), {s['errors']} errors"
+        f"{circuit_text(s['circuit'])}\n"
+        for chain, s in STREAM.stats().items())
+    return f"""ℹ️ *API Status*
 
 • Etherscan: {'✅ Connected' if ETHERSCAN_API else '❌ Not configured'}
 • Helius: {'✅ Connected' if HELIUS_KEY else '❌ Not configured'}
 • Solscan: {'✅ Connected' if SOLSCAN_API else '❌ Not configured'}
+• Block stream: {'✅ ' + ('Connected' if STREAM.adapters['ethereum'].blocks.connected else 'Reconnecting') if ETH_WS_URL else '❌ Not configured'}
+
+• Cache: {cache['hits'] + cache['stale_hits']} hits | {cache['misses']} misses | {cache['coalesced']} coalesced
+{chain_lines}
 
 • Bitunix: ✅ `{BITUNIX_CODE}`
 • MEXC: ✅ `{MEXC_CODE}`
 • BloFin: ✅ Active"""
-        await query.edit_message_text(text, reply_markup=back_menu_keyboard(), parse_mode='Markdown')
+
+def digest_text(now=None):
+    """Daily whale digest (Markdown): the last 24h's largest transfers, exchange flows, signals"""
+    since = (now or time.time()) - 86400
+    rows = [row for row in STREAM.latest() if row[2].timestamp >= since and is_whale_transfer(row[2])]
+    rows.sort(key=lambda row: row[2].usd or 0, reverse=True)
+    text = "🐋 *Daily Whale Digest*\n\n"
+    if rows:
+        text += f"*{len(rows)} large transfers* in the last 24h. The largest:\n\n"
+        for name, address, tx in rows[:5]:
+            emoji = "🔴" if tx.is_from(address) else "🟢"
+            usd = f" (${tx.usd:,.0f})" if tx.usd is not None else ''
+            text += f"{emoji} *{name}* {'OUT' if tx.is_from(address) else 'IN'}: {tx.amount:,.2f} {tx.symbol}{usd}\n"
+    else:
+        text += "No large transfers in the last 24h.\n"
+    snapshot = FLOWS.snapshot()
+    if snapshot['exchanges']:
+        nets = ' | '.join(f"{name}: {usd_short(net)}" for name, (_, _, net) in snapshot['windows'].items())
+        text += f"\n*Exchange net flows*: {nets}\n"
+    signals = [signal for signal in SIGNALS.recent if signal.timestamp >= since]
+    if signals:
+        text += f"\n📡 {len(signals)} copy-trade signal{'s' if len(signals) != 1 else ''}: see /start → Copy Trade Signals\n"
+    return text + "\n_Stop these with /stop. Not financial advice._"
+
+# Running broadcasts, in the front: name -> (meta, {shard: progress})
+BROADCASTS = {}
+
+def broadcasts_text():
+    """Running broadcasts (Markdown), for /broadcast status"""
+    if not BROADCASTS:
+        return "📣 No broadcast running."
+    return '\n\n'.join(format_progress(name, combine(shards.values())) for name, (_, shards) in BROADCASTS.items())
+
+# Views built from chain data, which only the process running the pollers has.
+# A webhook worker shows the copy the front last pushed (push_views).
+VIEWS = {'transfers': transfers_view, 'flows': flows_text, 'signals': signals_text,
+         'api_status': api_status_text, 'broadcasts': broadcasts_text}
+SHARED_VIEWS = {}
+WORKER = None  # in a webhook worker: the stream writer back to the front
+WORKER_SHARD = None  # in a webhook worker: (index, count), the chats it owns (workers.chat_shard)
+
+def shared_view(name):
+    if WORKER is not None and name in SHARED_VIEWS:
+        return SHARED_VIEWS[name]
+    return VIEWS[name]()
+
+def ref_code(user_id):
+    return f"{user_id:X}"[-8:].upper()
+
+# =============================================================================
+# OUTBOUND SEND QUEUE (all Bot API calls except getUpdates)
+# =============================================================================
+def is_retryable(exc):
+    return isinstance(exc, NetworkError) and not isinstance(exc, BadRequest)
+
+# Calls that post a message: after a timeout or a dropped connection Telegram may already
+# have delivered it, so they are only retried when the request never left
+POSTING = ('send', 'forward', 'copy')
+
+def is_retryable_post(exc):
+    return is_retryable(exc) and isinstance(exc.__cause__, (httpx.ConnectError, httpx.ConnectTimeout,
+                                                            httpx.PoolTimeout))
+
+# Telegram's global limit is per bot: the front and each worker process get an equal share
+SEND_QUEUE = SendQueue(rate=SEND_RATE / (WORKER_PROCESSES + 1), is_retryable=is_retryable)
+
+class QueueRateLimiter(BaseRateLimiter):
+    """PTB rate limiter hook: every request goes through SEND_QUEUE.
+
+    Pass rate_limit_args=BROADCAST to queue behind interactive replies.
+    """
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        await SEND_QUEUE.stop()
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        priority = INTERACTIVE if rate_limit_args is None else rate_limit_args
+
+        async def call():
+            with upstream_call('telegram', endpoint):
+                return await callback(*args, **kwargs)
+
+        retryable = is_retryable_post if endpoint.startswith(POSTING) else None
+        return await SEND_QUEUE.send(call, chat_id=data.get('chat_id'), priority=priority, retryable=retryable)
+
+# =============================================================================
+# WHALE ALERTS (background engine)
+# =============================================================================
+SUBSCRIBERS = ThresholdIndex()
+
+def set_subscriber(chat_id, threshold):
+    """Subscribe (threshold None: unsubscribe) in the alert engine's index, which
+    lives in the front when updates are handled by webhook workers"""
+    if WORKER is not None:
+        write_frame(WORKER, {'subscriber': [chat_id, threshold]})
+    elif threshold is None:
+        SUBSCRIBERS.remove(chat_id)
+    else:
+        SUBSCRIBERS.set(chat_id, threshold)
+
+# Watchlists live in the front too; the pollers follow every watched address once
+WATCHES = WatchIndex()
+WATCHES_POLLED = None  # WATCHES.version the pollers last got
+
+def set_watch(chat_id, chain, address, watching):
+    """Add (or drop; address None: all of the chat's) a watched address in the front's
+    index, after the handler stored it"""
+    if WORKER is not None:
+        write_frame(WORKER, {'watch': [chat_id, chain, address, watching]})
+        return
+    if watching:
+        WATCHES.add(chat_id, chain, address)
+    else:
+        WATCHES.remove(chat_id, chain, address)
+    poll_watched()
+
+def poll_watched():
+    """Hand the pollers the deduplicated watched set when it changed"""
+    global WATCHES_POLLED
+    if WATCHES.version == WATCHES_POLLED:
+        return
+    WATCHES_POLLED = WATCHES.version
+    for chain in STREAM.adapters:
+        STREAM.watch(chain, {address: STREAM.label(chain, address) or short_address(address)
+                             for address in WATCHES.addresses(chain)})
+    logger.info(f"Watching {len(WATCHES)} addresses for {WATCHES.stats()['chats']} chats")
+
+async def reload_watches(interval=ALERT_RELOAD):
+    """Pick up watchlists changed elsewhere (api/webhook.py) from the store"""
+    while True:
+        await asyncio.sleep(interval)
+        WATCHES.load(await asyncio.to_thread(STORE.watches))
+        poll_watched()
+
+async def send_watched(engine, chats, row):
+    """A watched address moved: its watchers get an alert through the alert queue"""
+    await engine.broadcast(format_alert(*row, labels=STREAM.label, heading="👁 *Watchlist Alert*"), chats)
+
+async def drop_blocked(chat_id):
+    """The user blocked the bot: alerts off, watchlist dropped. Written by the process that owns
+    the chat (its webhook worker), like every other change to its settings"""
+    if WORKER is not None and chat_shard(chat_id, WORKER_SHARD[1]) != WORKER_SHARD[0]:
+        write_frame(WORKER, {'blocked': chat_id})  # the front passes it on to the owner
+        return
+    if WORKER is None and POOL:
+        POOL.send(POOL.shard(chat_id), {'blocked': chat_id})
+        return
+    await asyncio.to_thread(STORE.update, chat_id, alerts=False)
+    set_subscriber(chat_id, None)
+    if await asyncio.to_thread(STORE.unwatch, chat_id):
+        set_watch(chat_id, None, None, False)
+    logger.info(f"Unsubscribed {chat_id}: bot blocked")
+
+async def send_alert(bot, chat_id, text):
+    try:
+        await bot.send_message(chat_id, text, parse_mode='Markdown', disable_web_page_preview=True,
+                               rate_limit_args=BROADCAST)
+    except Forbidden:
+        SUBSCRIBERS.remove(chat_id)  # no more alerts meanwhile
+        await drop_blocked(chat_id)
+
+async def start_alert_engine(app: Application):
+    """Start the chain pollers and the alert engine on the bot's event loop"""
+    app.bot_data['loop_lag_task'] = asyncio.create_task(watch_loop_lag())
+    WATCHES.load(STORE.watches())
+    poll_watched()
+    STREAM.start()
+    if not STREAM.adapters:
+        logger.info("Alert engine disabled: no chain API keys")
         return
+    app.bot_data['flows_task'] = asyncio.create_task(FLOWS.run(STREAM.subscribe()))
+    # Thresholds are in ETH; tokens and SOL are compared through their USD value
+    engine = AlertEngine(STREAM.subscribe(), lambda: None,
+                         lambda chat_id, text: send_alert(app.bot, chat_id, text), interval=0,
+                         index=SUBSCRIBERS, store=STORE, prices=PRICES,
+                         formatter=partial(format_alert, labels=STREAM.label))
+    app.bot_data['alert_engine'] = engine
+    app.bot_data['alert_task'] = asyncio.create_task(engine.run())
+    app.bot_data['signals_task'] = asyncio.create_task(SIGNALS.run(STREAM.subscribe(),
+                                                                   partial(broadcast_signal, engine)))
+    app.bot_data['watch_task'] = asyncio.create_task(WATCHES.run(STREAM.subscribe(), partial(send_watched, engine)))
+    app.bot_data['watch_reload_task'] = asyncio.create_task(reload_watches())
+
+async def broadcast_signal(engine, signal):
+    """Copy-trade signals go to every alert subscriber, through the alert queue"""
+    queued = await engine.broadcast(format_signal(signal, SIGNALS.window))
+    logger.info(f"Queued copy-trade signal for {queued} subscribers")
+
+async def stop_alert_engine(app: Application):
+    for key in ('alert_task', 'signals_task', 'watch_task', 'watch_reload_task', 'flows_task', 'loop_lag_task'):
+        task = app.bot_data.pop(key, None)
+        if task:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    await STREAM.stop()
+
+# =============================================================================
+# BROADCASTS (admin announcements, daily digest; whalefollow.broadcast)
+# =============================================================================
+# With webhook workers a broadcast has one shard per worker: each sends to the
+# chats it owns (workers.chat_shard) on its share of the send rate; without
+# them, the front sends the single shard. The front starts the shards,
+# collects their progress and keeps the admin's status message up to date.
+BROADCAST_SHARDS = WORKER_PROCESSES or 1
+SHARDS = {}  # shards running in this process: (name, shard) -> (Broadcast, task)
+BOT = None  # the front's bot (post_init), for shards it starts on a worker's request
+
+async def send_broadcast(bot, chat_id, text):
+    try:
+        await bot.send_message(chat_id, text, parse_mode='Markdown', disable_web_page_preview=True,
+                               rate_limit_args=BROADCAST)
+    except Forbidden:
+        await drop_blocked(chat_id)
+        raise
+
+def report_broadcast(progress):
+    """A shard's progress, into the front's BROADCASTS"""
+    if WORKER is not None:
+        write_frame(WORKER, {'broadcast_progress': progress})
+    elif progress['name'] in BROADCASTS:
+        BROADCASTS[progress['name']][1][progress['shard']] = progress
+
+def start_shard(bot, state):
+    """Run one shard of a broadcast in this process, from its checkpoint"""
+    job = Broadcast.resume(STORE, partial(send_broadcast, bot), state)
+    key = (job.name, job.shard)
+    SHARDS[key] = job, asyncio.create_task(run_shard(job))
+    SHARDS[key][1].add_done_callback(lambda _: SHARDS.pop(key, None))
+
+async def run_shard(job):
+    """job.run(), reporting its progress every BROADCAST_REPORT seconds"""
+    sending = asyncio.create_task(job.run())
+    try:
+        while not sending.done():
+            await asyncio.wait([sending], timeout=BROADCAST_REPORT)
+            report_broadcast(job.progress())
+        sending.result()
+    except Exception as e:
+        logger.exception(f"Broadcast {job.name} shard {job.shard} failed; it resumes from its checkpoint on restart")
+        job.error = str(e) or type(e).__name__
+        report_broadcast(job.progress())  # a final state, or the front would wait for it forever
+    finally:
+        sending.cancel()
+
+async def stop_shards(name=None, timeout=30.0):
+    """Stop this process's shards (of one broadcast, or all) once their in-flight sends are done;
+    each saves a checkpoint to resume from. Returns them."""
+    running = [(job, task) for (job_name, _), (job, task) in list(SHARDS.items()) if name in (None, job_name)]
+    for job, _ in running:
+        job.stop()
+    if running:
+        await asyncio.wait([task for _, task in running], timeout=timeout)
+    return [job for job, _ in running]
+
+def cancel_shards(name):
+    """Cancel this process's shards of a broadcast; each drops its checkpoint once its in-flight sends are done"""
+    for (job_name, _), (job, _) in list(SHARDS.items()):
+        if job_name == name:
+            job.cancel()
+
+async def start_broadcast(name, text, audience=EVERYONE, meta=None):
+    """Checkpoint every shard, then start them (in a worker: ask the front to)"""
+    if WORKER is not None:
+        write_frame(WORKER, {'broadcast_start': [name, text, audience, meta]})
+        return
+    states = [Broadcast(STORE, None, name, text, audience=audience, shard=shard, shards=BROADCAST_SHARDS,
+                        meta=meta).state() for shard in range(BROADCAST_SHARDS)]
+    for state in states:
+        await asyncio.to_thread(STORE.save_checkpoint, checkpoint_name(name, state['shard']), state)
+    dispatch_broadcast(name, states)
+
+def dispatch_broadcast(name, states):
+    """Front: shard i runs on worker i (resumed with another worker count: i % workers), or here"""
+    BROADCASTS[name] = (states[0]['meta'], {state['shard']: Broadcast.resume(STORE, None, state).progress()
+                                            for state in states})
+    for state in states:
+        if POOL:
+            POOL.send(state['shard'] % POOL.count, {'broadcast': state})
+        else:
+            start_shard(BOT, state)
+    logger.info(f"Broadcast {name}: {len(states)} shards over {POOL.count if POOL else 1} processes")
+
+def resume_broadcasts():
+    """Restart the broadcasts a crash or restart cut off, from their checkpoints"""
+    for name, shards in unfinished(STORE).items():
+        logger.info(f"Resuming broadcast {name}")
+        dispatch_broadcast(name, list(shards.values()))
+
+async def cancel_broadcast(name):
+    """Stop a broadcast everywhere and drop its checkpoints; False if there is no such broadcast"""
+    saved = (await asyncio.to_thread(unfinished, STORE)).get(name, {})
+    if name not in BROADCASTS and not saved:  # a worker only has the checkpoints to go by
+        return False
+    if WORKER is not None:
+        write_frame(WORKER, {'broadcast_cancel': name})
+        return True
+    BROADCASTS.pop(name, None)
+    if POOL:
+        POOL.broadcast({'broadcast_cancel': name})
+    cancel_shards(name)
+    for shard in saved:  # also those of shards no process is running (one that failed)
+        await asyncio.to_thread(STORE.save_checkpoint, checkpoint_name(name, shard), None)
+    return True
+
+async def follow_broadcasts(interval=BROADCAST_REPORT):
+    """Front: edit each broadcast's status message with its progress, until it is done"""
+    while True:
+        await asyncio.sleep(interval)
+        for name, (meta, shards) in list(BROADCASTS.items()):
+            progress = combine(shards.values())
+            if meta.get('message_id'):
+                try:
+                    await BOT.edit_message_text(format_progress(name, progress), meta['admin'], meta['message_id'],
+                                                parse_mode='Markdown')
+                except BadRequest:  # unchanged, or the message was deleted
+                    pass
+            if progress['done']:
+                BROADCASTS.pop(name, None)
+                logger.info(f"Broadcast {name} {'stopped' if progress['error'] else 'done'}: "
+                            f"{progress['sent']} sent, {progress['failed']} failed")
+
+async def run_digest(hour=DIGEST_HOUR):
+    """The digest to every alert subscriber, daily at `hour`:00 UTC"""
+    while True:
+        now = datetime.now(timezone.utc)
+        at = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+        if at <= now:
+            at += timedelta(days=1)
+        await asyncio.sleep((at - now).total_seconds())
+        name = f"digest-{at:%Y-%m-%d}"
+        if name not in BROADCASTS:
+            await start_broadcast(name, digest_text(), SUBSCRIBED)
+
+async def post_init(app: Application):
+    """Webhook workers, health server (and webhook receiver), then the alert engine"""
+    on_update = None
+    if POOL:
+        await POOL.start()
+        on_update = POOL.dispatch
+        app.bot_data['views_task'] = asyncio.create_task(push_views(POOL))
+    elif WEBHOOK_URL:
+        async def on_update(data):
+            await app.update_queue.put(Update.de_json(data, app.bot))
+    server = HealthServer(health_stats, healthz, on_update=on_update, webhook_path=WEBHOOK_PATH,
+                          secret=WEBHOOK_SECRET)
+    await server.start()
+    app.bot_data['health_server'] = server
+    await start_alert_engine(app)
+    global BOT
+    BOT = app.bot
+    resume_broadcasts()
+    app.bot_data['broadcasts_task'] = asyncio.create_task(follow_broadcasts())
+    if DIGEST_HOUR >= 0:
+        app.bot_data['digest_task'] = asyncio.create_task(run_digest())
+
+async def post_stop(app: Application):
+    await stop_shards()  # they resume from here on the next start
+    await stop_alert_engine(app)
+    server = app.bot_data.pop('health_server', None)
+    if server:
+        await server.stop()
+    for key in ('views_task', 'broadcasts_task', 'digest_task'):
+        task = app.bot_data.pop(key, None)
+        if task:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    if POOL:
+        await POOL.stop()  # workers finish the updates they were sent
+
+# =============================================================================
+# KEYBOARDS (built once at startup)
+# =============================================================================
+MAIN_MENU_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🐋 Live Whale Alerts", callback_data="alerts")],
+    [InlineKeyboardButton("📊 Top Wallets", callback_data="wallets")],
+    [InlineKeyboardButton("💰 Recent Transfers", callback_data="transfers")],
+    [InlineKeyboardButton("📊 Exchange Flows", callback_data="flows")],
+    [InlineKeyboardButton("📡 Copy Trade Signals", callback_data="signals")],
+    [InlineKeyboardButton("⚙️ Settings", callback_data="settings")],
+    [InlineKeyboardButton("💎 Trade Now", callback_data="trade")]
+])
+
+BACK_MENU_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("« Back", callback_data="back"),
+     InlineKeyboardButton("🏠 Menu", callback_data="menu")]
+])
+
+SETTINGS_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📈 Your Stats", callback_data="stats")],
+    [InlineKeyboardButton("🎁 Earn Rewards", callback_data="referral")],
+    [InlineKeyboardButton("ℹ️ API Status", callback_data="api_status")],
+    [InlineKeyboardButton("« Back", callback_data="back"),
+     InlineKeyboardButton("🏠 Menu", callback_data="menu")]
+])
+
+TRADE_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔥 Bitunix (20% bonus)", url=f"https://www.bitunix.com/register?vipCode={BITUNIX_CODE}")],
+    [InlineKeyboardButton("💎 MEXC (40% fees)", url=f"https://www.mexc.com/register?inviteCode={MEXC_CODE}")],
+    [InlineKeyboardButton("⚡ BloFin", url=f"https://blofin.com/register?referral_code={BLOFIN_CODE}")],
+    [InlineKeyboardButton("« Back", callback_data="back"),
+     InlineKeyboardButton("🏠 Menu", callback_data="menu")]
+])
+
+# =============================================================================
+# BOT HANDLERS
+# =============================================================================
+ROUTES = Router()
+
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Start command - main menu"""
+    # A settings row (defaults: alerts off) makes the chat a recipient of /broadcast
+    await asyncio.to_thread(STORE.update, update.effective_chat.id)
+    text = START_TEXT.text(first_name=update.effective_user.first_name)
+    
+    if update.callback_query:
+        await update.callback_query.edit_message_text(
+            text, 
+            reply_markup=MAIN_MENU_KEYBOARD,
+            parse_mode='Markdown'
+        )
+    else:
+        await update.message.reply_text(
+            text, 
+            reply_markup=MAIN_MENU_KEYBOARD,
+            parse_mode='Markdown'
+        )
+
+# Callback routes: callback_data -> handler(update, context)
+ROUTES.add('back', start)
+ROUTES.add('menu', start)
+
+@ROUTES.route('alerts')
+async def alerts(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    settings = await asyncio.to_thread(STORE.update, update.effective_chat.id, alerts=True, paused=False)
+    set_subscriber(update.effective_chat.id, settings.threshold)
+    text = ALERTS_ON_TEXT.text(threshold=settings.threshold)
+    await update.callback_query.edit_message_text(text, reply_markup=BACK_MENU_KEYBOARD, parse_mode='Markdown')
+
+@ROUTES.route('wallets')
+async def wallets(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.callback_query.edit_message_text(WALLETS_TEXT, reply_markup=BACK_MENU_KEYBOARD, parse_mode='Markdown')
+
+@ROUTES.route('transfers', limit=TRANSFERS_CONCURRENCY)
+async def transfers(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    # An open circuit answers at once with the last data: no waiting on an API that is down
+    if WORKER is None and STREAM.adapters and not STREAM.polled and not STREAM.unavailable():
+        await query.edit_message_text("⏳ Fetching live data...", parse_mode='Markdown')
+        await STREAM.ready(timeout=ETHERSCAN_DEADLINE)  # first poll after startup
+    await query.edit_message_text(shared_view('transfers'), reply_markup=BACK_MENU_KEYBOARD, parse_mode='Markdown')
+
+@ROUTES.route('flows')
+async def flows_view(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.callback_query.edit_message_text(shared_view('flows'), reply_markup=BACK_MENU_KEYBOARD,
+                                                  parse_mode='Markdown')
+
+@ROUTES.route('signals')
+async def signals(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.callback_query.edit_message_text(shared_view('signals'), reply_markup=BACK_MENU_KEYBOARD,
+                                                  parse_mode='Markdown')
+
+@ROUTES.route('settings')
+async def settings_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.callback_query.edit_message_text(SETTINGS_TEXT, reply_markup=SETTINGS_KEYBOARD, parse_mode='Markdown')
+
+@ROUTES.route('trade')
+async def trade(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.callback_query.edit_message_text(TRADE_TEXT, reply_markup=TRADE_KEYBOARD, parse_mode='Markdown')
+
+@ROUTES.route('stats')
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    text = STATS_TEXT.text(ref_code=ref_code(update.effective_user.id))
+    await update.callback_query.edit_message_text(text, reply_markup=BACK_MENU_KEYBOARD, parse_mode='Markdown')
+
+@ROUTES.route('referral')
+async def referral(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # context.bot.username is cached by Application.initialize(): no getMe per tap
+    text = REFERRAL_TEXT.text(ref_code=ref_code(update.effective_user.id), bot_username=context.bot.username)
+    await update.callback_query.edit_message_text(text, reply_markup=BACK_MENU_KEYBOARD, parse_mode='Markdown')
+
+@ROUTES.route('api_status')
+async def api_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.callback_query.edit_message_text(shared_view('api_status'), reply_markup=BACK_MENU_KEYBOARD,
+                                                  parse_mode='Markdown')
+
+async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle all button callbacks"""
+    await update.callback_query.answer()
+    await ROUTES.dispatch_async(update.callback_query.data, update, context)
 
 async def stop(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Stop alerts"""
-    context.user_data['alerts_enabled'] = False
+    await asyncio.to_thread(STORE.update, update.effective_chat.id, alerts=False)
+    set_subscriber(update.effective_chat.id, None)
     await update.message.reply_text(
         "🛑 *Whale Alerts Disabled*\n\nUse /start to enable again.",
-        reply_markup=back_menu_keyboard(),
+        reply_markup=BACK_MENU_KEYBOARD,
         parse_mode='Markdown'
     )
 
+async def flows(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Exchange net flows"""
+    await update.message.reply_text(shared_view('flows'), reply_markup=BACK_MENU_KEYBOARD, parse_mode='Markdown')
+
+def watchlist_text(chat_id):
+    watched = STORE.watches(chat_id)
+    if not watched:
+        return "👁 *Your Watchlist*\n\nEmpty. Add an address with /watch `<address>`."
+    text = f"👁 *Your Watchlist* ({len(watched)}/{WATCH_LIMIT})\n\n"
+    text += ''.join(f"• {chain.title()}: `{address}`\n" for _, chain, address in watched)
+    return text + "\n/watch `<address>` to add, /unwatch `<address>` or /unwatch all to remove"
+
+async def watch(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Watch an Ethereum or Solana address; no argument: show the watchlist"""
+    chat_id = update.effective_chat.id
+    if not context.args:
+        await update.message.reply_text(await asyncio.to_thread(watchlist_text, chat_id), parse_mode='Markdown')
+        return
+    status, chain, address = await asyncio.to_thread(add_watch, STORE, chat_id, context.args[0])
+    if status == 'added':
+        set_watch(chat_id, chain, address, True)
+        text = f"👁 *Watching* `{address}` on {chain.title()}\n\nYou'll get an alert for every transfer."
+    elif status == 'exists':
+        text = f"You already watch `{address}`."
+    elif status == 'limit':
+        text = f"Your watchlist is full ({WATCH_LIMIT} addresses). Remove one with /unwatch first."
+    else:
+        text = "That is not an Ethereum (0x...) or Solana address.\n\nUsage: /watch `<address>`"
+    await update.message.reply_text(text, parse_mode='Markdown')
+
+async def unwatch(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Stop watching an address, or every address with 'all'"""
+    chat_id = update.effective_chat.id
+    if not context.args:
+        await update.message.reply_text(await asyncio.to_thread(watchlist_text, chat_id), parse_mode='Markdown')
+        return
+    if context.args[0].lower() == 'all':
+        dropped = await asyncio.to_thread(STORE.unwatch, chat_id)
+        set_watch(chat_id, None, None, False)
+        text = f"🛑 Removed {dropped} address{'es' if dropped != 1 else ''} from your watchlist."
+    elif (parsed := parse_address(context.args[0])) is None:
+        text = "That is not an Ethereum (0x...) or Solana address.\n\nUsage: /unwatch `<address>` or /unwatch all"
+    elif await asyncio.to_thread(STORE.unwatch, chat_id, *parsed):
+        set_watch(chat_id, *parsed, False)
+        text = f"🛑 Stopped watching `{parsed[1]}`."
+    else:
+        text = f"`{parsed[1]}` is not on your watchlist."
+    await update.message.reply_text(text, parse_mode='Markdown')
+
+BROADCAST_USAGE = """📣 *Broadcast*
+/broadcast send <text> - announce to every chat
+/broadcast status - running broadcasts
+/broadcast cancel <name> - stop one"""
+
+async def broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admins only: /broadcast send <text> to every chat, /broadcast status, /broadcast cancel <name>"""
+    if update.effective_user.id not in ADMIN_IDS:
+        return
+    chat_id = update.effective_chat.id
+    command = context.args[0].lower() if context.args else 'status'
+    # Anything but an exact subcommand is a usage error: a typo must never go out to every chat
+    if command == 'status' and len(context.args) <= 1:
+        await update.message.reply_text(shared_view('broadcasts'), parse_mode='Markdown')
+        return
+    if command == 'cancel' and len(context.args) == 2:
+        name = context.args[1]
+        if await cancel_broadcast(name):
+            text = f"🛑 Cancelled `{name}`."
+        else:
+            text = f"No broadcast named `{name}`. /broadcast status lists the running ones."
+        await update.message.reply_text(text, parse_mode='Markdown')
+        return
+    if command != 'send' or len(context.args) < 2:
+        await update.message.reply_text(BROADCAST_USAGE, parse_mode='Markdown')
+        return
+    text = update.message.text.split(None, 2)[2]  # as typed, line breaks included
+    # The preview doubles as a Markdown check: what Telegram rejects here it would reject for everyone
+    try:
+        await update.message.reply_text(text, parse_mode='Markdown', disable_web_page_preview=True)
+    except BadRequest as e:
+        await update.message.reply_text(f"❌ Not sent, Telegram rejected the message: {e.message}")
+        return
+    name = f"announce-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}"
+    status = await update.message.reply_text(f"📣 *Broadcast* `{name}`: ⏳ starting\n\n"
+                                             f"The message above goes to every chat. /broadcast cancel {name} stops it.",
+                                             parse_mode='Markdown')
+    await start_broadcast(name, text, EVERYONE, {'admin': chat_id, 'message_id': status.message_id})
+
+# =============================================================================
+# METRICS (/metrics; upstream latency and loop lag are in whalefollow.metrics)
+# =============================================================================
+UPDATES = METRICS.counter('whalefollow_updates_total', 'Telegram updates received, by type', ('type',))
+METRICS.histogram('whalefollow_callback_seconds', 'Callback handler latency, by route', ('route',),
+                  fn=lambda: {(route.name,): route.timings for route in ROUTES.all() if route.calls})
+METRICS.counter('whalefollow_callback_errors_total', 'Callback handlers that raised, by route', ('route',),
+                fn=lambda: {(route.name,): route.errors for route in ROUTES.all() if route.calls})
+METRICS.counter('whalefollow_polls_total', 'Completed chain polls', ('chain',),
+                fn=lambda: {(chain,): adapter.polls for chain, adapter in STREAM.adapters.items()})
+METRICS.counter('whalefollow_poll_errors_total', 'Failed chain polls', ('chain',),
+                fn=lambda: {(chain,): adapter.errors for chain, adapter in STREAM.adapters.items()})
+METRICS.gauge('whalefollow_poll_age_seconds', 'Seconds since a chain last delivered data', ('chain',),
+              fn=lambda: {(chain,): age for chain, age in STREAM.poll_ages().items()} if STREAM.started else {})
+METRICS.counter('whalefollow_signals_total', 'Copy-trade signals raised', ('kind',),
+                fn=lambda: {(kind,): n for kind, n in SIGNALS.signals.items()})
+METRICS.gauge('whalefollow_watched_addresses', 'Unique watched addresses polled', ('chain',),
+              fn=lambda: {(chain,): len(WATCHES.addresses(chain)) for chain in STREAM.adapters})
+METRICS.gauge('whalefollow_send_queue_depth', 'Bot API calls waiting in the send queue', ('lane',),
+              fn=lambda: {(lane,): depth for lane, depth in SEND_QUEUE.depth().items()})
+
+def update_type(update):
+    for kind in Update.ALL_TYPES:
+        if getattr(update, kind, None) is not None:
+            return kind
+    return 'unknown'
+
+async def count_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    UPDATES.inc(update_type(update))
+
+# =============================================================================
+# WEBHOOK WORKERS (WEBHOOK_WORKERS; whalefollow.workers)
+# =============================================================================
+# The front receives webhooks, polls the chains and sends alerts; workers run
+# the handlers. A chat always goes to the same worker, so its updates stay in
+# order and its settings have one writer. The settings store (SETTINGS_URL)
+# is shared: use sqlite or redis, not memory://.
+async def on_worker_message(message):
+    if 'subscriber' in message:
+        chat_id, threshold = message['subscriber']
+        set_subscriber(chat_id, threshold)
+    elif 'watch' in message:
+        set_watch(*message['watch'])
+    elif 'blocked' in message:
+        await drop_blocked(message['blocked'])
+    elif 'broadcast_progress' in message:
+        report_broadcast(message['broadcast_progress'])
+    elif 'broadcast_start' in message:
+        await start_broadcast(*message['broadcast_start'])
+    elif 'broadcast_cancel' in message:
+        await cancel_broadcast(message['broadcast_cancel'])
+
+async def push_views(pool, interval=VIEW_PUSH_INTERVAL):
+    """Send workers the chain-data views whenever they change"""
+    pushed = {}
+    while True:
+        changed = {name: text for name, text in ((name, render()) for name, render in VIEWS.items())
+                   if pushed.get(name) != text}
+        if changed:
+            pool.broadcast({'views': changed})
+            pushed.update(changed)
+        await asyncio.sleep(interval)
+
+def run_worker(index, count, sock):
+    """Webhook worker process: handle the updates the front sends until it closes the pipe"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C reaches the whole group; the front stops us
+    asyncio.run(serve_worker(index, count, sock))
+
+async def serve_worker(index, count, sock):
+    global WORKER, WORKER_SHARD
+    reader, WORKER = await open_link(sock)
+    WORKER_SHARD = (index, count)
+    app = build_app()
+
+    async def on_message(message):
+        if 'update' in message:
+            await app.update_queue.put(Update.de_json(message['update'], app.bot))
+        elif 'views' in message:
+            SHARED_VIEWS.update(message['views'])
+        elif 'blocked' in message:
+            await drop_blocked(message['blocked'])
+        elif 'broadcast' in message:
+            start_shard(app.bot, message['broadcast'])
+        elif 'broadcast_cancel' in message:
+            cancel_shards(message['broadcast_cancel'])
+
+    async with app:  # initialize / shutdown; no post_init: the front runs the servers and pollers
+        await app.start()
+        logger.info(f"Webhook worker {index + 1}/{count} ready")
+        try:
+            await read_frames(reader, on_message)
+        finally:
+            await stop_shards()
+            await app.stop()
+    STORE.close()
+
+POOL = WorkerPool(WORKER_PROCESSES, run_worker, on_worker_message) if WORKER_PROCESSES else None
+
 # =============================================================================
 # MAIN
 # =============================================================================
+def build_app(token=BOT_TOKEN, base_url=TELEGRAM_API_URL):
+    builder = (
+        Application.builder()
+        .token(token)
+        .rate_limiter(QueueRateLimiter())
+        .concurrent_updates(ChatOrderedProcessor(UPDATE_CONCURRENCY))  # in order within a chat
+        .post_init(post_init)
+        .post_stop(post_stop)
+    )
+    if base_url:
+        builder = builder.base_url(base_url)
+    app = builder.build()
+    
+    app.add_handler(TypeHandler(Update, count_update), group=-1)  # runs before the handlers below
+    app.add_handler(CommandHandler("start", start))
+    app.add_handler(CommandHandler("stop", stop))
+    app.add_handler(CommandHandler("flows", flows))
+    app.add_handler(CommandHandler("watch", watch))
+    app.add_handler(CommandHandler("unwatch", unwatch))
+    app.add_handler(CommandHandler("broadcast", broadcast))
+    app.add_handler(CallbackQueryHandler(handle_callback))
+    return app
+
+async def run_webhook(app: Application, stopping=None):
+    """run_polling's lifecycle, with updates arriving through the health server until
+    `stopping` is set (by default on SIGINT/SIGTERM)
+    """
+    if stopping is None:
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stopping.set)
+    async with app:  # initialize / shutdown
+        await post_init(app)
+        await app.bot.set_webhook(WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH, secret_token=WEBHOOK_SECRET,
+                                  allowed_updates=Update.ALL_TYPES)
+        await app.start()
+        try:
+            await stopping.wait()
+        finally:
+            await app.stop()
+            await post_stop(app)
+
 def main():
     if not BOT_TOKEN:
         logger.error("BOT_TOKEN not set!")
@@ -316,23 +1077,22 @@ def main():
     
     logger.info(f"Starting bot with token: {BOT_TOKEN[:10]}...")
     logger.info(f"Etherscan API: {'Set' if ETHERSCAN_API else 'Not set'}")
+    logger.info(f"Ethereum ingestion: {'block subscription' if ETH_WS_URL else 'txlist polling'}")
+    logger.info(f"Solana API: {'Helius' if HELIUS_KEY else 'Solscan' if SOLSCAN_API else 'Not set'}")
     
-    # Start health check server in background thread
-    health_thread = threading.Thread(target=run_health_server, daemon=True)
-    health_thread.start()
-    logger.info("Health server started")
-    
-    # Build bot application
-    app = Application.builder().token(BOT_TOKEN).build()
-    
-    # Add handlers
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(CommandHandler("stop", stop))
-    app.add_handler(CallbackQueryHandler(handle_callback))
+    app = build_app()
     
     # Run bot
-    logger.info("Starting bot polling...")
-    app.run_polling(allowed_updates=Update.ALL_TYPES)
+    if WEBHOOK_URL:
+        logger.info(f"Starting bot in webhook mode: {WEBHOOK_URL}"
+                    + (f", {WORKER_PROCESSES} workers" if WORKER_PROCESSES else ''))
+        if WORKER_PROCESSES and isinstance(STORE, MemoryStore):
+            logger.warning("SETTINGS_URL is memory://: each worker keeps its own settings")
+        asyncio.run(run_webhook(app))
+    else:
+        logger.info("Starting bot polling...")
+        app.run_polling(allowed_updates=Update.ALL_TYPES)
+    STORE.close()
 
 if __name__ == "__main__":
     main()
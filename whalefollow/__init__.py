@@ -0,0 +1,4 @@
+"""
+WhaleFollow Pro - shared tracking core
+Used by bot.py (long-running polling bot) and api/webhook.py (Vercel)
+"""
@@ -0,0 +1,238 @@
+"""
+WhaleFollow Pro - whale alert engine
+- Background poll loop over the tracked wallets (one poll per cycle)
+- Subscriber index sorted by threshold: O(log n + matches) per transfer
+- Rate-limited dispatch queue for outgoing alerts
+- Subscribers come from the settings store: periodic batched reload, and
+  each match is re-checked with one batched read
+"""
+
+import os
+import asyncio
+import logging
+from bisect import bisect_right, insort
+
+from whalefollow.etherscan import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+ALERT_INTERVAL = float(os.environ.get('ALERT_INTERVAL', 60))
+ALERT_RELOAD = float(os.environ.get('ALERT_RELOAD', 300))
+ALERT_RPS = float(os.environ.get('ALERT_RPS', 25))
+ALERT_WORKERS = int(os.environ.get('ALERT_WORKERS', 8))
+ALERT_QUEUE = int(os.environ.get('ALERT_QUEUE', 250_000))  # alerts waiting to be sent; past this they are dropped
+
+
+# =============================================================================
+# SUBSCRIBER INDEX
+# =============================================================================
+class ThresholdIndex:
+    """Alert subscribers kept sorted by (threshold, chat_id).
+
+    Everyone whose threshold is <= a transfer's value is a prefix of the
+    list, found with one bisect.
+    """
+
+    def __init__(self, subscribers=()):
+        self._thresholds = {}  # chat_id -> threshold
+        self._keys = []  # sorted [(threshold, chat_id)]
+        self.load(subscribers)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, chat_id):
+        return chat_id in self._thresholds
+
+    def load(self, subscribers):
+        """Replace the contents with (chat_id, threshold) pairs"""
+        self._thresholds = dict(subscribers)
+        self._keys = sorted((threshold, chat_id) for chat_id, threshold in self._thresholds.items())
+
+    def set(self, chat_id, threshold):
+        self.remove(chat_id)
+        self._thresholds[chat_id] = threshold
+        insort(self._keys, (threshold, chat_id))
+
+    def remove(self, chat_id):
+        threshold = self._thresholds.pop(chat_id, None)
+        if threshold is None:
+            return
+        i = bisect_right(self._keys, (threshold, chat_id)) - 1
+        del self._keys[i]
+
+    def match(self, value):
+        """chat_ids whose threshold is <= value"""
+        end = bisect_right(self._keys, (value, float('inf')))
+        return [chat_id for _, chat_id in self._keys[:end]]
+
+
+# =============================================================================
+# ALERT ENGINE
+# =============================================================================
+def format_alert(name, address, tx, labels=None, heading="🐋 *Whale Alert*"):
+    """Markdown alert text for one transfer; `labels(chain, address)` names the counterparty"""
+    outgoing = tx.is_from(address)
+    other = tx.to if outgoing else tx.sender
+    label = labels(tx.chain, other) if labels is not None and other else None
+    short = f"`{other[:10]}...`" if other else 'Contract'
+    other = f"{label} {short}" if label else short
+    emoji = "🔴" if outgoing else "🟢"
+    usd = f" (${tx.usd:,.0f})" if tx.usd is not None else ''
+    return f"""{heading}
+
+{emoji} *{name}* {'OUT' if outgoing else 'IN'}: *{tx.amount:,.2f} {tx.symbol}*{usd}
+{'→' if outgoing else '←'} {other}
+
+[View on {tx.explorer_name}]({tx.url})"""
+
+
+class AlertEngine:
+    """Polls once per cycle, matches new transfers, queues alerts.
+
+    `send(chat_id, text)` is the coroutine that delivers one alert;
+    `get_client()` returns the HTTP client for the poller. The poller can
+    also be a chains.StreamReader (with interval=0, its poll() blocks until
+    new transfers arrive). With a settings `store`, the index is rebuilt from
+    it every `reload_every` seconds and matches are re-checked against
+    current settings before queueing. Thresholds are in `symbol`; transfers
+    of other assets are converted through their USD value with `prices`
+    (a tokens.PriceFeed) and skipped while unpriced.
+    """
+
+    def __init__(self, poller, get_client, send, *, index=None, store=None, interval=ALERT_INTERVAL,
+                 reload_every=ALERT_RELOAD, rate=ALERT_RPS, workers=ALERT_WORKERS, formatter=format_alert,
+                 symbol='ETH', prices=None, max_queued=ALERT_QUEUE):
+        self.poller = poller
+        self.get_client = get_client
+        self.send = send
+        self.index = index if index is not None else ThresholdIndex()
+        self.store = store
+        self.reload_every = reload_every
+        self._reloaded = None
+        self.interval = interval
+        self.limiter = RateLimiter(rate)
+        self.workers = workers
+        self.formatter = formatter
+        self.symbol = symbol
+        self.prices = prices
+        self.queue = asyncio.Queue(max_queued)
+        self.polls = 0
+        self.matched = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0  # queue full: the send lane can't keep up
+
+    def stats(self):
+        return {
+            'subscribers': len(self.index),
+            'polls': self.polls,
+            'matched': self.matched,
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'queued': self.queue.qsize(),
+        }
+
+    def scan_subscribers(self):
+        """(chat_id, threshold) for everyone receiving alerts, read from the store in batches"""
+        subscribers = []
+        for batch in self.store.iter_batches():
+            subscribers.extend((chat_id, s.threshold) for chat_id, s in batch if s.receives_alerts)
+        return subscribers
+
+    async def poll_once(self):
+        """One cycle: fetch new transfers and queue an alert per matching subscriber"""
+        loop = asyncio.get_running_loop()
+        if self.store is not None and (self._reloaded is None or loop.time() - self._reloaded >= self.reload_every):
+            self.index.load(await asyncio.to_thread(self.scan_subscribers))
+            self._reloaded = loop.time()
+            logger.info(f"Alert subscribers reloaded: {len(self.index)}")
+        new = await self.poller.poll(self.get_client())
+        self.polls += 1
+        return await self.match(new)
+
+    def threshold_value(self, tx):
+        """Transfer size in `symbol` units, or None if it can't be compared"""
+        if tx.symbol == self.symbol:
+            return tx.amount
+        if tx.usd is None or self.prices is None:
+            return None
+        price = self.prices.price(self.symbol)
+        return tx.usd / price if price else None
+
+    async def match(self, rows):
+        """Queue alerts for (name, address, tx) rows; returns how many were queued"""
+        queued = 0
+        for name, address, tx in reversed(rows):  # oldest first
+            value = self.threshold_value(tx)
+            if value is None:
+                continue
+            chats = self.index.match(value)
+            if chats and self.store is not None:
+                # Settings may have changed since the last reload (e.g. paused via the webhook)
+                current = await asyncio.to_thread(self.store.get_many, chats)
+                chats = [c for c in chats if current[c].receives_alerts and current[c].threshold <= value]
+            if not chats:
+                continue
+            queued += self.enqueue(chats, self.formatter(name, address, tx))
+        self.matched += queued
+        return queued
+
+    def enqueue(self, chats, text):
+        """Queue `text` for `chats`, dropping what no longer fits; returns how many were queued"""
+        queued = 0
+        for chat_id in chats:
+            try:
+                self.queue.put_nowait((chat_id, text))
+                queued += 1
+            except asyncio.QueueFull:
+                break
+        if queued < len(chats):
+            self.dropped += len(chats) - queued
+            logger.warning(f"Alert queue full ({self.queue.maxsize}): dropped {len(chats) - queued} alerts, "
+                           f"{self.dropped} in total")
+        return queued
+
+    async def broadcast(self, text, chats=None):
+        """Queue `text` for `chats` (default: every subscriber, as for copy-trade signals); returns how many"""
+        if chats is None:
+            chats = self.index.match(float('inf'))
+            if chats and self.store is not None:
+                # Like transfer alerts: the index may predate a pause or /stop
+                current = await asyncio.to_thread(self.store.get_many, chats)
+                chats = [c for c in chats if current[c].receives_alerts]
+        return self.enqueue(chats, text)
+
+    async def run(self):
+        """Poll forever; meant to run as a background task next to the bot"""
+        workers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+        loop = asyncio.get_running_loop()
+        logger.info(f"Alert engine running: every {self.interval:g}s, {len(self.index)} subscribers")
+        try:
+            while True:
+                started = loop.time()
+                try:
+                    queued = await self.poll_once()
+                    if queued:
+                        logger.info(f"Queued {queued} whale alerts")
+                except Exception as e:
+                    logger.error(f"Alert poll failed: {e}")
+                await asyncio.sleep(max(0.0, self.interval - (loop.time() - started)))
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _dispatch(self):
+        while True:
+            chat_id, text = await self.queue.get()
+            try:
+                await self.limiter.acquire()
+                await self.send(chat_id, text)
+                self.sent += 1
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"Alert to {chat_id} failed: {e}")
+            finally:
+                self.queue.task_done()
@@ -0,0 +1,273 @@
+"""
+WhaleFollow Pro - block subscription ingestion
+- eth_subscribe newHeads over a WebSocket JSON-RPC node
+- Each new block is fetched once with its transactions and scanned against
+  the wallet registry: cost follows the block rate, not the wallet count
+- ERC-20 Transfer logs of tracked tokens: one eth_getLogs per batch of blocks
+- Reconnects with backoff; blocks missed while disconnected are backfilled
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import itertools
+from collections import OrderedDict
+
+from whalefollow.metrics import upstream_call
+from whalefollow.poller import RECENT_WINDOW
+from whalefollow.tokens import TokenTransfer
+from whalefollow.txstream import Tx
+
+logger = logging.getLogger(__name__)
+
+ETH_WS_URL = os.environ.get('ETH_WS_URL')
+BLOCK_BACKFILL = int(os.environ.get('BLOCK_BACKFILL', 64))
+BLOCK_CONCURRENCY = int(os.environ.get('BLOCK_CONCURRENCY', 8))
+BLOCK_RECONNECT_MAX = float(os.environ.get('BLOCK_RECONNECT_MAX', 30))
+
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'  # Transfer(address,address,uint256)
+
+
+class RpcError(Exception):
+    pass
+
+
+class RpcSocket:
+    """JSON-RPC over one WebSocket: replies are matched to call() by id,
+    subscription notifications are queued. read() must run alongside.
+    """
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.notifications = asyncio.Queue()  # subscription results; None once the socket closed
+        self._ids = itertools.count(1)
+        self._pending = {}  # request id -> future
+
+    async def call(self, method, *params):
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        with upstream_call('eth_node', method):
+            await self.ws.send_str(json.dumps({'jsonrpc': '2.0', 'id': request_id, 'method': method,
+                                               'params': list(params)}))
+            return await future
+
+    async def read(self):
+        import aiohttp
+        try:
+            async for message in self.ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                data = json.loads(message.data)
+                future = self._pending.pop(data.get('id'), None)
+                if future is not None:
+                    if future.done():
+                        continue
+                    if data.get('error'):
+                        future.set_exception(RpcError(data['error'].get('message', data['error'])))
+                    else:
+                        future.set_result(data.get('result'))
+                elif data.get('method') == 'eth_subscription':
+                    self.notifications.put_nowait(data['params']['result'])
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("WebSocket closed"))
+            self._pending.clear()
+            self.notifications.put_nowait(None)
+
+
+def _topic_address(topic):
+    return '0x' + topic[-40:]
+
+
+class BlockPoller:
+    """Ingests Ethereum blocks from a newHeads subscription; drop-in for TransferPoller.
+
+    The WebSocket task starts on the first poll(). poll(client) waits up to
+    `timeout` for scanned blocks and returns their new (name, address, tx)
+    rows newest first; `client` is unused. After a reconnect or a burst of
+    heads, every block since the last one scanned is fetched, at most
+    `backfill` of them. With `tokens`, Transfer logs of its contracts are
+    scanned too; tokens whose decimals are not known yet are skipped.
+    """
+
+    def __init__(self, registry, url=ETH_WS_URL, *, tokens=None, backfill=BLOCK_BACKFILL,
+                 concurrency=BLOCK_CONCURRENCY, reconnect_max=BLOCK_RECONNECT_MAX, window=RECENT_WINDOW,
+                 timeout=5.0):
+        self.registry = registry
+        self.url = url
+        self.tokens = tokens
+        self.backfill = backfill
+        self.concurrency = concurrency
+        self.reconnect_max = reconnect_max
+        self.window = window
+        self.timeout = timeout
+        self.wallets = registry.tracked()
+        self.watched = {}  # lowercase address -> name, matched besides the registry's tracked wallets
+        self.head = None  # highest block scanned
+        self.blocks = 0
+        self.txs = 0
+        self.backfilled = 0
+        self.skipped = 0
+        self.reconnects = 0
+        self.connected = False
+        self.last_block = None  # wall-clock time a block was last scanned
+        self._recent = OrderedDict()  # 'hash:symbol' -> (name, address, tx), oldest first
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def __len__(self):
+        return len(self._recent)
+
+    async def poll(self, client=None):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run(), name='eth-blocks')
+        try:
+            rows = list(await asyncio.wait_for(self._queue.get(), self.timeout))
+        except asyncio.TimeoutError:
+            return []
+        while not self._queue.empty():
+            rows.extend(self._queue.get_nowait())
+        rows.reverse()
+        return rows
+
+    def watch(self, wallets):
+        """Also match `wallets` ({address: name}), replacing the previous extra set; free per address"""
+        self.watched = {address.lower(): name for address, name in wallets.items()}
+
+    def latest(self, limit=None):
+        """Newest-first (name, address, tx) rows from the rolling window"""
+        rows = sorted(self._recent.values(), key=lambda row: (row[2].block, row[2].timestamp), reverse=True)
+        return rows[:limit] if limit else rows
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self):
+        return {
+            'head': self.head,
+            'connected': self.connected,
+            'blocks': self.blocks,
+            'txs': self.txs,
+            'backfilled': self.backfilled,
+            'skipped': self.skipped,
+            'reconnects': self.reconnects,
+        }
+
+    async def run(self):
+        """Subscribe, scan, reconnect forever"""
+        import aiohttp
+        delay = 1.0
+        async with aiohttp.ClientSession() as session:
+            while True:
+                try:
+                    async with session.ws_connect(self.url, heartbeat=30) as ws:
+                        rpc = RpcSocket(ws)
+                        reader = asyncio.create_task(rpc.read())
+                        try:
+                            await rpc.call('eth_subscribe', 'newHeads')
+                            self.connected = True
+                            delay = 1.0
+                            logger.info(f"Subscribed to new blocks at {self.url}")
+                            if self.head is not None:  # blocks mined while we were away
+                                await self.catch_up(rpc, int(await rpc.call('eth_blockNumber'), 16))
+                            while (head := await rpc.notifications.get()) is not None:
+                                await self.catch_up(rpc, int(head['number'], 16))
+                        finally:
+                            self.connected = False
+                            reader.cancel()
+                            await asyncio.gather(reader, return_exceptions=True)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Block subscription failed: {e}")
+                self.reconnects += 1
+                logger.warning(f"Block subscription lost after block {self.head}; reconnecting in {delay:g}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.reconnect_max)
+
+    async def catch_up(self, rpc, number):
+        """Scan every block from the last one scanned up to `number`"""
+        if self.head is None or number <= self.head:
+            first = number  # first head, or a re-org replacing a scanned block: hashes dedupe
+        else:
+            first = self.head + 1
+            if number - first >= self.backfill:
+                missed = number - self.backfill + 1 - first
+                self.skipped += missed
+                logger.warning(f"Block gap of {number - first + 1}: skipping {missed} blocks, backfill is "
+                               f"{self.backfill}")
+                first += missed
+            self.backfilled += number - first
+        for start in range(first, number + 1, self.concurrency):
+            end = min(start + self.concurrency, number + 1)
+            calls = [rpc.call('eth_getBlockByNumber', hex(n), True) for n in range(start, end)]
+            contracts = [token.contract for token in self.tokens.contracts()] if self.tokens is not None else []
+            if contracts:
+                calls.append(rpc.call('eth_getLogs', {'fromBlock': hex(start), 'toBlock': hex(end - 1),
+                                                      'address': contracts, 'topics': [TRANSFER_TOPIC]}))
+            results = await asyncio.gather(*calls)
+            blocks = [block for block in results[:end - start] if block]
+            self.push(self.scan(blocks, results[-1] if contracts else ()))
+        self.head = max(self.head or 0, number)
+
+    def scan(self, blocks, logs=()):
+        """New rows for tracked wallets in full blocks and their Transfer logs, oldest first"""
+        rows = []
+        timestamps = {}
+        for block in blocks:
+            number = int(block['number'], 16)
+            timestamp = timestamps[number] = int(block['timestamp'], 16)
+            for tx in block['transactions']:
+                sender, to = tx['from'], tx.get('to') or ''
+                match = self.match(sender, to)
+                if match:
+                    self.add(rows, match, Tx(tx['hash'], sender, to, int(tx['value'], 16), number, timestamp))
+            self.blocks += 1
+            self.txs += len(block['transactions'])
+            self.last_block = time.time()
+        for log in logs:
+            token = self.tokens.get(log['address'])
+            if token is None or token.decimals is None or len(log['topics']) != 3:
+                continue  # NFT transfers index the token id as a fourth topic
+            sender, to = _topic_address(log['topics'][1]), _topic_address(log['topics'][2])
+            match = self.match(sender, to)
+            if match:
+                number = int(log['blockNumber'], 16)
+                value = int(log['data'], 16) if log['data'] != '0x' else 0
+                self.add(rows, match, TokenTransfer(log['transactionHash'], sender, to, value, number,
+                                                    timestamps.get(number, 0), token))
+        while len(self._recent) > self.window:
+            self._recent.popitem(last=False)
+        rows.sort(key=lambda row: row[2].block)
+        return rows
+
+    def match(self, sender, to):
+        """(name, address) of the tracked (else watched) wallet on either side, sender first, or None"""
+        for address in (sender, to):
+            label = self.registry.lookup(address) if address else None
+            if label is not None and label.tracked:
+                return label.name, address.lower()
+        if self.watched:
+            for address in (sender, to):
+                name = self.watched.get(address.lower()) if address else None
+                if name is not None:
+                    return name, address.lower()
+        return None
+
+    def add(self, rows, match, tx):
+        key = f"{tx.hash}:{tx.symbol}"  # a swap moves ETH and tokens in one transaction
+        if key not in self._recent:
+            row = (*match, tx)
+            self._recent[key] = row
+            rows.append(row)
+
+    def push(self, rows):
+        if rows:
+            self._queue.put_nowait(rows)
@@ -0,0 +1,148 @@
+"""
+WhaleFollow Pro - upstream circuit breaker
+- One breaker per upstream (Etherscan, Helius, Solscan): after
+  BREAKER_FAILURES failed calls in a row it opens and calls fail at once
+- After a cooldown one probe call is let through (half-open): success
+  closes the circuit, failure reopens it with a doubled cooldown
+- While open, pollers skip the upstream and views show their last data
+  with its age instead of waiting on timeouts
+"""
+
+import os
+import time
+import logging
+
+from whalefollow.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+BREAKER_FAILURES = int(os.environ.get('BREAKER_FAILURES', 5))  # failed calls in a row that open the circuit
+BREAKER_RESET = float(os.environ.get('BREAKER_RESET', 30))  # seconds before the first probe
+BREAKER_MAX_RESET = float(os.environ.get('BREAKER_MAX_RESET', 600))  # cooldown cap as probes keep failing
+
+CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+
+CIRCUIT_STATE = METRICS.gauge('whalefollow_circuit_state', 'Upstream circuit: 0 closed, 1 half-open, 2 open',
+                              ('upstream',))
+CIRCUIT_REJECTED = METRICS.counter('whalefollow_circuit_rejected_total', 'Upstream calls skipped by an open circuit',
+                                   ('upstream',))
+
+
+class UpstreamError(Exception):
+    """An upstream answered, but not with data (error status, bad key, ...)"""
+
+
+class RateLimited(UpstreamError):
+    """HTTP 429 or a "rate limit" result; `retry_after` seconds if the upstream said"""
+
+    def __init__(self, message, retry_after=0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpen(UpstreamError):
+    """The call was not made: the upstream's circuit is open"""
+
+    def __init__(self, upstream, retry_after):
+        super().__init__(f"{upstream} circuit open, next probe in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with half-open probing and exponential cooldown.
+
+    Wrap each call in check() / success(ticket) / failure(ticket); check()
+    raises CircuitOpen instead of letting a call through. Half-open admits
+    a single probe: concurrent callers are rejected until it reports back,
+    and only its ticket moves the circuit out of half-open (a call that
+    went out before the trip says nothing about the upstream now).
+    """
+
+    def __init__(self, upstream, failures=BREAKER_FAILURES, reset=BREAKER_RESET, max_reset=BREAKER_MAX_RESET):
+        self.upstream = upstream
+        self.threshold = failures
+        self.reset = reset
+        self.max_reset = max_reset
+        self.state = CLOSED
+        self.failures = 0  # in a row
+        self.cooldown = reset
+        self.opened_at = None  # time.monotonic() of the last trip
+        self.since = None  # wall-clock time the circuit last left closed
+        self.trips = 0
+        self.rejected = 0
+        self._probing = False
+        self._probe = 0  # ticket of the current half-open probe
+        CIRCUIT_STATE.set(0, upstream)
+
+    @property
+    def closed(self):
+        return self.state == CLOSED
+
+    def retry_after(self):
+        """Seconds until the next probe may run (0 unless open)"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def check(self, probe=True):
+        """Raise CircuitOpen unless a call may go out now; returns the call's ticket.
+
+        The ticket is for success() / failure(): the probe's own number in
+        half-open, None otherwise. probe=False only asks (before a batch of
+        calls): it claims no half-open probe, so the first call of the
+        batch still can.
+        """
+        if self.state == OPEN and self.retry_after() == 0:
+            self._set(HALF_OPEN)
+        if self.state == CLOSED:
+            return None
+        if self.state == HALF_OPEN and not self._probing:
+            if not probe:
+                return None
+            self._probing = True
+            return self._probe
+        self.rejected += 1
+        CIRCUIT_REJECTED.inc(self.upstream)
+        raise CircuitOpen(self.upstream, self.retry_after())
+
+    def success(self, ticket=None):
+        if self.state == CLOSED:
+            self.failures = 0
+        elif self.state == HALF_OPEN and ticket == self._probe:
+            self.failures = 0
+            logger.info(f"{self.upstream} circuit closed after {time.time() - self.since:.0f}s")
+            self.cooldown = self.reset
+            self._set(CLOSED)
+
+    def failure(self, ticket=None):
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            if ticket != self._probe:
+                return
+            self.cooldown = min(self.cooldown * 2, self.max_reset)
+            self._trip()
+        elif self.state == CLOSED and self.failures >= self.threshold:
+            self.since = time.time()
+            self._trip()
+
+    def _trip(self):
+        self.trips += 1
+        self.opened_at = time.monotonic()
+        self._set(OPEN)
+        logger.warning(f"{self.upstream} circuit open after {self.failures} failures, probing in {self.cooldown:.0f}s")
+
+    def _set(self, state):
+        self.state = state
+        self._probing = False
+        if state == HALF_OPEN:
+            self._probe += 1
+        CIRCUIT_STATE.set((CLOSED, HALF_OPEN, OPEN).index(state), self.upstream)
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'trips': self.trips,
+            'rejected': self.rejected,
+            'retry_after': round(self.retry_after(), 1),
+        }
@@ -0,0 +1,232 @@
+"""
+WhaleFollow Pro - bulk broadcasts (admin announcements, daily digest)
+- Recipients stream from the settings store in chat_id order,
+  BROADCAST_BATCH at a time: the user base never sits in memory
+- The message is rendered once; a send only adds the chat id
+- At most BROADCAST_WINDOW sends in flight. Pacing is the send queue's
+  (its broadcast lane), so interactive replies still go first
+- Sharded by chat like the webhook workers (workers.chat_shard): each
+  worker sends to the chats it owns, on its own share of the send rate
+- Checkpoint every BROADCAST_CHECKPOINT seconds: the chat id below which
+  every send has finished. After a crash it resumes there, so at most the
+  sends of one checkpoint interval go out twice; stop() (a clean shutdown)
+  lets the in-flight sends finish and checkpoints exactly, cancel() lets
+  them finish and drops the checkpoint
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+
+from whalefollow.workers import chat_shard
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_BATCH = int(os.environ.get('BROADCAST_BATCH', 1000))  # chats read from the store at a time
+BROADCAST_WINDOW = int(os.environ.get('BROADCAST_WINDOW', 64))  # sends in flight per process
+BROADCAST_CHECKPOINT = float(os.environ.get('BROADCAST_CHECKPOINT', 5))  # seconds between checkpoints
+
+PREFIX = 'broadcast:'
+FIRST = -2**63  # iter_batches start: group chats have negative ids
+
+# Audiences
+EVERYONE = 'all'  # every chat in the store (announcements)
+SUBSCRIBED = 'alerts'  # chats receiving alerts (the digest)
+
+
+def checkpoint_name(name, shard):
+    return f"{PREFIX}{name}:{shard}"
+
+
+def unfinished(store):
+    """{name: {shard: checkpoint}} of broadcasts that were cut off (crash, restart)"""
+    jobs = {}
+    for state in store.checkpoints(PREFIX).values():
+        jobs.setdefault(state['name'], {})[state['shard']] = state
+    return jobs
+
+
+class Broadcast:
+    """One shard of a broadcast: `text` to every `audience` chat with chat_shard(chat_id, shards) == shard.
+
+    `send(chat_id, text)` delivers one message and raises on failure; it
+    handles blocked chats itself. The checkpoint (store.save_checkpoint)
+    carries everything needed to resume: Broadcast.resume(store, send, state).
+    """
+
+    def __init__(self, store, send, name, text, *, audience=EVERYONE, shard=0, shards=1, batch_size=BROADCAST_BATCH,
+                 window=BROADCAST_WINDOW, checkpoint_every=BROADCAST_CHECKPOINT, meta=None):
+        self.store = store
+        self.send = send
+        self.name = name
+        self.text = text
+        self.audience = audience
+        self.shard = shard
+        self.shards = shards
+        self.batch_size = batch_size
+        self.window = window
+        self.checkpoint_every = checkpoint_every
+        self.meta = meta or {}  # kept in the checkpoint (e.g. who to report progress to)
+        self.after = FIRST  # every chat up to here is done
+        self.sent = 0
+        self.failed = 0
+        self.total = None  # recipients in this shard, counted before sending
+        self.started = time.time()
+        self.done = False
+        self.error = None  # why run() failed: the shard stops here, its checkpoint resumes it on restart
+        self.stopping = False
+        self.cancelled = False  # no checkpoint is written once set
+        self._resumed_at = 0  # sent + failed when this process picked the job up
+        self._run_started = None
+
+    @classmethod
+    def resume(cls, store, send, state, **kwargs):
+        job = cls(store, send, state['name'], state['text'], audience=state['audience'], shard=state['shard'],
+                  shards=state['shards'], meta=state.get('meta'), **kwargs)
+        job.after, job.sent, job.failed, job.started = state['after'], state['sent'], state['failed'], state['started']
+        job._resumed_at = job.sent + job.failed
+        return job
+
+    def state(self):
+        return {'name': self.name, 'text': self.text, 'audience': self.audience, 'shard': self.shard,
+                'shards': self.shards, 'meta': self.meta, 'after': self.after, 'sent': self.sent,
+                'failed': self.failed, 'started': self.started}
+
+    def selects(self, chat_id, settings):
+        return chat_shard(chat_id, self.shards) == self.shard and (self.audience == EVERYONE or settings.receives_alerts)
+
+    def count(self):
+        """Recipients of this shard in the whole store (one streaming pass)"""
+        return sum(self.selects(chat_id, settings) for batch in self.store.iter_batches(self.batch_size, FIRST)
+                   for chat_id, settings in batch)
+
+    def stop(self):
+        """Make run() return after the in-flight sends, with a checkpoint to resume from"""
+        self.stopping = True
+
+    def cancel(self):
+        """Make run() return after the in-flight sends and drop the checkpoint: the broadcast never resumes"""
+        self.stopping = self.cancelled = True
+
+    async def run(self):
+        """Deliver to every remaining recipient; the checkpoint is dropped once done"""
+        loop = asyncio.get_running_loop()
+        if self.total is None:
+            self.total = await asyncio.to_thread(self.count)
+        self._run_started = loop.time()
+        slots = asyncio.Semaphore(self.window)
+        inflight = deque()  # [chat_id, finished] in send order
+        tasks = set()  # the loop only keeps weak references
+        batches = self.store.iter_batches(self.batch_size, self.after)
+        scanned = self.after
+        await self._checkpoint(inflight, scanned)
+        saved = loop.time()
+        while not self.stopping and (batch := await asyncio.to_thread(next, batches, None)) is not None:
+            for chat_id, settings in batch:
+                if self.stopping:
+                    break
+                scanned = chat_id
+                if not self.selects(chat_id, settings):
+                    continue
+                await slots.acquire()
+                entry = [chat_id, False]
+                inflight.append(entry)
+                task = loop.create_task(self._deliver(entry, slots))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                if loop.time() - saved >= self.checkpoint_every:
+                    await self._checkpoint(inflight, scanned)
+                    saved = loop.time()
+        for _ in range(self.window):  # every send has finished
+            await slots.acquire()
+        self.after = scanned
+        if self.cancelled:
+            await asyncio.to_thread(self.store.save_checkpoint, checkpoint_name(self.name, self.shard), None)
+            logger.info(f"Broadcast {self.name} shard {self.shard}/{self.shards} cancelled after {self.sent} sent")
+            return
+        if self.stopping:
+            await asyncio.to_thread(self.store.save_checkpoint, checkpoint_name(self.name, self.shard), self.state())
+            return
+        self.done = True
+        await asyncio.to_thread(self.store.save_checkpoint, checkpoint_name(self.name, self.shard), None)
+        logger.info(f"Broadcast {self.name} shard {self.shard}/{self.shards} done: {self.sent} sent, "
+                    f"{self.failed} failed")
+
+    async def _deliver(self, entry, slots):
+        try:
+            await self.send(entry[0], self.text)
+            self.sent += 1
+        except Exception as e:
+            self.failed += 1
+            logger.debug(f"Broadcast {self.name} to {entry[0]} failed: {e}")
+        finally:
+            entry[1] = True
+            slots.release()
+
+    async def _checkpoint(self, inflight, scanned):
+        while inflight and inflight[0][1]:
+            inflight.popleft()
+        # Everything before the oldest unfinished send is done
+        self.after = inflight[0][0] - 1 if inflight else scanned
+        if self.cancelled:  # a checkpoint would bring it back on the next start
+            return
+        await asyncio.to_thread(self.store.save_checkpoint, checkpoint_name(self.name, self.shard), self.state())
+
+    def progress(self):
+        """Counts, send rate since this process took the job, and the ETA in seconds"""
+        finished = self.sent + self.failed
+        elapsed = asyncio.get_running_loop().time() - self._run_started if self._run_started else 0.0
+        rate = (finished - self._resumed_at) / elapsed if elapsed > 0 else 0.0
+        remaining = max(0, (self.total or 0) - finished) if not self.done else 0
+        return {'name': self.name, 'shard': self.shard, 'total': self.total, 'sent': self.sent,
+                'failed': self.failed, 'remaining': remaining, 'rate': round(rate, 2),
+                'eta': round(remaining / rate) if rate > 0 else None, 'done': self.done, 'error': self.error}
+
+
+def combine(progresses):
+    """One broadcast's progress over its shards (each shard runs at its own rate, so the ETA is the slowest).
+
+    It is done once every shard finished or failed; a shard with no recipients is finished.
+    """
+    progresses = list(progresses)
+    ended = [p['done'] or p['error'] is not None or p['total'] == 0 for p in progresses]
+    etas = [p['eta'] for p, end in zip(progresses, ended) if not end]
+    return {
+        'total': None if any(p['total'] is None for p in progresses) else sum(p['total'] for p in progresses),
+        'sent': sum(p['sent'] for p in progresses),
+        'failed': sum(p['failed'] for p in progresses),
+        'remaining': sum(p['remaining'] for p in progresses),
+        'rate': round(sum(p['rate'] for p in progresses), 2),
+        'eta': None if None in etas else max(etas, default=0),
+        'done': all(ended),
+        'error': next((p['error'] for p in progresses if p['error'] is not None), None),
+    }
+
+
+def format_duration(seconds):
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds // 60:.0f}m {seconds % 60:02.0f}s"
+    return f"{seconds // 3600:.0f}h {seconds % 3600 // 60:02.0f}m"
+
+
+def format_progress(name, progress):
+    """Markdown status line block for the admin"""
+    finished = progress['sent'] + progress['failed']
+    if progress['error'] is not None:
+        state = "❌ stopped by an error, resumes on restart"
+    elif progress['done'] or progress['total'] == 0:
+        state = "✅ done"
+    elif progress['total'] is None:
+        return f"📣 *Broadcast* `{name}`: ⏳ counting recipients"
+    elif progress['eta'] is None:
+        state = "⏳ starting"
+    else:
+        state = f"⏳ ETA {format_duration(progress['eta'])} at {progress['rate']:.1f} msg/s"
+    total = progress['total'] or finished
+    share = finished / total if total else 1.0
+    return (f"📣 *Broadcast* `{name}`: {state}\n"
+            f"{finished:,}/{total:,} ({share:.0%}) - {progress['sent']:,} sent, {progress['failed']:,} failed")
@@ -0,0 +1,105 @@
+"""
+WhaleFollow Pro - shared async TTL cache
+- TTL + LRU size bound
+- Single-flight: concurrent misses for one key share one upstream call
+- Stale-while-revalidate: expired entries are served while a refresh runs
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Process-wide cache for coroutine loaders, keyed by any hashable.
+
+    `ttl` is how long an entry is fresh. For `stale` seconds after that it is
+    still returned immediately while one background refresh replaces it.
+    """
+
+    def __init__(self, ttl=60.0, maxsize=1024, stale=0.0):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.stale = stale
+        self._data = OrderedDict()  # key -> (value, stored_at)
+        self._inflight = {}  # key -> asyncio.Task
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale_hits = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    async def get(self, key, loader):
+        """Return the cached value for `key`, calling `loader()` on a miss"""
+        entry = self._data.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age < self.ttl:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return value
+            if age < self.ttl + self.stale:
+                self.stale_hits += 1
+                self._data.move_to_end(key)
+                if key not in self._inflight:
+                    self._load(key, loader).add_done_callback(self._log_refresh_error)
+                return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._load(key, loader)
+        # Shielded: a caller hitting its deadline must not cancel the shared load
+        return await asyncio.shield(task)
+
+    def peek(self, key):
+        """(value, age_seconds) regardless of freshness, or None"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        return entry[0], time.monotonic() - entry[1]
+
+    def set(self, key, value):
+        self._data[key] = (value, time.monotonic())
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+            'inflight': len(self._inflight),
+        }
+
+    def _load(self, key, loader):
+        async def run():
+            try:
+                value = await loader()
+                self.set(key, value)
+                return value
+            finally:
+                self._inflight.pop(key, None)
+
+        task = asyncio.ensure_future(run())
+        self._inflight[key] = task
+        return task
+
+    @staticmethod
+    def _log_refresh_error(task):
+        if not task.cancelled() and task.exception():
+            logger.warning(f"Background cache refresh failed: {task.exception()}")
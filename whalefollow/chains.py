@@ -0,0 +1,458 @@
+"""
+WhaleFollow Pro - chain adapters
+- One adapter per chain: its own poller, request budget and HTTP pool
+- Ethereum via Etherscan (txlist + ERC-20 tokentx) or a newHeads block
+  subscription (ETH_WS_URL), Solana via Helius (or Solscan)
+- TransferStream polls every adapter on its own task and merges their
+  transfers into one stream: a slow chain never delays another
+- Each API source has a circuit breaker; while it is open the chain's poll
+  fails at once and views report how old its last data is (unavailable())
+"""
+
+import os
+import time
+import asyncio
+import logging
+from functools import partial
+
+from whalefollow.alerts import ALERT_INTERVAL
+from whalefollow.blocks import BlockPoller
+from whalefollow.breaker import CircuitBreaker, CircuitOpen, UpstreamError
+from whalefollow.etherscan import BREAKER, ETHERSCAN_CONCURRENCY, LIMITER, RateLimiter, tx_sort_key
+from whalefollow.metrics import UPSTREAM_ERRORS, upstream_call
+from whalefollow.poller import TransferPoller
+from whalefollow.registry import DEFAULT_WALLETS_FILE, WALLETS_FILE, read_csv
+from whalefollow.tokens import fetch_tokentx
+from whalefollow.txstream import Tx
+
+logger = logging.getLogger(__name__)
+
+ETHEREUM_MIN_AMOUNT = float(os.environ.get('ETHEREUM_MIN_AMOUNT', 10))
+HELIUS_URL = os.environ.get('HELIUS_URL', 'https://api.helius.xyz')
+SOLSCAN_URL = os.environ.get('SOLSCAN_URL', 'https://pro-api.solscan.io')
+SOLANA_RPS = float(os.environ.get('SOLANA_RPS', 5))
+SOLANA_CONCURRENCY = int(os.environ.get('SOLANA_CONCURRENCY', 4))
+SOLANA_DEADLINE = float(os.environ.get('SOLANA_DEADLINE', 6.0))
+SOLANA_INTERVAL = float(os.environ.get('SOLANA_INTERVAL', ALERT_INTERVAL))
+SOLANA_MIN_AMOUNT = float(os.environ.get('SOLANA_MIN_AMOUNT', 200))
+SOLANA_WALLETS_FILE = os.environ.get('SOLANA_WALLETS_FILE',
+                                     WALLETS_FILE if WALLETS_FILE.endswith('.csv') else DEFAULT_WALLETS_FILE)
+
+SOL_MINT = 'So11111111111111111111111111111111111111111'  # Solscan's token address for native SOL
+SOLSCAN_PAGE_SIZES = (10, 20, 30, 40, 60, 100)
+
+
+# =============================================================================
+# SOLANA FETCHERS (same signature as etherscan.fetch_txlist)
+# =============================================================================
+class SolTransfer(Tx):
+    """Native SOL transfer; hash is the signature, block the slot, value in lamports"""
+
+    __slots__ = ()
+
+    chain = 'solana'
+    symbol = 'SOL'
+    decimals = 9
+    explorer = 'https://solscan.io/tx/'
+    explorer_name = 'Solscan'
+
+    def is_from(self, address):
+        return self.sender == address  # base58 is case-sensitive
+
+
+def _collect(transfers, keep, limit):
+    kept = [t for t in transfers if keep is None or keep(t)]
+    return kept[:limit] if limit else kept
+
+
+async def fetch_helius(client, address, api_key, *, limiter=None, url=HELIUS_URL, startblock=0, offset=25,
+                       keep=None, limit=None):
+    """Newest native SOL transfers of one address from Helius' parsed transaction history"""
+    if limiter:
+        await limiter.acquire()
+    with upstream_call('helius', 'transactions'):
+        response = await client.get(f"{url}/v0/addresses/{address}/transactions",
+                                    params={'api-key': api_key, 'limit': min(offset, 100)})
+        response.raise_for_status()
+
+    transfers = []
+    for tx in response.json():
+        slot = tx.get('slot') or 0
+        if slot < startblock:
+            continue
+        # One row per transaction: its largest native transfer touching the wallet
+        moves = [m for m in tx.get('nativeTransfers') or ()
+                 if m.get('amount') and address in (m.get('fromUserAccount'), m.get('toUserAccount'))]
+        if not moves:
+            continue
+        move = max(moves, key=lambda m: m['amount'])
+        transfers.append(SolTransfer(tx['signature'], move['fromUserAccount'], move['toUserAccount'],
+                                     int(move['amount']), slot, tx.get('timestamp') or 0))
+    return _collect(transfers, keep, limit)
+
+
+async def fetch_solscan(client, address, api_key, *, limiter=None, url=SOLSCAN_URL, startblock=0, offset=25,
+                        keep=None, limit=None):
+    """Newest native SOL transfers of one address from the Solscan Pro v2 API"""
+    page_size = next((size for size in SOLSCAN_PAGE_SIZES if size >= offset), SOLSCAN_PAGE_SIZES[-1])
+    params = {
+        'address': address,
+        'token': SOL_MINT,
+        'page': 1,
+        'page_size': page_size,
+        'sort_by': 'block_time',
+        'sort_order': 'desc',
+    }
+    if limiter:
+        await limiter.acquire()
+    with upstream_call('solscan', 'transfer'):
+        response = await client.get(f"{url}/v2.0/account/transfer", params=params, headers={'token': api_key})
+        response.raise_for_status()
+    data = response.json()
+    if not data.get('success'):
+        UPSTREAM_ERRORS.inc('solscan', 'transfer')
+        raise UpstreamError(f"Solscan transfers {address[:10]}...: {data.get('errors') or data}")
+
+    transfers = []
+    for row in data.get('data') or ():
+        block = row.get('block_id') or 0
+        if block < startblock:
+            continue
+        transfers.append(SolTransfer(row['trans_id'], row['from_address'], row.get('to_address') or '',
+                                     int(row.get('amount') or 0), block, row.get('block_time') or 0))
+    return _collect(transfers, keep, limit)
+
+
+def solana_wallets(path=SOLANA_WALLETS_FILE):
+    """{label: address} of tracked Solana wallets and {address: label} of every labeled one"""
+    tracked = {}
+    labels = {}
+    for address, label, _, is_tracked in read_csv(path, chain='solana'):
+        labels[address] = label
+        if is_tracked:
+            tracked[label] = address
+    return tracked, labels
+
+
+# =============================================================================
+# ADAPTERS
+# =============================================================================
+def merge(batches):
+    """Newest-first merge of (name, address, tx) row lists from one chain"""
+    if len(batches) == 1:
+        return batches[0]
+    return sorted((row for batch in batches for row in batch), key=lambda row: tx_sort_key(row[2]), reverse=True)
+
+
+class ChainAdapter:
+    """One chain's TransferPollers with their own request budget and HTTP pool.
+
+    Subclasses build the pollers (e.g. native transfers and token transfers);
+    `min_amount` (whole coins) is the view floor for unpriced native transfers.
+    `breaker` is the pollers' upstream circuit breaker, if they have one.
+    """
+
+    chain = None
+    symbol = None
+
+    def __init__(self, pollers, *, interval, min_amount, connections, breaker=None):
+        self.pollers = pollers
+        self.breaker = breaker
+        self.interval = interval
+        self.min_amount = min_amount
+        self.connections = connections
+        self.ready = asyncio.Event()  # set after the first completed poll
+        self.polls = 0
+        self.errors = 0
+        self.transfers = 0
+        self.last_poll = None  # wall-clock time of the last completed poll
+        self.last_duration = 0.0
+        self.watched = 0
+        self._client = None
+
+    def client(self):
+        """This chain's own connection pool; never shared with another chain"""
+        if self._client is None or self._client.is_closed:
+            import httpx
+            self._client = httpx.AsyncClient(timeout=10.0, limits=httpx.Limits(max_connections=self.connections))
+        return self._client
+
+    async def poll(self):
+        """New (name, address, tx) rows since the last poll, newest first"""
+        started = time.monotonic()
+        try:
+            client = self.client()
+            # A poller that fails (e.g. the shared breaker opened mid-poll) must not cost the
+            # others their rows: they have already advanced their cursors past them
+            results = await asyncio.gather(*(poller.poll(client) for poller in self.pollers),
+                                           return_exceptions=True)
+        finally:
+            self.last_duration = time.monotonic() - started
+        failed = [result for result in results if isinstance(result, BaseException)]
+        if len(failed) == len(results):
+            self.errors += 1
+            raise failed[0]
+        for error in failed:
+            logger.debug(f"{self.chain} poller failed, keeping the other pollers' rows: {error!r}")
+        rows = merge([result for result in results if not isinstance(result, BaseException)])
+        self.polls += 1
+        self.transfers += len(rows)
+        self.last_poll = time.time()
+        self.ready.set()
+        return rows
+
+    def latest(self, limit=None):
+        return merge([poller.latest(limit) for poller in self.pollers])[:limit]
+
+    def watch(self, wallets):
+        """Follow users' watched `wallets` ({address: name}) besides the tracked ones"""
+        self.watched = len(wallets)
+        for poller in self.pollers:
+            poller.watch(wallets)
+
+    def last_success(self):
+        """Wall-clock time data last arrived: the last completed poll"""
+        return self.last_poll
+
+    def label(self, address, default=None):
+        return default
+
+    def stats(self):
+        return {
+            'wallets': len(self.pollers[0].wallets),
+            'watched': self.watched,
+            'polls': self.polls,
+            'errors': self.errors,
+            'transfers': self.transfers,
+            'last_poll_age': round(time.time() - self.last_poll, 1) if self.last_poll else None,
+            'last_poll_seconds': round(self.last_duration, 3),
+            'circuit': self.breaker.stats() if self.breaker is not None else None,
+        }
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+
+
+class EthereumAdapter(ChainAdapter):
+    chain = 'ethereum'
+    symbol = 'ETH'
+
+    def __init__(self, wallets, api_key, *, registry=None, tokens=None, ws_url=None, interval=ALERT_INTERVAL,
+                 min_amount=ETHEREUM_MIN_AMOUNT, limiter=LIMITER, concurrency=ETHERSCAN_CONCURRENCY,
+                 breaker=BREAKER, **poller_kwargs):
+        """`tokens` (a TokenSet with ERC-20 contracts) adds a tokentx poller on the same budget.
+
+        With `ws_url` the Etherscan pollers are replaced by one BlockPoller
+        that scans every new block for the registry's tracked wallets (and
+        the tokens' Transfer logs); `wallets` and `api_key` are then unused.
+        `limiter` may be an etherscan.KeyPool to rotate several keys.
+        """
+        self.blocks = None
+        if ws_url:
+            self.blocks = BlockPoller(registry, ws_url, tokens=tokens)
+            pollers = [self.blocks]
+            interval = 0  # poll() waits for the next block
+            breaker = None
+        else:
+            pollers = [TransferPoller(wallets, api_key, limiter=limiter, concurrency=concurrency,
+                                      breaker=breaker, **poller_kwargs)]
+            if tokens is not None and tokens.contracts(self.chain):
+                pollers.append(TransferPoller(wallets, api_key, fetch_one=partial(fetch_tokentx, tokens=tokens),
+                                              limiter=limiter, concurrency=concurrency, breaker=breaker,
+                                              **poller_kwargs))
+        super().__init__(pollers, interval=interval, min_amount=min_amount, connections=concurrency,
+                         breaker=breaker)
+        self.limiter = limiter
+        self.registry = registry
+
+    def label(self, address, default=None):
+        return self.registry.label(address, default) if self.registry is not None else default
+
+    def last_success(self):
+        # A block poll also completes when its wait times out: only a scanned block is news
+        return self.blocks.last_block if self.blocks is not None else self.last_poll
+
+    def stats(self):
+        stats = super().stats()
+        if self.blocks is not None:
+            stats['blocks'] = self.blocks.stats()
+        elif self.limiter is not None:
+            stats['pacing'] = self.limiter.stats()
+        return stats
+
+    async def close(self):
+        if self.blocks is not None:
+            await self.blocks.close()
+        await super().close()
+
+
+class SolanaAdapter(ChainAdapter):
+    """Helius when `helius_key` is set, otherwise Solscan"""
+
+    chain = 'solana'
+    symbol = 'SOL'
+
+    def __init__(self, wallets, *, helius_key=None, solscan_key=None, labels=None, interval=SOLANA_INTERVAL,
+                 min_amount=SOLANA_MIN_AMOUNT, rate=SOLANA_RPS, concurrency=SOLANA_CONCURRENCY,
+                 deadline=SOLANA_DEADLINE, url=None, **poller_kwargs):
+        if helius_key:
+            self.source, api_key, fetch_one, url = 'helius', helius_key, fetch_helius, url or HELIUS_URL
+        elif solscan_key:
+            self.source, api_key, fetch_one, url = 'solscan', solscan_key, fetch_solscan, url or SOLSCAN_URL
+        else:
+            raise ValueError("SolanaAdapter needs a Helius or Solscan API key")
+        breaker = CircuitBreaker(self.source)
+        # Both APIs list newest first only: no catching up oldest first
+        poller = TransferPoller(wallets, api_key, fetch_one=fetch_one, url=url, limiter=RateLimiter(rate),
+                                concurrency=concurrency, deadline=deadline, breaker=breaker, paged=False,
+                                **poller_kwargs)
+        super().__init__([poller], interval=interval, min_amount=min_amount, connections=concurrency,
+                         breaker=breaker)
+        self.labels = labels or {}
+
+    def label(self, address, default=None):
+        return self.labels.get(address, default)
+
+    def stats(self):
+        return {**super().stats(), 'source': self.source}
+
+
+# =============================================================================
+# MERGED STREAM
+# =============================================================================
+class StreamReader:
+    """One consumer's queue of stream batches.
+
+    poll(client) has TransferPoller's signature, so an AlertEngine can
+    consume the stream in place of a poller; it waits up to `timeout` for
+    the next batch and returns everything queued, newest first.
+    """
+
+    def __init__(self, chains=None, timeout=5.0):
+        self.chains = set(chains) if chains else None
+        self.timeout = timeout
+        self._queue = asyncio.Queue()
+
+    def push(self, rows):
+        if self.chains is not None:
+            rows = [row for row in rows if row[2].chain in self.chains]
+        if rows:
+            self._queue.put_nowait(rows)
+
+    async def poll(self, client=None):
+        try:
+            rows = list(await asyncio.wait_for(self._queue.get(), self.timeout))
+        except asyncio.TimeoutError:
+            return []
+        while not self._queue.empty():
+            rows.extend(self._queue.get_nowait())
+        rows.sort(key=lambda row: row[2].timestamp, reverse=True)
+        return rows
+
+
+class TransferStream:
+    """Runs each adapter's poll loop as its own task and fans new rows out to readers.
+
+    With a `prices` feed (tokens.PriceFeed) every batch is valued in USD
+    before readers see it, and the feed refreshes on its own task.
+    """
+
+    def __init__(self, adapters, prices=None):
+        self.adapters = {adapter.chain: adapter for adapter in adapters}
+        self.prices = prices
+        self.version = 0  # bumped whenever latest() may have changed
+        self.started = None
+        self._readers = []
+        self._tasks = []
+
+    def __len__(self):
+        return len(self.adapters)
+
+    def subscribe(self, chains=None, timeout=5.0):
+        reader = StreamReader(chains, timeout)
+        self._readers.append(reader)
+        return reader
+
+    def start(self):
+        self.started = time.time()
+        self._tasks = [asyncio.create_task(self._run(adapter), name=f'poll-{adapter.chain}')
+                       for adapter in self.adapters.values()]
+        if self.prices is not None and self.adapters:
+            self._tasks.append(asyncio.create_task(self.prices.run(), name='prices'))
+        logger.info(f"Transfer stream running: {', '.join(self.adapters) or 'no chains'}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for adapter in self.adapters.values():
+            await adapter.close()
+
+    async def _run(self, adapter):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            try:
+                rows = await adapter.poll()
+                if self.prices is not None:
+                    self.prices.value([tx for _, _, tx in rows])
+                for reader in self._readers:
+                    reader.push(rows)
+                if rows or adapter.polls == 1:  # the first poll only seeds history, but latest() has it
+                    self.version += 1
+            except CircuitOpen as e:
+                logger.debug(f"{adapter.chain} poll skipped: {e}")  # the breaker logs opening and closing
+            except Exception as e:
+                logger.error(f"{adapter.chain} poll failed: {e}")
+            await asyncio.sleep(max(0.0, adapter.interval - (loop.time() - started)))
+
+    async def ready(self, timeout):
+        """Wait until every chain has completed a poll, or `timeout` seconds"""
+        waits = [asyncio.create_task(adapter.ready.wait()) for adapter in self.adapters.values()]
+        if not waits:
+            return
+        _, pending = await asyncio.wait(waits, timeout=timeout)
+        for task in pending:
+            task.cancel()
+
+    @property
+    def polled(self):
+        """Every chain has completed a poll"""
+        return all(adapter.ready.is_set() for adapter in self.adapters.values())
+
+    def latest(self, limit=None):
+        """Newest-first (name, address, tx) rows across every chain"""
+        rows = [row for adapter in self.adapters.values() for row in adapter.latest()]
+        rows.sort(key=lambda row: row[2].timestamp, reverse=True)
+        rows = rows[:limit] if limit else rows
+        if self.prices is not None:
+            self.prices.value([tx for _, _, tx in rows])  # current prices, not the ones at poll time
+        return rows
+
+    def watch(self, chain, wallets):
+        """Watched {address: name} of one chain; ignored for chains without an adapter"""
+        adapter = self.adapters.get(chain)
+        if adapter is not None:
+            adapter.watch(wallets)
+
+    def label(self, chain, address, default=None):
+        adapter = self.adapters.get(chain)
+        return adapter.label(address, default) if adapter else default
+
+    def unavailable(self):
+        """{chain: (upstream, seconds since its last data or None)} for chains whose circuit is not closed"""
+        now = time.time()
+        return {chain: (adapter.breaker.upstream, now - adapter.last_success() if adapter.last_success() else None)
+                for chain, adapter in self.adapters.items()
+                if adapter.breaker is not None and not adapter.breaker.closed}
+
+    def poll_ages(self):
+        """Seconds since each chain last delivered data (since start() before its first poll)"""
+        now = time.time()
+        return {chain: now - (adapter.last_success() or self.started or now)
+                for chain, adapter in self.adapters.items()}
+
+    def stats(self):
+        return {chain: adapter.stats() for chain, adapter in self.adapters.items()}
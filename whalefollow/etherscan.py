@@ -0,0 +1,331 @@
+"""
+WhaleFollow Pro - Etherscan client
+- Concurrent fan-out over all tracked wallets
+- Per-key request budget (free tier: 5 calls/s) cut by a quarter (at most
+  once a second) on 429s and "rate limit" results and crept back up on
+  success; several keys
+  (ETHERSCAN_API=key1,key2) are rotated, each on its own budget
+- Circuit breaker: a failing Etherscan is skipped, not hammered (see breaker)
+- Per-request deadline so one slow wallet can't stall a reply
+- Per-wallet TTL cache shared by every user of the process
+- txlist bodies parsed as they stream in (see txstream)
+"""
+
+import os
+import time
+import asyncio
+import logging
+
+from whalefollow.breaker import OPEN, CircuitBreaker, CircuitOpen, RateLimited, UpstreamError
+from whalefollow.cache import TTLCache
+from whalefollow.metrics import upstream_call
+from whalefollow.txstream import Tx, TxlistParser
+
+logger = logging.getLogger(__name__)
+
+ETHERSCAN_URL = os.environ.get('ETHERSCAN_URL', 'https://api.etherscan.io/api')
+ETHERSCAN_RPS = float(os.environ.get('ETHERSCAN_RPS', 5))  # per key
+ETHERSCAN_MIN_RPS = float(os.environ.get('ETHERSCAN_MIN_RPS', 0.5))  # floor while backing off
+ETHERSCAN_CONCURRENCY = int(os.environ.get('ETHERSCAN_CONCURRENCY', 4))
+ETHERSCAN_DEADLINE = float(os.environ.get('ETHERSCAN_DEADLINE', 6.0))
+CACHE_TTL = float(os.environ.get('CACHE_TTL', 60))
+CACHE_STALE = float(os.environ.get('CACHE_STALE', 300))
+CACHE_SIZE = int(os.environ.get('CACHE_SIZE', 1024))
+
+# =============================================================================
+# RATE LIMITER
+# =============================================================================
+class RateLimiter:
+    """Spaces request starts so at most `rate` begin per second.
+
+    Slots are handed out synchronously, so no lock is needed on one event loop.
+    `burst` lets that many requests start back to back before spacing kicks in.
+    With a `floor`, the rate adapts: throttled() cuts it by a quarter (not
+    below the floor, at most once a second) and pauses for the upstream's
+    retry-after; ok() adds back a fiftieth of the ceiling per successful call.
+    """
+
+    def __init__(self, rate, burst=1, floor=None):
+        self.ceiling = rate
+        self.floor = floor
+        self.rate = rate
+        self.interval = 1.0 / rate
+        self.burst = burst
+        self.throttles = 0
+        self._tat = 0.0  # theoretical arrival time of the next free slot
+        self._hold = 0.0  # no further rate cut before this loop time
+
+    def delay(self):
+        """Seconds until the next slot is free"""
+        return max(0.0, self._tat - asyncio.get_running_loop().time() - self.burst * self.interval)
+
+    async def acquire(self):
+        """Wait for a slot; returns the API key to use (None: the caller's own)"""
+        now = asyncio.get_running_loop().time()
+        self._tat = max(self._tat, now) + self.interval
+        wait = self._tat - now - self.burst * self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def throttled(self, key=None, retry_after=0.0):
+        self.throttles += 1
+        now = asyncio.get_running_loop().time()
+        # Calls already in flight at the old rate report too: one cut per second
+        if self.floor is not None and now >= self._hold:
+            self._set_rate(max(self.floor, self.rate * 0.75))
+            self._hold = now + 1.0
+        if retry_after:
+            self._tat = max(self._tat, now + retry_after)
+
+    def ok(self, key=None):
+        if self.floor is not None and self.rate < self.ceiling:
+            self._set_rate(min(self.ceiling, self.rate + self.ceiling / 50))
+
+    def rejected(self, key=None):
+        """The key was refused (invalid); a single-key limiter has nothing to rotate to"""
+
+    def _set_rate(self, rate):
+        self.rate = rate
+        self.interval = 1.0 / rate
+
+    def stats(self):
+        return {'rate': round(self.rate, 2), 'throttles': self.throttles}
+
+
+class KeyPool:
+    """Rotates API keys, each with its own adaptive RateLimiter (Etherscan budgets per key).
+
+    acquire() takes the key whose next slot is free soonest, so a key backing
+    off after 429s hands its share to the others. A rejected (invalid) key
+    sits out for `bench` seconds.
+    """
+
+    def __init__(self, keys, rate=ETHERSCAN_RPS, floor=ETHERSCAN_MIN_RPS, bench=3600.0):
+        self.limiters = {key: RateLimiter(rate, floor=floor) for key in keys}
+        self.bench = bench
+        self.calls = dict.fromkeys(self.limiters, 0)
+        self._benched = {}  # key -> time.monotonic() it may return
+
+    def __len__(self):
+        return len(self.limiters)
+
+    async def acquire(self):
+        now = time.monotonic()
+        keys = [key for key in self.limiters if self._benched.get(key, 0) <= now]
+        if not keys:
+            raise UpstreamError(f"all {len(self.limiters)} Etherscan API keys rejected")
+        key = min(keys, key=lambda key: self.limiters[key].delay())
+        self.calls[key] += 1
+        await self.limiters[key].acquire()
+        return key
+
+    def throttled(self, key=None, retry_after=0.0):
+        if key in self.limiters:
+            self.limiters[key].throttled(key, retry_after)
+
+    def ok(self, key=None):
+        if key in self.limiters:
+            self.limiters[key].ok(key)
+
+    def rejected(self, key=None):
+        if key in self.limiters:
+            logger.error(f"Etherscan key ...{key[-4:]} rejected, rotating it out for {self.bench:.0f}s")
+            self._benched[key] = time.monotonic() + self.bench
+
+    def stats(self):
+        now = time.monotonic()
+        return {f"...{key[-4:]}": {**limiter.stats(), 'calls': self.calls[key],
+                                   'benched': self._benched.get(key, 0) > now}
+                for key, limiter in self.limiters.items()}
+
+
+def key_pool(api_key, rate=ETHERSCAN_RPS):
+    """KeyPool of a comma-separated key list (ETHERSCAN_API=key1,key2)"""
+    return KeyPool([key.strip() for key in (api_key or '').split(',') if key.strip()], rate=rate)
+
+
+# One budget per process and key: every fetch shares the keys (see key_pool)
+LIMITER = RateLimiter(ETHERSCAN_RPS, floor=ETHERSCAN_MIN_RPS)
+
+# One breaker per upstream: txlist and tokentx fail together
+BREAKER = CircuitBreaker('etherscan')
+
+# txlist results per wallet address, shared by all users
+TXLIST_CACHE = TTLCache(ttl=CACHE_TTL, maxsize=CACHE_SIZE, stale=CACHE_STALE)
+
+_client = None
+
+
+def get_client():
+    """Process-wide httpx client; cached loads outlive the request that started them"""
+    global _client
+    if _client is None or _client.is_closed:
+        import httpx
+        _client = httpx.AsyncClient(timeout=10.0)
+    return _client
+
+# =============================================================================
+# FETCHING
+# =============================================================================
+def tx_sort_key(tx):
+    """Newest-first ordering key for Tx records or raw Etherscan dicts"""
+    return int(tx.get('blockNumber') or 0), int(tx.get('timeStamp') or 0)
+
+
+async def fetch_account(client, action, address, api_key, *, limiter=LIMITER, url=ETHERSCAN_URL, startblock=0,
+                        offset=5, sort='desc', pages=1, keep=None, limit=None, record=Tx.from_row):
+    """Newest `offset` rows of one account list (txlist, tokentx) as records.
+
+    With sort='asc' they are the oldest from `startblock` on instead, and
+    up to `pages` pages of `offset` rows are read while they come back
+    full (a poller catching up). The body is parsed as it streams in. `record` turns a row into a record
+    (None skips it), `keep` drops records while parsing; with `limit` the
+    download stops once that many were kept. An error result raises
+    UpstreamError (RateLimited for 429s and "rate limit" results, which
+    also slow `limiter` down).
+    """
+    txs = []
+    for page in range(1, pages + 1):
+        key = await limiter.acquire() if limiter else None
+        params = {
+            'module': 'account',
+            'action': action,
+            'address': address,
+            'startblock': startblock,
+            'endblock': 99999999,
+            'page': page,
+            'offset': offset,
+            'sort': sort,
+            'apikey': key or api_key,
+        }
+        parser = TxlistParser(keep, record)
+        with upstream_call('etherscan', action):
+            async with client.stream('GET', url, params=params) as response:
+                if response.status_code == 429:
+                    retry_after = _retry_after(response)
+                    if limiter:
+                        limiter.throttled(key, retry_after)
+                    raise RateLimited(f"Etherscan {action}: HTTP 429", retry_after)
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes():
+                    txs.extend(parser.feed(chunk))
+                    if limit and len(txs) >= limit:
+                        txs = txs[:limit]
+                        break
+                else:
+                    data = parser.close()
+                    if not parser.scanned and data.get('message') != 'No transactions found':
+                        _raise_result(action, data, limiter, key)  # rate limited, bad key, ...
+
+        if limiter:
+            limiter.ok(key)
+        if (limit and len(txs) >= limit) or parser.scanned < offset:
+            break
+    return txs
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get('Retry-After') or 0)
+    except ValueError:
+        return 0.0
+
+
+def _raise_result(action, data, limiter, key):
+    """Raise for a `status: 0` result other than 'No transactions found'"""
+    message = f"Etherscan {action}: {data.get('message')} {data.get('result')}"
+    lowered = message.lower()
+    if 'rate limit' in lowered:
+        if limiter:
+            limiter.throttled(key)
+        raise RateLimited(message)
+    if 'invalid api key' in lowered and limiter:
+        limiter.rejected(key)
+    raise UpstreamError(message)
+
+
+async def fetch_txlist(client, address, api_key, **kwargs):
+    """Newest normal (ETH) transactions of one address as Tx records; see fetch_account"""
+    return await fetch_account(client, 'txlist', address, api_key, **kwargs)
+
+
+async def fetch_wallets(client, wallets, api_key, *, limiter=LIMITER, url=ETHERSCAN_URL,
+                        concurrency=ETHERSCAN_CONCURRENCY, deadline=ETHERSCAN_DEADLINE, offset=5,
+                        cache=None, startblocks=None, keep=None, limit=None, fetch_one=None, breaker=None):
+    """Fetch every wallet concurrently and merge the results newest first.
+
+    `wallets` maps name -> address, `startblocks` optionally address -> first
+    block to fetch; `keep` and `limit` apply per wallet (see fetch_txlist).
+    `fetch_one` swaps in another per-address fetcher with fetch_txlist's
+    signature (other chains). Returns a list of (name, address, tx).
+    Wallets that fail or are still running at `deadline` seconds are skipped;
+    with a `cache`, their load keeps running and serves the next caller.
+    With a `breaker` every call reports to it: an open circuit raises
+    CircuitOpen here without a request, and a wallet whose call it
+    rejects mid-fetch is skipped like a failed one.
+    """
+    if not wallets:
+        return []
+    if breaker is not None:
+        breaker.check(probe=False)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    fetch_one = fetch_one or fetch_txlist
+
+    startblocks = startblocks or {}
+
+    async def load(address):
+        async with semaphore:
+            if breaker is None:
+                return await fetch_one(client, address, api_key, limiter=limiter, url=url, offset=offset,
+                                       startblock=startblocks.get(address, 0), keep=keep, limit=limit)
+            ticket = breaker.check()
+            try:
+                txs = await fetch_one(client, address, api_key, limiter=limiter, url=url, offset=offset,
+                                      startblock=startblocks.get(address, 0), keep=keep, limit=limit)
+            except BaseException:  # errors, and cancellation at the deadline: a hung upstream fails too
+                breaker.failure(ticket)
+                raise
+            breaker.success(ticket)
+            return txs
+
+    async def cached(address):
+        if cache is None:
+            return await load(address)
+        return await cache.get(address, lambda: load(address))
+
+    items = list(wallets.items())
+    tasks = [asyncio.create_task(cached(address)) for _, address in items]
+    try:
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    if pending:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        logger.warning(f"Fetch deadline ({deadline}s) hit, skipped {len(pending)}/{len(tasks)} wallets")
+
+    rows = []
+    throttled = 0
+    for (name, address), task in zip(items, tasks):
+        if task not in done:
+            continue
+        if task.exception():
+            if isinstance(task.exception(), RateLimited):
+                throttled += 1
+            elif not isinstance(task.exception(), CircuitOpen):
+                logger.error(f"Error fetching {name}: {task.exception()}")
+            continue
+        rows.extend((name, address, tx) for tx in task.result())
+
+    if throttled:
+        logger.warning(f"Rate limited on {throttled}/{len(tasks)} wallets, skipped")
+    if breaker is not None and breaker.state == OPEN:  # it opened during this fetch: failed, not empty
+        raise CircuitOpen(breaker.upstream, breaker.retry_after())
+    rows.sort(key=lambda row: tx_sort_key(row[2]), reverse=True)
+    return rows
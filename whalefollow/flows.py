@@ -0,0 +1,226 @@
+"""
+WhaleFollow Pro - exchange net flows
+- Per-exchange USD inflow (deposits) and outflow (withdrawals) in rolling
+  5m / 1h / 24h windows, each a ring of time buckets
+- O(1) per transfer, O(windows) per snapshot: window totals are kept running
+- Anomaly flag: z-score of the last 5m net flow against the 5m buckets of
+  the past 24h
+- Sentiment: net withdrawals are read as bullish, net deposits as bearish
+"""
+
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+FLOW_Z = float(os.environ.get('FLOW_Z', 3.0))
+FLOW_Z_MIN = int(os.environ.get('FLOW_Z_MIN', 12))  # 5m samples (an hour) before flagging
+FLOW_NEUTRAL = float(os.environ.get('FLOW_NEUTRAL', 0.1))  # |net| / gross below this is neutral
+
+# name, span (s), buckets. The z-score needs the last window's bucket width
+# to equal the first window's span.
+WINDOWS = (('5m', 300, 60), ('1h', 3600, 60), ('24h', 86400, 288))
+
+
+class FlowRing:
+    """One window of one exchange: `size` buckets of span/size seconds.
+
+    Buckets are keyed by epoch (timestamp // width). Running totals and the
+    sum / sum of squares of per-bucket net flow are adjusted as buckets are
+    written and recycled, so nothing is summed on read.
+    """
+
+    __slots__ = ('width', 'size', 'inflow', 'outflow', 'epochs', 'epoch', 'total_in', 'total_out',
+                 'sum_net', 'sum_sq', 'started')
+
+    def __init__(self, span, size):
+        self.width = span / size
+        self.size = size
+        self.inflow = [0.0] * size
+        self.outflow = [0.0] * size
+        self.epochs = [-1] * size
+        self.epoch = None  # newest bucket
+        self.started = None  # first bucket, for the sample count
+        self.total_in = 0.0
+        self.total_out = 0.0
+        self.sum_net = 0.0
+        self.sum_sq = 0.0
+
+    def advance(self, epoch):
+        """Recycle the buckets that fell out of the window by `epoch`"""
+        if self.epoch is None:
+            self.epoch = self.started = epoch
+            self.epochs[epoch % self.size] = epoch
+            return
+        if epoch <= self.epoch:
+            return
+        for e in range(max(self.epoch + 1, epoch - self.size + 1), epoch + 1):
+            i = e % self.size
+            net = self.outflow[i] - self.inflow[i]
+            self.total_in -= self.inflow[i]
+            self.total_out -= self.outflow[i]
+            self.sum_net -= net
+            self.sum_sq -= net * net
+            self.inflow[i] = self.outflow[i] = 0.0
+            self.epochs[i] = e
+        self.epoch = epoch
+
+    def add(self, timestamp, inflow, outflow):
+        epoch = int(timestamp // self.width)
+        self.advance(epoch)
+        if epoch <= self.epoch - self.size:
+            return False  # older than the window
+        i = epoch % self.size
+        old = self.outflow[i] - self.inflow[i]
+        self.inflow[i] += inflow
+        self.outflow[i] += outflow
+        new = old + outflow - inflow
+        self.total_in += inflow
+        self.total_out += outflow
+        self.sum_net += new - old
+        self.sum_sq += new * new - old * old
+        return True
+
+    def samples(self):
+        return 0 if self.epoch is None else min(self.size, self.epoch - self.started + 1)
+
+
+class FlowTracker:
+    """USD flows per exchange from (name, address, tx) stream rows.
+
+    `exchange_of(chain, address)` names the exchange owning an address, or
+    None. A transfer into an exchange is inflow, out of one outflow; moves
+    between two wallets of the same exchange are ignored. Transfers without
+    a USD value are counted as unpriced and skipped.
+    """
+
+    def __init__(self, exchange_of, *, windows=WINDOWS, z_threshold=FLOW_Z, z_min=FLOW_Z_MIN,
+                 neutral=FLOW_NEUTRAL):
+        self.exchange_of = exchange_of
+        self.windows = windows
+        self.z_threshold = z_threshold
+        self.z_min = z_min
+        self.neutral = neutral
+        self.rings = {}  # exchange -> [FlowRing per window]
+        self.transfers = 0
+        self.counted = 0
+        self.unpriced = 0
+
+    def _rings(self, exchange):
+        rings = self.rings.get(exchange)
+        if rings is None:
+            rings = self.rings[exchange] = [FlowRing(span, size) for _, span, size in self.windows]
+        return rings
+
+    def add(self, tx):
+        """Count one transfer; returns True if it moved exchange flows"""
+        self.transfers += 1
+        source = self.exchange_of(tx.chain, tx.sender)
+        target = self.exchange_of(tx.chain, tx.to) if tx.to else None
+        if source == target:
+            return False  # internal shuffle, or no exchange involved
+        if tx.usd is None:
+            self.unpriced += 1
+            return False
+        if target is not None:
+            for ring in self._rings(target):
+                ring.add(tx.timestamp, tx.usd, 0.0)
+        if source is not None:
+            for ring in self._rings(source):
+                ring.add(tx.timestamp, 0.0, tx.usd)
+        self.counted += 1
+        return True
+
+    def add_rows(self, rows):
+        for _, _, tx in reversed(rows):  # oldest first
+            self.add(tx)
+
+    async def run(self, reader):
+        """Consume a chains.StreamReader forever"""
+        while True:
+            self.add_rows(await reader.poll())
+
+    def zscore(self, rings):
+        """z of the current first-window net flow against the last window's buckets, or None"""
+        short, long = rings[0], rings[-1]
+        n = long.samples()
+        if n < self.z_min:
+            return None
+        mean = long.sum_net / n
+        variance = max(long.sum_sq / n - mean * mean, 0.0)
+        if variance == 0.0:
+            return None
+        return (short.total_out - short.total_in - mean) / variance ** 0.5
+
+    def sentiment(self, inflow, outflow):
+        gross = inflow + outflow
+        if not gross or abs(outflow - inflow) < self.neutral * gross:
+            return 'neutral'
+        return 'bullish' if outflow > inflow else 'bearish'
+
+    def snapshot(self, now=None):
+        """Per-exchange flows, largest 24h volume first, plus a market-wide total.
+
+        Each entry: {'exchange', 'windows': {name: (inflow, outflow, net)},
+        'sentiment', 'z', 'anomaly'}; net = outflow - inflow.
+        """
+        now = time.time() if now is None else now
+        names = [name for name, _, _ in self.windows]
+        exchanges = []
+        totals = {name: [0.0, 0.0] for name in names}
+        for exchange, rings in self.rings.items():
+            windows = {}
+            for name, ring in zip(names, rings):
+                ring.advance(int(now // ring.width))
+                windows[name] = (ring.total_in, ring.total_out, ring.total_out - ring.total_in)
+                totals[name][0] += ring.total_in
+                totals[name][1] += ring.total_out
+            z = self.zscore(rings)
+            inflow, outflow, _ = windows[names[1]]
+            exchanges.append({
+                'exchange': exchange,
+                'windows': windows,
+                'sentiment': self.sentiment(inflow, outflow),
+                'z': z,
+                'anomaly': z is not None and abs(z) >= self.z_threshold,
+            })
+        exchanges.sort(key=lambda e: e['windows'][names[-1]][0] + e['windows'][names[-1]][1], reverse=True)
+        inflow, outflow = totals[names[1]]
+        return {
+            'exchanges': exchanges,
+            'windows': {name: (i, o, o - i) for name, (i, o) in totals.items()},
+            'sentiment': self.sentiment(inflow, outflow),
+        }
+
+    def stats(self):
+        return {
+            'exchanges': len(self.rings),
+            'transfers': self.transfers,
+            'counted': self.counted,
+            'unpriced': self.unpriced,
+        }
+
+
+def exchange_name(label):
+    """'Binance Hot' -> 'Binance', 'Kraken SOL 2' -> 'Kraken'"""
+    return label.split()[0]
+
+
+def exchange_lookup(registry, solana_rows=()):
+    """exchange_of(chain, address) over the registry and Solana (address, label, category, tracked) rows"""
+    solana = {address: exchange_name(label) for address, label, category, _ in solana_rows if category == 'exchange'}
+    cache = {}
+
+    def exchange_of(chain, address):
+        if chain == 'solana':
+            return solana.get(address)
+        found = cache.get(address, False)
+        if found is False:
+            label = registry.lookup(address)
+            found = exchange_name(label.name) if label is not None and label.category == 'exchange' else None
+            if len(cache) < 100_000:
+                cache[address] = found
+        return found
+
+    return exchange_of
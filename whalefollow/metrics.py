@@ -0,0 +1,235 @@
+"""
+WhaleFollow Pro - metrics
+- Histogram: fixed buckets (Prometheus `le` bounds), O(log buckets) per
+  observation
+- Counter / Gauge / HistogramFamily with labels, collected in METRICS and
+  rendered in the Prometheus text format (exposition())
+- No locks: metrics are recorded on the event loop; a reader on another
+  thread copies each family's values before formatting them
+- Event-loop lag: a task that measures how late its own wakeups are
+"""
+
+import os
+import time
+from bisect import bisect_left
+
+LOOP_LAG_INTERVAL = float(os.environ.get('LOOP_LAG_INTERVAL', 0.5))
+
+# Seconds; wide enough for a handler (ms) and an upstream call (s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class Histogram:
+    """Counts per bucket; buckets[i] counts values <= bounds[i], the last one the rest (+Inf)"""
+
+    __slots__ = ('bounds', 'buckets', 'count', 'sum')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Estimate as Prometheus' histogram_quantile: linear within the bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            if seen + n >= rank and n:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+                low = self.bounds[i - 1] if i else 0.0
+                return low + (self.bounds[i] - low) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+    def cumulative(self):
+        """[(le, count)] including +Inf, as exposed by Prometheus"""
+        total = 0
+        out = []
+        for bound, n in zip(self.bounds + (float('inf'),), list(self.buckets)):
+            total += n
+            out.append((bound, total))
+        return out
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Family:
+    kind = None
+
+    def __init__(self, name, help, labelnames=(), fn=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.fn = fn  # () -> {label values tuple: value}, read at exposition time
+        self.values = {}
+
+    def items(self):
+        return list((self.fn() if self.fn is not None else self.values).items())
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for labels, value in self.items():
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}')
+        return lines
+
+
+class Counter(_Family):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(_Family):
+    kind = 'gauge'
+
+    def set(self, value, *labels):
+        self.values[labels] = value
+
+
+class _Timer:
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+
+
+class _UpstreamCall:
+    __slots__ = ('histogram', 'upstream', 'method', 'started')
+
+    def __init__(self, upstream, method):
+        self.histogram = UPSTREAM_SECONDS.labels(upstream, method)
+        self.upstream = upstream
+        self.method = method
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started)
+        if exc_type is not None:
+            import asyncio  # loaded wherever upstream calls run; not at import (api/webhook.py's cold start)
+            if not issubclass(exc_type, asyncio.CancelledError):
+                UPSTREAM_ERRORS.inc(self.upstream, self.method)
+
+
+def upstream_call(upstream, method):
+    """with upstream_call('etherscan', 'txlist'): ... times the call and counts it as failed if it raises"""
+    return _UpstreamCall(upstream, method)
+
+
+class HistogramFamily(_Family):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), fn=None, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames, fn)
+        self.buckets = buckets
+
+    def labels(self, *labels):
+        histogram = self.values.get(labels)
+        if histogram is None:
+            histogram = self.values[labels] = Histogram(self.buckets)
+        return histogram
+
+    def observe(self, value, *labels):
+        self.labels(*labels).observe(value)
+
+    def time(self, *labels):
+        """with family.time('txlist'): ... observes the block's wall time"""
+        return _Timer(self.labels(*labels))
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for labels, histogram in self.items():
+            for bound, count in histogram.cumulative():
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {count}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(histogram.sum)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {histogram.count}')
+        return lines
+
+
+class Metrics:
+    """The process' metric families, in registration order"""
+
+    def __init__(self):
+        self.families = {}
+
+    def _add(self, family):
+        if family.name in self.families:
+            raise ValueError(f"metric {family.name} registered twice")
+        self.families[family.name] = family
+        return family
+
+    def counter(self, name, help, labelnames=(), fn=None):
+        return self._add(Counter(name, help, labelnames, fn))
+
+    def gauge(self, name, help, labelnames=(), fn=None):
+        return self._add(Gauge(name, help, labelnames, fn))
+
+    def histogram(self, name, help, labelnames=(), fn=None, buckets=LATENCY_BUCKETS):
+        return self._add(HistogramFamily(name, help, labelnames, fn, buckets))
+
+    def exposition(self):
+        """Prometheus text format 0.0.4"""
+        lines = []
+        for family in list(self.families.values()):
+            lines.extend(family.expose())
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = Metrics()
+
+# Shared by every upstream client: Etherscan, Solana APIs, the block node, Telegram
+UPSTREAM_SECONDS = METRICS.histogram('whalefollow_upstream_request_seconds', 'Upstream API call latency',
+                                     ('upstream', 'method'))
+UPSTREAM_ERRORS = METRICS.counter('whalefollow_upstream_errors_total', 'Failed upstream API calls',
+                                  ('upstream', 'method'))
+LOOP_LAG_SECONDS = METRICS.histogram('whalefollow_event_loop_lag_seconds', 'How late the event loop ran a timer',
+                                     buckets=LAG_BUCKETS)
+LOOP_LAG = METRICS.gauge('whalefollow_event_loop_lag_last_seconds', 'Event loop lag of the last sample')
+
+
+async def watch_loop_lag(interval=LOOP_LAG_INTERVAL):
+    """Sleep `interval` forever; how much later than asked each wakeup comes is the loop's lag"""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - started - interval)
+        LOOP_LAG_SECONDS.observe(lag)
+        LOOP_LAG.set(lag)
@@ -0,0 +1,141 @@
+"""
+WhaleFollow Pro - incremental transfer poller
+- Per-wallet block cursor: each poll only asks for blocks >= the last one seen,
+  oldest first, so a busy wallet is caught up over polls instead of cut off
+- Dedup by tx hash
+- Rolling in-memory window of recent transfers
+"""
+
+import os
+import logging
+from functools import partial
+from collections import OrderedDict
+
+from whalefollow.etherscan import fetch_txlist, fetch_wallets, tx_sort_key
+
+logger = logging.getLogger(__name__)
+
+POLL_OFFSET = int(os.environ.get('POLL_OFFSET', 25))
+POLL_PAGES = int(os.environ.get('POLL_PAGES', 4))  # pages of POLL_OFFSET per wallet and poll when catching up
+RECENT_WINDOW = int(os.environ.get('RECENT_WINDOW', 500))
+
+
+class TransferPoller:
+    """Polls a wallet set incrementally and keeps the newest transfers.
+
+    Polls read oldest first from the cursor, up to `pages` pages per
+    wallet; a wallet with more is caught up by the next polls, as the
+    cursor only reaches the newest row received. `paged=False` is for
+    fetchers that only list newest first (Solana): a wallet with more
+    than `offset` new rows then loses the older ones.
+
+    The cursor is inclusive (startblock = last block seen) so a block that was
+    cut off by `offset` is re-read; the hashes already seen in each wallet's
+    cursor block drop the repeats, however many wallets share the window.
+    Cursors only advance when rows are merged, so a failed fetch never
+    skips blocks. Don't pass a `cache`: it is keyed on the address alone,
+    so a poll could get rows fetched from an older cursor.
+    """
+
+    def __init__(self, wallets, api_key, *, window=RECENT_WINDOW, offset=POLL_OFFSET, pages=POLL_PAGES, paged=True,
+                 **fetch_kwargs):
+        self.tracked = dict(wallets)  # name -> address
+        self.wallets = dict(self.tracked)  # tracked plus watched
+        self.api_key = api_key
+        self.window = window
+        self.offset = offset
+        self.pages = pages
+        self.paged = paged
+        self.fetch_kwargs = fetch_kwargs
+        self.cursors = {}  # address -> highest block merged
+        self._edge = {}  # address -> tx hashes merged in its cursor block
+        self._recent = OrderedDict()  # tx hash -> (name, address, tx), oldest first
+
+    def __len__(self):
+        return len(self._recent)
+
+    def watch(self, wallets):
+        """Also poll `wallets` ({address: name}), replacing the previous extra set.
+
+        Addresses already tracked are polled once. Names are only labels:
+        one already in use gets the address appended. A new address starts
+        with a seeding fetch; a dropped one loses its cursor.
+        """
+        tracked = set(self.tracked.values())
+        self.wallets = dict(self.tracked)
+        for address, name in wallets.items():
+            if address in tracked:
+                continue
+            if name in self.wallets:
+                name = f"{name} ({address[:6]}...{address[-4:]})"
+            self.wallets[name] = address
+        polled = set(self.wallets.values())
+        self.cursors = {address: block for address, block in self.cursors.items() if address in polled}
+        self._edge = {address: hashes for address, hashes in self._edge.items() if address in polled}
+
+    async def poll(self, client):
+        """Fetch new blocks for every wallet; returns new rows newest first.
+
+        A wallet's first fetch only seeds its cursor and the window: those
+        rows are history, not news, and are not returned.
+        """
+        startblocks = {address: self.cursors.get(address, 0) for address in self.wallets.values()}
+        seeded = {address for address in self.wallets.values() if address not in self.cursors}
+        if self.paged:
+            # Seeding fetches newest first; the rest oldest first from their cursors, so nothing is cut off
+            fresh = {name: address for name, address in self.wallets.items() if address in seeded}
+            known = {name: address for name, address in self.wallets.items() if address not in seeded}
+            fetch_one = partial(self.fetch_kwargs.get('fetch_one') or fetch_txlist, sort='asc', pages=self.pages)
+            rows = await self._fetch(client, fresh) + await self._fetch(client, known, startblocks, fetch_one=fetch_one)
+            rows.sort(key=lambda row: tx_sort_key(row[2]), reverse=True)
+        else:
+            rows = await self._fetch(client, self.wallets, startblocks)
+
+        new = []
+        for name, address, tx in reversed(rows):  # oldest first
+            block = int(tx.get('blockNumber') or 0)
+            if block < startblocks[address]:
+                continue
+            if block > self.cursors.get(address, -1):
+                self.cursors[address] = block
+                self._edge[address] = set()
+            if block == self.cursors[address]:
+                edge = self._edge.setdefault(address, set())
+                if tx['hash'] in edge:
+                    continue
+                edge.add(tx['hash'])
+            if tx['hash'] in self._recent:
+                continue
+            row = (name, address, tx)
+            self._recent[tx['hash']] = row
+            if address not in seeded:
+                new.append(row)
+
+        while len(self._recent) > self.window:
+            self._recent.popitem(last=False)
+
+        counts = {}
+        for name, address, tx in rows:
+            counts[address] = counts.get(address, 0) + 1
+        for address, count in counts.items():
+            if address in seeded:
+                continue
+            if not self.paged and count >= self.offset:
+                logger.warning(f"Poll page full for {address[:10]}... - older transfers since block "
+                               f"{startblocks[address]} were skipped; raise POLL_OFFSET")
+            elif self.paged and count >= self.offset * self.pages:
+                logger.info(f"Catching up {address[:10]}...: {count} transfers since block "
+                            f"{startblocks[address]}, the rest next poll")
+
+        new.reverse()
+        return new
+
+    async def _fetch(self, client, wallets, startblocks=None, **kwargs):
+        """fetch_wallets with this poller's settings; `kwargs` override them"""
+        return await fetch_wallets(client, wallets, self.api_key, offset=self.offset, startblocks=startblocks,
+                                   **{**self.fetch_kwargs, **kwargs})
+
+    def latest(self, limit=None):
+        """Newest-first (name, address, tx) rows from the rolling window"""
+        rows = sorted(self._recent.values(), key=lambda row: tx_sort_key(row[2]), reverse=True)
+        return rows[:limit] if limit else rows
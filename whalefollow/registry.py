@@ -0,0 +1,198 @@
+"""
+WhaleFollow Pro - wallet registry
+- One labeled address list for bot.py and api/webhook.py (data/wallets.csv)
+- Compact binary table: 20-byte keys, open addressing, memory-mappable
+- O(1) address -> (label, category) for both sides of a transfer
+
+Build a .bin once for large label sets and point WALLETS_FILE at it:
+    python -m whalefollow.registry data/wallets.csv data/wallets.bin
+"""
+
+import os
+import struct
+import sys
+from typing import NamedTuple
+
+DEFAULT_WALLETS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'wallets.csv')
+WALLETS_FILE = os.environ.get('WALLETS_FILE', DEFAULT_WALLETS_FILE)
+
+MAGIC = b'WFREG\x00\x00\x01'
+HEADER = struct.Struct('<8sIIII')  # magic, slots, entries, labels, labels offset
+SLOT = struct.Struct('<20sI')  # address, label id + 1 (0 = empty) | TRACKED
+TRACKED = 1 << 31
+EMPTY = bytes(20)
+
+
+class Label(NamedTuple):
+    name: str
+    category: str
+    tracked: bool
+
+
+def address_key(address):
+    """'0x..' hex (any casing) -> 20 bytes, or None if it isn't an address"""
+    if not address:
+        return None
+    if address[:2] in ('0x', '0X'):
+        address = address[2:]
+    if len(address) != 40:
+        return None
+    try:
+        return bytes.fromhex(address)
+    except ValueError:
+        return None
+
+
+def same_address(a, b):
+    """Casing-insensitive address compare on the 20-byte keys"""
+    key = address_key(a)
+    return key is not None and key == address_key(b)
+
+
+def _slot_of(key, mask):
+    # Low bytes: vanity addresses share leading zeros, not trailing ones
+    return int.from_bytes(key[12:], 'little') & mask
+
+
+def read_csv(path, chain='ethereum'):
+    """(address, label, category, tracked) rows of one chain from an address,label,category,tracked[,chain] CSV"""
+    with open(path, newline='', encoding='utf-8') as f:
+        import csv  # imported on use, like mmap below: api/webhook.py may never open the registry
+        for row in csv.DictReader(f):
+            if (row.get('chain') or 'ethereum') == chain:
+                yield row['address'], row['label'], row.get('category') or 'unknown', row.get('tracked') == '1'
+
+
+def build(rows):
+    """Serialize (address, label, category, tracked) rows into the registry format"""
+    entries = {}
+    label_ids = {}
+    for address, name, category, tracked in rows:
+        key = address_key(address)
+        if key is None:
+            continue
+        label_id = label_ids.setdefault((name, category), len(label_ids))
+        entries[key] = label_id + 1 | (TRACKED if tracked else 0)
+
+    slots = 8
+    while slots < 2 * len(entries):  # load factor <= 0.5 keeps probes short
+        slots *= 2
+    mask = slots - 1
+    table = bytearray(slots * SLOT.size)
+    for key, value in entries.items():
+        i = _slot_of(key, mask)
+        while table[i * SLOT.size:i * SLOT.size + 20] != EMPTY:
+            i = (i + 1) & mask
+        SLOT.pack_into(table, i * SLOT.size, key, value)
+
+    strings = bytearray()
+    offsets = []
+    for name, category in label_ids:
+        offsets.append(len(strings))
+        for text in (name, category):
+            encoded = text.encode('utf-8')[:255]
+            strings += bytes([len(encoded)]) + encoded
+
+    labels_offset = HEADER.size + len(table)
+    header = HEADER.pack(MAGIC, slots, len(entries), len(offsets), labels_offset)
+    return header + table + struct.pack(f'<{len(offsets)}I', *offsets) + strings
+
+
+class WalletRegistry:
+    """Read-only lookups over a built registry (bytes or an mmap of a .bin file)"""
+
+    def __init__(self, buf):
+        magic, self.slots, self.entries, label_count, labels_offset = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a wallet registry file")
+        self._buf = buf
+        self._mask = self.slots - 1
+        self._offsets = struct.unpack_from(f'<{label_count}I', buf, labels_offset)
+        self._strings = labels_offset + 4 * label_count
+        self._labels = {}  # label id -> (name, category), decoded on first use
+
+    @classmethod
+    def open(cls, path=WALLETS_FILE):
+        """.csv is built in memory; .bin is memory-mapped"""
+        if path.endswith('.csv'):
+            return cls(build(read_csv(path)))
+        with open(path, 'rb') as f:
+            import mmap
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self):
+        return self.entries
+
+    def __contains__(self, address):
+        return self._value(address) != 0
+
+    @property
+    def nbytes(self):
+        return len(self._buf)
+
+    def _value(self, address):
+        key = address_key(address)
+        if key is None:
+            return 0
+        buf = self._buf
+        i = _slot_of(key, self._mask)
+        while True:
+            offset = HEADER.size + i * SLOT.size
+            slot_key = buf[offset:offset + 20]
+            if slot_key == key:
+                return int.from_bytes(buf[offset + 20:offset + 24], 'little')
+            if slot_key == EMPTY:
+                return 0
+            i = (i + 1) & self._mask
+
+    def _label(self, label_id):
+        label = self._labels.get(label_id)
+        if label is None:
+            pos = self._strings + self._offsets[label_id]
+            fields = []
+            for _ in range(2):
+                length = self._buf[pos]
+                fields.append(bytes(self._buf[pos + 1:pos + 1 + length]).decode('utf-8'))
+                pos += 1 + length
+            label = self._labels[label_id] = tuple(fields)
+        return label
+
+    def lookup(self, address):
+        """Label(name, category, tracked) or None"""
+        value = self._value(address)
+        if not value:
+            return None
+        name, category = self._label((value & ~TRACKED) - 1)
+        return Label(name, category, bool(value & TRACKED))
+
+    def label(self, address, default=None):
+        found = self.lookup(address)
+        return found.name if found else default
+
+    def tracked(self):
+        """{label: lowercase address} of the wallets the bot polls, in file order"""
+        found = []
+        for i in range(self.slots):
+            key, value = SLOT.unpack_from(self._buf, HEADER.size + i * SLOT.size)
+            if value & TRACKED:
+                found.append(((value & ~TRACKED) - 1, '0x' + key.hex()))
+        return {self._label(label_id)[0]: address for label_id, address in sorted(found)}
+
+
+_registry = None
+
+
+def get_registry():
+    """Process-wide registry loaded from WALLETS_FILE on first use"""
+    global _registry
+    if _registry is None:
+        _registry = WalletRegistry.open(WALLETS_FILE)
+    return _registry
+
+
+if __name__ == '__main__':
+    source, target = sys.argv[1:3]
+    data = build(read_csv(source))
+    with open(target, 'wb') as f:
+        f.write(data)
+    print(f"{target}: {WalletRegistry(data).entries} addresses, {len(data):,} bytes")
@@ -0,0 +1,148 @@
+"""
+WhaleFollow Pro - pre-rendered screens
+- Templates are parsed once; per-user screens only substitute their fields
+- Keyboards and static texts are serialized to JSON bytes once at startup
+- Webhook payloads are assembled from those fragments, not json.dumps'd;
+  a static screen's body is a per-chat head plus one precompiled tail
+- CachedRender: a shared view re-rendered only when its data changes
+"""
+
+import json
+from string import Formatter
+
+
+def _json(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+class Template:
+    """str.format-style text ("{threshold} ETH") split once into literal parts and fields.
+
+    render(**fields) returns (text, JSON string literal of text); literals
+    are escaped once here, so only the field values are escaped per call.
+    `escape` (e.g. html.escape) is applied to string field values.
+    """
+
+    def __init__(self, text, escape=None):
+        self.escape = escape
+        self.parts = []  # (literal, literal JSON-escaped, field name or None, format spec)
+        for literal, field, spec, _ in Formatter().parse(text):
+            self.parts.append((literal, _json(literal)[1:-1], field, spec or ''))
+        self.fields = [field for _, _, field, _ in self.parts if field is not None]
+        self.static = None
+        if not self.fields:
+            self.static = (text, _json(text))
+
+    def render(self, **fields):
+        if self.static is not None:
+            return self.static
+        text = []
+        escaped = []
+        for literal, literal_json, field, spec in self.parts:
+            text.append(literal)
+            escaped.append(literal_json)
+            if field is not None:
+                value = fields[field]
+                value = format(value, spec) if spec else str(value)
+                if self.escape is not None and isinstance(fields[field], str):
+                    value = self.escape(value)
+                text.append(value)
+                escaped.append(_json(value)[1:-1])
+        return ''.join(text), '"' + ''.join(escaped) + '"'
+
+    def text(self, **fields):
+        return self.render(**fields)[0]
+
+
+class Keyboard:
+    """Inline keyboard markup dict and its JSON, serialized once (str and UTF-8 bytes)"""
+
+    __slots__ = ('markup', 'json', 'bytes')
+
+    def __init__(self, markup):
+        self.markup = markup
+        self.json = _json(markup)
+        self.bytes = self.json.encode('utf-8')
+
+
+class Payload(dict):
+    """Bot API method payload (a plain dict for API calls) whose webhook
+    response body is built from cached fragments.
+
+    `tail` is the body from the text on, as bytes: '"text":...,"parse_mode":...}'.
+    """
+
+    __slots__ = ('_tail',)
+
+    def __init__(self, chat_id, text, tail, keyboard=None, message_id=None, parse_mode='HTML'):
+        super().__init__(chat_id=chat_id, text=text, parse_mode=parse_mode)
+        if message_id:
+            self['method'] = 'editMessageText'
+            self['message_id'] = message_id
+        else:
+            self['method'] = 'sendMessage'
+        if keyboard is not None:
+            self['reply_markup'] = keyboard.markup
+        self._tail = tail
+
+    @property
+    def body(self):
+        """JSON bytes of the payload"""
+        if 'message_id' in self:
+            head = f'{{"method":"editMessageText","chat_id":{self["chat_id"]},"message_id":{self["message_id"]},'
+        else:
+            head = f'{{"method":"sendMessage","chat_id":{self["chat_id"]},'
+        return head.encode('ascii') + self._tail
+
+
+class Screen:
+    """A text template with its keyboard; reply() makes the Payload.
+
+    Everything after the text (parse mode, keyboard) is compiled to bytes
+    once; so is the text itself when the template has no fields.
+    """
+
+    def __init__(self, text, keyboard=None, parse_mode='HTML', escape=None):
+        self.template = Template(text, escape)
+        self.keyboard = keyboard
+        self.parse_mode = parse_mode
+        after = b',"parse_mode":' + _json(parse_mode).encode('utf-8')
+        if keyboard is not None:
+            after += b',"reply_markup":' + keyboard.bytes
+        self._after = after + b'}'
+        self._static = None
+        if self.template.static is not None:
+            self._static = self._tail(self.template.static[1])
+
+    def _tail(self, text_json):
+        return b'"text":' + text_json.encode('utf-8') + self._after
+
+    def reply(self, chat_id, message_id=None, **fields):
+        if self._static is not None:
+            return Payload(chat_id, self.template.static[0], self._static, self.keyboard, message_id, self.parse_mode)
+        text, text_json = self.template.render(**fields)
+        return Payload(chat_id, text, self._tail(text_json), self.keyboard, message_id, self.parse_mode)
+
+
+class CachedRender:
+    """render() result reused until key() changes: one render per data refresh, not per user"""
+
+    def __init__(self, render, key):
+        self.render = render
+        self.key = key
+        self.renders = 0
+        self.hits = 0
+        self._key = self._value = None
+
+    def __call__(self):
+        key = self.key()
+        if self.renders == 0 or key != self._key:
+            self._value = self.render()
+            self._key = key
+            self.renders += 1
+        else:
+            self.hits += 1
+        return self._value
+
+    def stats(self):
+        return {'renders': self.renders, 'hits': self.hits}
@@ -0,0 +1,144 @@
+"""
+WhaleFollow Pro - callback routes
+- One declarative table for bot.py (async) and api/webhook.py (sync)
+- O(1) dispatch: an exact dict lookup, then one prefix lookup for
+  parameterized routes ('threshold_<n>')
+- Per-route latency histogram, call/error counts, optional concurrency limit
+"""
+
+import time
+import threading
+
+from whalefollow.metrics import Histogram
+
+
+class Route:
+    __slots__ = ('name', 'handler', 'convert', 'limit', 'timings', 'calls', 'errors', 'active', '_semaphore')
+
+    def __init__(self, name, handler, convert=None, limit=None):
+        self.name = name
+        self.handler = handler
+        self.convert = convert
+        self.limit = limit
+        self.timings = Histogram()
+        self.calls = 0
+        self.errors = 0
+        self.active = 0
+        self._semaphore = None
+
+    def semaphore(self, asynchronous):
+        if self._semaphore is None and self.limit:
+            if asynchronous:
+                import asyncio  # not at import: api/webhook.py is sync and asyncio costs its cold start ~20 ms
+                self._semaphore = asyncio.Semaphore(self.limit)
+            else:
+                self._semaphore = threading.BoundedSemaphore(self.limit)
+        return self._semaphore
+
+    def stats(self):
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'active': self.active,
+            'p50_ms': round(self.timings.quantile(0.50) * 1000, 2),
+            'p99_ms': round(self.timings.quantile(0.99) * 1000, 2),
+        }
+
+
+class Router:
+    """callback_data -> handler(*args[, param]).
+
+    add('settings', fn) routes 'settings' exactly. add('threshold_<n>', fn,
+    convert=int) routes 'threshold_<anything>' with convert(anything)
+    appended to the handler's arguments; the parameter follows the last '_'
+    so it cannot contain one. A convert() raising ValueError leaves the data
+    unmatched. `limit` caps concurrent calls of a route; further calls wait.
+    """
+
+    def __init__(self):
+        self.routes = {}  # exact callback_data -> Route
+        self.prefixes = {}  # 'threshold_' -> Route
+        self.unmatched = 0
+
+    def add(self, name, handler, *, convert=None, limit=None):
+        route = Route(name, handler, convert, limit)
+        if name.endswith('>'):
+            prefix = name[:name.rindex('<')]
+            if not prefix.endswith('_'):
+                raise ValueError(f"route parameter must follow '_': {name}")
+            self.prefixes[prefix] = route
+        else:
+            self.routes[name] = route
+        return handler
+
+    def route(self, name, **options):
+        """Decorator form of add()"""
+        return lambda handler: self.add(name, handler, **options)
+
+    def match(self, data):
+        """(route, args) for callback data, or (None, ()) """
+        route = self.routes.get(data)
+        if route is not None:
+            return route, ()
+        head, sep, param = data.rpartition('_')
+        route = self.prefixes.get(head + sep) if sep else None
+        if route is None:
+            return None, ()
+        try:
+            return route, ((route.convert(param) if route.convert else param),)
+        except ValueError:
+            return None, ()
+
+    def dispatch(self, data, *args):
+        """Run the sync handler for `data`; None if nothing matches"""
+        route, params = self.match(data)
+        if route is None:
+            self.unmatched += 1
+            return None
+        semaphore = route.semaphore(asynchronous=False)
+        if semaphore is not None:
+            semaphore.acquire()
+        route.calls += 1
+        route.active += 1
+        started = time.perf_counter()
+        try:
+            return route.handler(*args, *params)
+        except Exception:
+            route.errors += 1
+            raise
+        finally:
+            route.timings.observe(time.perf_counter() - started)
+            route.active -= 1
+            if semaphore is not None:
+                semaphore.release()
+
+    async def dispatch_async(self, data, *args):
+        """Await the async handler for `data`; None if nothing matches"""
+        route, params = self.match(data)
+        if route is None:
+            self.unmatched += 1
+            return None
+        semaphore = route.semaphore(asynchronous=True)
+        if semaphore is not None:
+            await semaphore.acquire()
+        route.calls += 1
+        route.active += 1
+        started = time.perf_counter()
+        try:
+            return await route.handler(*args, *params)
+        except Exception:
+            route.errors += 1
+            raise
+        finally:
+            route.timings.observe(time.perf_counter() - started)
+            route.active -= 1
+            if semaphore is not None:
+                semaphore.release()
+
+    def all(self):
+        return [*self.routes.values(), *self.prefixes.values()]
+
+    def stats(self):
+        stats = {route.name: route.stats() for route in self.all() if route.calls}
+        stats['unmatched'] = self.unmatched
+        return stats
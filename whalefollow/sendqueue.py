@@ -0,0 +1,242 @@
+"""
+WhaleFollow Pro - outbound Telegram send queue
+- Token buckets: ~30 msg/s for the bot, ~1 msg/s per chat
+- Priority lanes: interactive replies go before broadcast alerts
+- Honors retry_after (429) and retries transient errors with backoff
+- Queue depth and send latency metrics
+"""
+
+import os
+import asyncio
+import logging
+import random
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+SEND_RATE = float(os.environ.get('SEND_RATE', 30))
+SEND_BURST = float(os.environ.get('SEND_BURST', 1))
+SEND_CHAT_RATE = float(os.environ.get('SEND_CHAT_RATE', 1))
+SEND_CHAT_BURST = float(os.environ.get('SEND_CHAT_BURST', 3))
+SEND_CONCURRENCY = int(os.environ.get('SEND_CONCURRENCY', 16))
+SEND_MAX_RETRIES = int(os.environ.get('SEND_MAX_RETRIES', 3))
+
+# Priority lanes, lowest value is served first
+INTERACTIVE = 0
+BROADCAST = 1
+
+SCAN_LIMIT = 64  # jobs looked at per lane when the head's chat is throttled
+PRUNE_AT = 10_000  # idle per-chat buckets are dropped past this many
+
+
+class RetryAfter(Exception):
+    """Raised by raw senders on HTTP 429 (PTB's RetryAfter works the same way)"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Flood control exceeded. Retry in {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+def default_retryable(exc):
+    return isinstance(exc, (OSError, asyncio.TimeoutError))
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate, capacity, now=0.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until one token is available (0 if one is available now)"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def idle(self, now):
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class _Job:
+    __slots__ = ('call', 'chat_id', 'priority', 'future', 'enqueued', 'attempts', 'not_before', 'retryable')
+
+    def __init__(self, call, chat_id, priority, future, now, retryable=None):
+        self.call = call
+        self.chat_id = chat_id
+        self.priority = priority
+        self.future = future
+        self.retryable = retryable
+        self.enqueued = now
+        self.attempts = 0
+        self.not_before = now
+
+
+class SendQueue:
+    """Single scheduler task that releases send coroutines under the Telegram limits.
+
+    `submit(call, chat_id=..., priority=...)` takes a zero-argument coroutine
+    factory and returns a future for its result. Exceptions carrying a
+    `retry_after` attribute pause the whole queue for that long and requeue
+    the job; `is_retryable(exc)` errors are retried with exponential backoff.
+    A job's own `retryable` replaces is_retryable for it (calls that must
+    not run twice).
+    """
+
+    def __init__(self, *, rate=SEND_RATE, burst=SEND_BURST, chat_rate=SEND_CHAT_RATE, chat_burst=SEND_CHAT_BURST,
+                 concurrency=SEND_CONCURRENCY, max_retries=SEND_MAX_RETRIES, backoff=0.5,
+                 is_retryable=default_retryable):
+        self.rate = rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.is_retryable = is_retryable
+        self._global = TokenBucket(rate, burst)
+        self._chats = {}  # chat_id -> TokenBucket
+        self._lanes = (deque(), deque())
+        self._slots = asyncio.Semaphore(concurrency)
+        self._wakeup = asyncio.Event()
+        self._paused_until = 0.0
+        self._task = None
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.throttled = 0
+        self.latencies = deque(maxlen=2048)  # seconds from submit to delivery
+
+    # -- public ---------------------------------------------------------------
+    def submit(self, call, *, chat_id=None, priority=INTERACTIVE, retryable=None):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+        future = loop.create_future()
+        self._lanes[priority].append(_Job(call, chat_id, priority, future, loop.time(), retryable))
+        self._wakeup.set()
+        return future
+
+    async def send(self, call, *, chat_id=None, priority=INTERACTIVE, retryable=None):
+        return await self.submit(call, chat_id=chat_id, priority=priority, retryable=retryable)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def depth(self):
+        return {'interactive': len(self._lanes[INTERACTIVE]), 'broadcast': len(self._lanes[BROADCAST])}
+
+    def stats(self):
+        samples = sorted(self.latencies)
+
+        def pct(p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 3) if samples else 0.0
+
+        return {
+            'queued': self.depth(),
+            'sent': self.sent,
+            'failed': self.failed,
+            'retries': self.retries,
+            'throttled': self.throttled,
+            'latency_p50': pct(0.50),
+            'latency_p95': pct(0.95),
+            'latency_max': round(samples[-1], 3) if samples else 0.0,
+        }
+
+    # -- scheduler ------------------------------------------------------------
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            wait = max(self._paused_until - now, self._global.wait_time(now))
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            job, wait = self._pick(now)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._slots.acquire()
+            now = loop.time()
+            self._global.take(now)
+            if job.chat_id is not None:
+                self._chat_bucket(job.chat_id, now).take(now)
+            loop.create_task(self._send(job))
+
+    def _pick(self, now):
+        """First ready job by lane priority; else (None, seconds until one may be ready)"""
+        soonest = None
+        for lane in self._lanes:
+            i = 0
+            while i < len(lane) and i < SCAN_LIMIT:
+                job = lane[i]
+                if job.future.done():  # caller gave up
+                    del lane[i]
+                    continue
+                wait = job.not_before - now
+                if job.chat_id is not None:
+                    wait = max(wait, self._chat_bucket(job.chat_id, now).wait_time(now))
+                if wait <= 0:
+                    del lane[i]
+                    return job, 0.0
+                soonest = wait if soonest is None else min(soonest, wait)
+                i += 1
+        return None, soonest
+
+    def _chat_bucket(self, chat_id, now):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= PRUNE_AT:
+                self._chats = {k: b for k, b in self._chats.items() if not b.idle(now)}
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, now)
+        return bucket
+
+    async def _send(self, job):
+        loop = asyncio.get_running_loop()
+        try:
+            result = await job.call()
+        except Exception as exc:
+            self._handle_error(job, exc, loop.time())
+        else:
+            self.sent += 1
+            self.latencies.append(loop.time() - job.enqueued)
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._slots.release()
+            self._wakeup.set()
+
+    def _handle_error(self, job, exc, now):
+        job.attempts += 1
+        retry_after = getattr(exc, 'retry_after', None)
+        if retry_after is not None and job.attempts <= self.max_retries + 1:
+            retry_after = getattr(retry_after, 'total_seconds', lambda: retry_after)()
+            self.throttled += 1
+            self._paused_until = max(self._paused_until, now + float(retry_after))
+            logger.warning(f"Telegram flood control: pausing sends for {retry_after}s")
+            self._lanes[job.priority].appendleft(job)
+        elif job.attempts <= self.max_retries and (job.retryable or self.is_retryable)(exc):
+            self.retries += 1
+            job.not_before = now + self.backoff * 2 ** (job.attempts - 1) * random.uniform(0.8, 1.2)
+            self._lanes[job.priority].appendleft(job)
+        else:
+            self.failed += 1
+            if not job.future.done():
+                job.future.set_exception(exc)
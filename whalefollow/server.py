@@ -0,0 +1,88 @@
+"""
+WhaleFollow Pro - health and webhook server on the bot's event loop
+- aiohttp: no extra thread, and it sees the loop it reports on
+- GET / (stats JSON), /healthz (503 when unhealthy), /metrics (Prometheus)
+- POST <webhook path>: Telegram updates, checked against the secret token
+  header, handed to on_update() and acknowledged at once
+"""
+
+import os
+import hmac
+import logging
+
+from aiohttp import web
+
+from whalefollow.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+PORT = int(os.environ.get('PORT', 8000))
+
+
+class HealthServer:
+    """`stats()` -> dict for /, `healthz()` -> (ok, dict). With `on_update`
+    (an async callable taking the update dict), POSTs to `webhook_path`
+    carrying `secret` in X-Telegram-Bot-Api-Secret-Token are accepted.
+    """
+
+    def __init__(self, stats, healthz, *, port=PORT, host='0.0.0.0', on_update=None, webhook_path=None,
+                 secret=None):
+        self.stats = stats
+        self.healthz = healthz
+        self.port = port
+        self.host = host
+        self.on_update = on_update
+        self.webhook_path = webhook_path
+        self.secret = secret
+        self.updates = 0
+        self.rejected = 0
+        self._runner = None
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/', self.index)
+        app.router.add_get('/healthz', self.health)
+        app.router.add_get('/metrics', self.metrics)
+        if self.on_update is not None:
+            app.router.add_post(self.webhook_path, self.webhook)
+        return app
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if not self.port:  # bound to a free port
+            self.port = site._server.sockets[0].getsockname()[1]
+        logger.info(f"Health server running on port {self.port}"
+                    + (f", Telegram webhook at {self.webhook_path}" if self.on_update else ''))
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def index(self, request):
+        return web.json_response(self.stats())
+
+    async def health(self, request):
+        ok, body = self.healthz()
+        return web.json_response(body, status=200 if ok else 503)
+
+    async def metrics(self, request):
+        return web.Response(body=METRICS.exposition().encode(),
+                            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+    async def webhook(self, request):
+        token = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+        if self.secret and not hmac.compare_digest(token, self.secret):
+            self.rejected += 1
+            return web.Response(status=403)
+        try:
+            update = await request.json()
+        except ValueError:
+            self.rejected += 1
+            return web.Response(status=400)
+        self.updates += 1
+        await self.on_update(update)
+        return web.Response(text='OK')
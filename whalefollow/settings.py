@@ -0,0 +1,466 @@
+"""
+WhaleFollow Pro - durable user settings store
+- One store shared by bot.py and api/webhook.py (SETTINGS_URL)
+- Backends: memory://, sqlite:///path (WAL), redis://host:port/db
+- Write-behind buffer: a tap never waits on fsync
+- Batched reads and ordered batch scans for alert fan-out
+- Compact rows: chat_id -> one packed integer
+- Per-chat watchlists of (chain, address); small and rarely changed, so
+  written through rather than buffered
+- Named job checkpoints (JSON; broadcast progress), also written through
+"""
+
+import os
+import json
+import logging
+import threading
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = int(os.environ.get('ALERT_THRESHOLD', 100))
+FLUSH_INTERVAL = float(os.environ.get('SETTINGS_FLUSH_INTERVAL', 0.5))
+FLUSH_PENDING = int(os.environ.get('SETTINGS_FLUSH_PENDING', 10_000))
+
+
+class Settings(NamedTuple):
+    threshold: int = DEFAULT_THRESHOLD  # ETH
+    paused: bool = False
+    alerts: bool = False  # subscribed to whale alerts
+
+    @property
+    def receives_alerts(self):
+        return self.alerts and not self.paused
+
+
+DEFAULTS = Settings()
+
+
+def pack(settings):
+    """Settings -> int: threshold << 2 | paused << 1 | alerts"""
+    return int(settings.threshold) << 2 | settings.paused << 1 | settings.alerts
+
+
+def unpack(packed):
+    return Settings(packed >> 2, bool(packed & 2), bool(packed & 1))
+
+
+# =============================================================================
+# INTERFACE
+# =============================================================================
+class SettingsStore:
+    """get/update one chat, get_many for a batch, iter_batches for ordered scans"""
+
+    def get(self, chat_id):
+        return self.get_many([chat_id])[chat_id]
+
+    def get_many(self, chat_ids):
+        """{chat_id: Settings} for every id (defaults for unknown chats)"""
+        raise NotImplementedError
+
+    def find(self, chat_id):
+        """Settings of a chat that has a row, None for one that never had"""
+        raise NotImplementedError
+
+    def update(self, chat_id, **changes):
+        """Apply field changes, returns the new Settings"""
+        raise NotImplementedError
+
+    def iter_batches(self, batch_size=1000, after=0):
+        """Yield lists of (chat_id, Settings) in chat_id order, starting after `after`"""
+        raise NotImplementedError
+
+    def watches(self, chat_id=None):
+        """(chat_id, chain, address) of one chat's watchlist, or of every chat's"""
+        raise NotImplementedError
+
+    def watch(self, chat_id, chain, address):
+        """Add to a watchlist; returns False if it was already there"""
+        raise NotImplementedError
+
+    def unwatch(self, chat_id, chain=None, address=None):
+        """Drop one address (chain None: on any chain), or the whole watchlist; returns how many"""
+        raise NotImplementedError
+
+    def checkpoints(self, prefix=''):
+        """{name: state dict} of the saved checkpoints whose name starts with `prefix`"""
+        raise NotImplementedError
+
+    def save_checkpoint(self, name, state):
+        """Store a JSON-serializable dict under `name`; None deletes it"""
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class MemoryStore(SettingsStore):
+    """Process-local dict; for tests, benchmarks and single-process dev"""
+
+    def __init__(self):
+        self._rows = {}  # chat_id -> packed
+        self._watches = {}  # chat_id -> {(chain, address)}
+        self._checkpoints = {}  # name -> JSON
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get_many(self, chat_ids):
+        rows = self._rows
+        return {chat_id: unpack(rows[chat_id]) if chat_id in rows else DEFAULTS for chat_id in chat_ids}
+
+    def find(self, chat_id):
+        return unpack(self._rows[chat_id]) if chat_id in self._rows else None
+
+    def update(self, chat_id, **changes):
+        settings = self.get(chat_id)._replace(**changes)
+        self._rows[chat_id] = pack(settings)
+        return settings
+
+    def iter_batches(self, batch_size=1000, after=0):
+        ids = sorted(chat_id for chat_id in self._rows if chat_id > after)
+        for i in range(0, len(ids), batch_size):
+            yield [(chat_id, unpack(self._rows[chat_id])) for chat_id in ids[i:i + batch_size]]
+
+    def watches(self, chat_id=None):
+        chats = self._watches if chat_id is None else {chat_id: self._watches.get(chat_id, ())}
+        return [(chat, chain, address) for chat, watched in chats.items() for chain, address in sorted(watched)]
+
+    def watch(self, chat_id, chain, address):
+        watched = self._watches.setdefault(chat_id, set())
+        if (chain, address) in watched:
+            return False
+        watched.add((chain, address))
+        return True
+
+    def unwatch(self, chat_id, chain=None, address=None):
+        watched = self._watches.get(chat_id, set())
+        dropped = {w for w in watched if address is None or (w[1] == address and chain in (None, w[0]))}
+        watched -= dropped
+        if not watched:
+            self._watches.pop(chat_id, None)
+        return len(dropped)
+
+    def checkpoints(self, prefix=''):
+        return {name: json.loads(state) for name, state in self._checkpoints.items() if name.startswith(prefix)}
+
+    def save_checkpoint(self, name, state):
+        if state is None:
+            self._checkpoints.pop(name, None)
+        else:
+            self._checkpoints[name] = json.dumps(state)
+
+
+# =============================================================================
+# WRITE-BEHIND BASE
+# =============================================================================
+class WriteBehindStore(SettingsStore):
+    """Buffers updates in memory; a daemon thread writes them in batches.
+
+    Reads see buffered values first, so a chat always reads its own writes.
+    Call flush() before a serverless invocation returns. Subclasses provide
+    _read_many(ids) -> {id: packed}, _write_many([(id, packed)]) and
+    _scan(after, limit) -> [(id, packed)].
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, flush_pending=FLUSH_PENDING):
+        self.flush_interval = flush_interval
+        self.flush_pending = flush_pending
+        self._pending = {}  # chat_id -> packed, not yet handed to the backend
+        self._flushing = {}  # batch being written right now
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self.writes = 0
+        self.flushes = 0
+        self._thread = threading.Thread(target=self._flush_loop, name='settings-flush', daemon=True)
+        self._thread.start()
+
+    def get_many(self, chat_ids):
+        found = {}
+        missing = []
+        with self._lock:
+            for chat_id in chat_ids:
+                packed = self._pending.get(chat_id, self._flushing.get(chat_id))
+                if packed is None:
+                    missing.append(chat_id)
+                else:
+                    found[chat_id] = unpack(packed)
+        if missing:
+            rows = self._read_many(missing)
+            for chat_id in missing:
+                found[chat_id] = unpack(rows[chat_id]) if chat_id in rows else DEFAULTS
+        return found
+
+    def find(self, chat_id):
+        with self._lock:
+            packed = self._pending.get(chat_id, self._flushing.get(chat_id))
+        if packed is None:
+            packed = self._read_many([chat_id]).get(chat_id)
+        return None if packed is None else unpack(packed)
+
+    def update(self, chat_id, **changes):
+        settings = self.get(chat_id)._replace(**changes)
+        with self._lock:
+            self._pending[chat_id] = pack(settings)
+            self.writes += 1
+            if len(self._pending) >= self.flush_pending:
+                self._wake.set()
+        return settings
+
+    def iter_batches(self, batch_size=1000, after=0):
+        self.flush()
+        while True:
+            rows = self._scan(after, batch_size)
+            if not rows:
+                return
+            yield [(chat_id, unpack(packed)) for chat_id, packed in rows]
+            after = rows[-1][0]
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                self._flushing, self._pending = self._pending, {}
+            try:
+                self._write_many(list(self._flushing.items()))
+                self.flushes += 1
+            except Exception:
+                # Put the batch back unless newer values arrived meanwhile
+                with self._lock:
+                    self._pending = {**self._flushing, **self._pending}
+                raise
+            finally:
+                with self._lock:
+                    self._flushing = {}
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Settings flush failed: {e}")
+
+    def _read_many(self, chat_ids):
+        raise NotImplementedError
+
+    def _write_many(self, rows):
+        raise NotImplementedError
+
+    def _scan(self, after, limit):
+        raise NotImplementedError
+
+
+# =============================================================================
+# BACKENDS
+# =============================================================================
+class SQLiteStore(WriteBehindStore):
+    """SQLite in WAL mode; one INTEGER PRIMARY KEY row per chat (rowid table)"""
+
+    READ_CHUNK = 900  # stays under SQLite's bound-parameter limit
+
+    def __init__(self, path, **kwargs):
+        import sqlite3
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db_lock = threading.Lock()
+        with self._db_lock:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('PRAGMA busy_timeout=5000')
+            self._db.execute('CREATE TABLE IF NOT EXISTS settings (chat_id INTEGER PRIMARY KEY, packed INTEGER NOT NULL)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS watches (chat_id INTEGER NOT NULL, chain TEXT NOT NULL, '
+                             'address TEXT NOT NULL, PRIMARY KEY (chat_id, chain, address)) WITHOUT ROWID')
+            self._db.execute('CREATE TABLE IF NOT EXISTS checkpoints (name TEXT PRIMARY KEY, state TEXT NOT NULL)')
+        super().__init__(**kwargs)
+
+    def _read_many(self, chat_ids):
+        rows = {}
+        with self._db_lock:
+            for i in range(0, len(chat_ids), self.READ_CHUNK):
+                chunk = chat_ids[i:i + self.READ_CHUNK]
+                marks = ','.join('?' * len(chunk))
+                rows.update(self._db.execute(f'SELECT chat_id, packed FROM settings WHERE chat_id IN ({marks})', chunk))
+        return rows
+
+    def _write_many(self, rows):
+        with self._db_lock:
+            self._db.execute('BEGIN')
+            try:
+                self._db.executemany('INSERT OR REPLACE INTO settings (chat_id, packed) VALUES (?, ?)', rows)
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+
+    def _scan(self, after, limit):
+        with self._db_lock:
+            return self._db.execute('SELECT chat_id, packed FROM settings WHERE chat_id > ? ORDER BY chat_id LIMIT ?',
+                                    (after, limit)).fetchall()
+
+    def watches(self, chat_id=None):
+        with self._db_lock:
+            if chat_id is None:
+                return self._db.execute('SELECT chat_id, chain, address FROM watches').fetchall()
+            return self._db.execute('SELECT chat_id, chain, address FROM watches WHERE chat_id = ?',
+                                    (chat_id,)).fetchall()
+
+    def watch(self, chat_id, chain, address):
+        with self._db_lock:
+            return self._db.execute('INSERT OR IGNORE INTO watches (chat_id, chain, address) VALUES (?, ?, ?)',
+                                    (chat_id, chain, address)).rowcount > 0
+
+    def unwatch(self, chat_id, chain=None, address=None):
+        with self._db_lock:
+            if address is None:
+                return self._db.execute('DELETE FROM watches WHERE chat_id = ?', (chat_id,)).rowcount
+            if chain is None:
+                return self._db.execute('DELETE FROM watches WHERE chat_id = ? AND address = ?',
+                                        (chat_id, address)).rowcount
+            return self._db.execute('DELETE FROM watches WHERE chat_id = ? AND chain = ? AND address = ?',
+                                    (chat_id, chain, address)).rowcount
+
+    def checkpoints(self, prefix=''):
+        with self._db_lock:
+            rows = self._db.execute('SELECT name, state FROM checkpoints WHERE substr(name, 1, ?) = ?',
+                                    (len(prefix), prefix)).fetchall()
+        return {name: json.loads(state) for name, state in rows}
+
+    def save_checkpoint(self, name, state):
+        with self._db_lock:
+            if state is None:
+                self._db.execute('DELETE FROM checkpoints WHERE name = ?', (name,))
+            else:
+                self._db.execute('INSERT OR REPLACE INTO checkpoints (name, state) VALUES (?, ?)',
+                                 (name, json.dumps(state)))
+
+    def close(self):
+        super().close()
+        with self._db_lock:
+            self._db.close()
+
+
+class RedisStore(WriteBehindStore):
+    """Any redis-py compatible client: hash `<prefix>` for rows, zset `<prefix>:ids` for ordered scans;
+    set `<prefix>:watch:<chat_id>` of 'chain:address' per watchlist, set `<prefix>:watchers` of their chats;
+    hash `<prefix>:checkpoints` of name -> JSON
+    """
+
+    def __init__(self, client, prefix='whalefollow:settings', **kwargs):
+        self.client = client
+        self.key = prefix
+        self.ids_key = prefix + ':ids'
+        self.watchers_key = prefix + ':watchers'
+        self.checkpoints_key = prefix + ':checkpoints'
+        super().__init__(**kwargs)
+
+    def _read_many(self, chat_ids):
+        values = self.client.hmget(self.key, chat_ids)
+        return {chat_id: int(value) for chat_id, value in zip(chat_ids, values) if value is not None}
+
+    def _write_many(self, rows):
+        pipe = self.client.pipeline()
+        pipe.hset(self.key, mapping=dict(rows))
+        pipe.zadd(self.ids_key, {chat_id: chat_id for chat_id, _ in rows})
+        pipe.execute()
+
+    def _scan(self, after, limit):
+        ids = [int(chat_id) for chat_id in self.client.zrangebyscore(self.ids_key, f'({after}', '+inf', start=0, num=limit)]
+        if not ids:
+            return []
+        values = self.client.hmget(self.key, ids)
+        return [(chat_id, int(value)) for chat_id, value in zip(ids, values) if value is not None]
+
+    def _watch_key(self, chat_id):
+        return f'{self.key}:watch:{chat_id}'
+
+    def watches(self, chat_id=None):
+        chats = [int(c) for c in self.client.smembers(self.watchers_key)] if chat_id is None else [chat_id]
+        pipe = self.client.pipeline()
+        for chat in chats:
+            pipe.smembers(self._watch_key(chat))
+        rows = []
+        for chat, members in zip(chats, pipe.execute()):
+            for member in sorted(m.decode() if isinstance(m, bytes) else m for m in members):
+                chain, address = member.split(':', 1)
+                rows.append((chat, chain, address))
+        return rows
+
+    def watch(self, chat_id, chain, address):
+        pipe = self.client.pipeline()
+        pipe.sadd(self._watch_key(chat_id), f'{chain}:{address}')
+        pipe.sadd(self.watchers_key, chat_id)
+        return pipe.execute()[0] > 0
+
+    def unwatch(self, chat_id, chain=None, address=None):
+        key = self._watch_key(chat_id)
+        if address is None:
+            dropped = self.client.scard(key)
+            self.client.delete(key)
+        else:
+            members = [f'{c}:{a}' for _, c, a in self.watches(chat_id) if a == address and chain in (None, c)]
+            dropped = self.client.srem(key, *members) if members else 0
+        if not self.client.exists(key):
+            self.client.srem(self.watchers_key, chat_id)
+        return dropped
+
+    def checkpoints(self, prefix=''):
+        states = {}
+        for name, state in self.client.hgetall(self.checkpoints_key).items():
+            name = name.decode() if isinstance(name, bytes) else name
+            if name.startswith(prefix):
+                states[name] = json.loads(state)
+        return states
+
+    def save_checkpoint(self, name, state):
+        if state is None:
+            self.client.hdel(self.checkpoints_key, name)
+        else:
+            self.client.hset(self.checkpoints_key, name, json.dumps(state))
+
+
+class LazyStore:
+    """open_store(url) on first use, for serverless cold starts: an update that
+    never reads settings (a menu tap) doesn't pay for opening the backend"""
+
+    def __init__(self, url):
+        self.url = url
+        self._store = None
+
+    def __getattr__(self, name):
+        if self._store is None:
+            self._store = open_store(self.url)
+        return getattr(self._store, name)
+
+    def flush(self):
+        if self._store is not None:
+            self._store.flush()
+
+    def close(self):
+        if self._store is not None:
+            self._store.close()
+
+
+def open_store(url):
+    """memory:// | sqlite:///relative.db | sqlite:////absolute.db | redis://host:port/db"""
+    if url.startswith('memory:'):
+        return MemoryStore()
+    if url.startswith('sqlite:///'):
+        return SQLiteStore(url[len('sqlite:///'):])
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        import redis
+        return RedisStore(redis.Redis.from_url(url))
+    raise ValueError(f"Unsupported SETTINGS_URL: {url}")
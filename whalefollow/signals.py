@@ -0,0 +1,244 @@
+"""
+WhaleFollow Pro - copy-trade signals
+- Net position of each tracked wallet per asset, rebuilt incrementally from
+  its transfers: one array-backed time series per (wallet, asset), one point
+  per transfer, O(1) amortized to add; history is never recomputed
+- Points hold running totals (amount, USD, inbound and outbound counts), so
+  any window is a bisect and a subtraction
+- Accumulation / distribution signal when a wallet's net flow of one asset
+  over SIGNAL_WINDOW passes SIGNAL_USD, over at least SIGNAL_MIN_TRANSFERS
+  transfers of which SIGNAL_DOMINANCE go that way; raised once, re-armed
+  when the net flow falls back under half the threshold
+- Stablecoin flows move positions but raise no signals
+"""
+
+import os
+import time
+import logging
+from array import array
+from bisect import bisect_right
+from collections import Counter, deque
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+SIGNAL_WINDOW = float(os.environ.get('SIGNAL_WINDOW', 86400))  # seconds
+SIGNAL_USD = float(os.environ.get('SIGNAL_USD', 1_000_000))
+SIGNAL_MIN_TRANSFERS = int(os.environ.get('SIGNAL_MIN_TRANSFERS', 3))
+SIGNAL_DOMINANCE = float(os.environ.get('SIGNAL_DOMINANCE', 0.75))  # share of transfers going the signal's way
+SIGNAL_RETENTION = float(os.environ.get('SIGNAL_RETENTION', 30 * 86400))  # seconds of points kept
+
+ZERO = (0.0, 0.0, 0, 0)
+
+
+class Signal(NamedTuple):
+    kind: str  # 'accumulation' or 'distribution'
+    wallet: str
+    address: str
+    chain: str
+    asset: str
+    net_usd: float  # over the window
+    net_amount: float
+    transfers: int  # in the window
+    position: float  # net amount since tracking started
+    timestamp: int  # of the transfer that raised it
+
+
+class PositionSeries:
+    """One wallet's flows of one asset: times[i] and totals up to and including point i.
+
+    Points older than the retention are dropped in batches once they are
+    half the series; their totals live on in `base`, so windows reaching
+    back past them still subtract correctly.
+    """
+
+    __slots__ = ('times', 'amount', 'usd', 'inbound', 'outbound', 'base', 'state', 'late')
+
+    def __init__(self):
+        self.times = array('q')
+        self.amount = array('d')
+        self.usd = array('d')
+        self.inbound = array('q')
+        self.outbound = array('q')
+        self.base = ZERO  # totals before the first point kept
+        self.state = None  # kind of the signal currently raised
+        self.late = 0  # transfers older than the last point, booked at its time
+
+    def __len__(self):
+        return len(self.times)
+
+    def totals(self, i):
+        """(amount, usd, inbound, outbound) up to point i; -1: before the first point"""
+        if i < 0:
+            return self.base
+        return self.amount[i], self.usd[i], self.inbound[i], self.outbound[i]
+
+    def add(self, timestamp, amount, usd, retention=SIGNAL_RETENTION):
+        """Book one transfer: amount and usd signed, positive into the wallet"""
+        n = len(self.times)
+        total_amount, total_usd, inbound, outbound = self.totals(n - 1)
+        if n and timestamp < self.times[-1]:
+            timestamp = self.times[-1]  # the totals after it are already written
+            self.late += 1
+        self.times.append(timestamp)
+        self.amount.append(total_amount + amount)
+        self.usd.append(total_usd + usd)
+        self.inbound.append(inbound + (amount >= 0))
+        self.outbound.append(outbound + (amount < 0))
+        if n >= 64 and self.times[n // 2] < timestamp - retention:
+            self.trim(bisect_right(self.times, timestamp - retention))
+
+    def trim(self, k):
+        """Drop the first k points"""
+        self.base = self.totals(k - 1)
+        for values in (self.times, self.amount, self.usd, self.inbound, self.outbound):
+            del values[:k]
+
+    def since(self, t):
+        """(net amount, net usd, inbound, outbound) of the transfers after time t"""
+        then = self.totals(bisect_right(self.times, t) - 1)
+        now = self.totals(len(self.times) - 1)
+        return tuple(b - a for a, b in zip(then, now))
+
+    @property
+    def position(self):
+        return self.totals(len(self.times) - 1)[0]
+
+    def nbytes(self):
+        return sum(values.itemsize * len(values) for values in (self.times, self.amount, self.usd, self.inbound,
+                                                                  self.outbound))
+
+
+class SignalEngine:
+    """Positions and signals from (name, address, tx) stream rows of tracked wallets.
+
+    `skip(chain, address)` leaves wallets out (exchanges: their flows are
+    their customers', see flows.FlowTracker). Windows are measured in
+    transfer time, so a replay raises the same signals as the live run.
+    """
+
+    def __init__(self, *, skip=None, window=SIGNAL_WINDOW, min_usd=SIGNAL_USD, min_transfers=SIGNAL_MIN_TRANSFERS,
+                 dominance=SIGNAL_DOMINANCE, retention=SIGNAL_RETENTION, keep=20):
+        self.skip = skip
+        self.window = window
+        self.min_usd = min_usd
+        self.min_transfers = min_transfers
+        self.dominance = dominance
+        self.retention = max(retention, window)
+        self.series = {}  # (chain, address, asset) -> PositionSeries
+        self.names = {}  # (chain, address) -> wallet name
+        self.stable = set()  # assets that raise no signals
+        self.recent = deque(maxlen=keep)  # newest last
+        self.transfers = 0
+        self.skipped = 0
+        self.unpriced = 0
+        self.signals = Counter()  # kind -> raised
+
+    def add(self, name, address, tx):
+        """Book one transfer of the tracked wallet `address`; returns a Signal or None"""
+        self.transfers += 1
+        if self.skip is not None and self.skip(tx.chain, address):
+            self.skipped += 1
+            return None
+        outgoing = tx.is_from(address)
+        if outgoing and tx.to and tx.is_from(tx.to):
+            return None  # to itself
+        key = (tx.chain, address, tx.symbol)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = PositionSeries()
+            self.names[tx.chain, address] = name
+            if tx.token is not None and tx.token.stable:
+                self.stable.add(tx.symbol)
+        if tx.usd is None:
+            self.unpriced += 1
+        sign = -1.0 if outgoing else 1.0
+        series.add(tx.timestamp, sign * tx.amount, sign * (tx.usd or 0.0), self.retention)
+        if tx.symbol in self.stable:
+            return None
+        return self.check(key, series)
+
+    def check(self, key, series):
+        amount, usd, inbound, outbound = series.since(series.times[-1] - self.window)
+        transfers = inbound + outbound
+        kind = None
+        if transfers >= self.min_transfers:
+            if usd >= self.min_usd and inbound >= self.dominance * transfers:
+                kind = 'accumulation'
+            elif usd <= -self.min_usd and outbound >= self.dominance * transfers:
+                kind = 'distribution'
+        if kind is None:
+            if series.state is not None and abs(usd) < self.min_usd / 2:
+                series.state = None
+            return None
+        if kind == series.state:
+            return None
+        series.state = kind
+        chain, address, asset = key
+        signal = Signal(kind, self.names[chain, address], address, chain, asset, usd, amount, transfers,
+                        series.position, series.times[-1])
+        self.recent.append(signal)
+        self.signals[kind] += 1
+        return signal
+
+    def add_rows(self, rows):
+        """Book stream rows (newest first); returns the signals raised, oldest first"""
+        signals = []
+        for name, address, tx in reversed(rows):
+            signal = self.add(name, address, tx)
+            if signal is not None:
+                signals.append(signal)
+        return signals
+
+    async def run(self, reader, on_signal=None):
+        """Consume a chains.StreamReader forever; awaits on_signal(signal) for each signal"""
+        while True:
+            for signal in self.add_rows(await reader.poll()):
+                logger.info(f"Signal: {signal.wallet} {signal.kind} of {signal.asset} (${signal.net_usd:,.0f})")
+                if on_signal is not None:
+                    await on_signal(signal)
+
+    def snapshot(self, now=None, limit=8):
+        """Largest net USD flows over the window up to `now`, non-stable assets only.
+
+        Each entry: {'wallet', 'chain', 'asset', 'net_usd', 'net_amount',
+        'inbound', 'outbound', 'position', 'state'}.
+        """
+        now = time.time() if now is None else now
+        entries = []
+        for (chain, address, asset), series in self.series.items():
+            if asset in self.stable:
+                continue
+            amount, usd, inbound, outbound = series.since(now - self.window)
+            if not inbound + outbound:
+                continue
+            entries.append({'wallet': self.names[chain, address], 'chain': chain, 'asset': asset, 'net_usd': usd,
+                            'net_amount': amount, 'inbound': inbound, 'outbound': outbound,
+                            'position': series.position, 'state': series.state})
+        entries.sort(key=lambda e: abs(e['net_usd']), reverse=True)
+        return entries[:limit]
+
+    def stats(self):
+        return {
+            'series': len(self.series),
+            'points': sum(len(series) for series in self.series.values()),
+            'bytes': sum(series.nbytes() for series in self.series.values()),
+            'transfers': self.transfers,
+            'skipped': self.skipped,
+            'unpriced': self.unpriced,
+            'late': sum(series.late for series in self.series.values()),
+            'signals': dict(self.signals),
+        }
+
+
+def format_signal(signal, window=SIGNAL_WINDOW):
+    """Telegram Markdown message for one signal"""
+    emoji, verb = ('🟢', 'accumulating') if signal.kind == 'accumulation' else ('🔴', 'distributing')
+    return f"""{emoji} *Copy Trade Signal*
+
+*{signal.wallet}* is {verb} {signal.asset}
+Net {signal.net_amount:+,.2f} {signal.asset} (${signal.net_usd:+,.0f}) in {window / 3600:g}h
+Over {signal.transfers} transfers
+Position since tracking: {signal.position:+,.2f} {signal.asset}
+
+_Not financial advice._"""
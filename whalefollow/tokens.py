@@ -0,0 +1,228 @@
+"""
+WhaleFollow Pro - tokens and USD valuation
+- Tracked token set from data/tokens.csv (TOKENS_FILE): native coins + ERC-20s
+- ERC-20 transfers via Etherscan tokentx, streamed like txlist
+- Token metadata (symbol, decimals) resolved once per contract and cached
+- PriceFeed: cached USD prices, refreshed on their own schedule
+- Batch valuation: one multiply per transfer against a per-token scale table
+"""
+
+import os
+import csv
+import time
+import asyncio
+import logging
+from operator import mul
+
+from whalefollow.etherscan import fetch_account
+from whalefollow.metrics import upstream_call
+from whalefollow.registry import DEFAULT_WALLETS_FILE
+from whalefollow.txstream import Tx
+
+logger = logging.getLogger(__name__)
+
+TOKENS_FILE = os.environ.get('TOKENS_FILE', os.path.join(os.path.dirname(DEFAULT_WALLETS_FILE), 'tokens.csv'))
+PRICE_URL = os.environ.get('PRICE_URL', 'https://api.coingecko.com/api/v3/simple/price')
+PRICE_INTERVAL = float(os.environ.get('PRICE_INTERVAL', 120))
+
+NAN = float('nan')
+
+
+class Token:
+    """One tracked asset; `index` is its slot in the valuation tables"""
+
+    __slots__ = ('index', 'chain', 'contract', 'symbol', 'decimals', 'price_id', 'stable')
+
+    def __init__(self, index, chain, contract, symbol, decimals, price_id, stable):
+        self.index = index
+        self.chain = chain
+        self.contract = contract
+        self.symbol = symbol
+        self.decimals = decimals
+        self.price_id = price_id
+        self.stable = stable
+
+    def __repr__(self):
+        return f"Token({self.symbol or self.contract}, {self.chain}, decimals={self.decimals})"
+
+
+class TokenTransfer(Tx):
+    """ERC-20 transfer; value is in the token's base units"""
+
+    __slots__ = ('token',)
+
+    def __init__(self, hash, sender, to, value, block, timestamp, token):
+        super().__init__(hash, sender, to, value, block, timestamp)
+        self.token = token
+
+    @property
+    def symbol(self):
+        return self.token.symbol
+
+    @property
+    def decimals(self):
+        return self.token.decimals
+
+
+class TokenSet:
+    """Tracked tokens: native coins (empty contract) and contracts by lowercase address.
+
+    Rows may leave symbol/decimals blank; they are filled from the first
+    tokentx row seen for that contract and kept from then on.
+    """
+
+    def __init__(self, rows=()):
+        self.tokens = []
+        self.version = 0  # bumped whenever a token's metadata changes
+        self.resolved = 0
+        self._contracts = {}  # lowercase contract -> Token
+        self._native = {}  # chain -> Token
+        for row in rows:
+            self.add(*row)
+
+    @classmethod
+    def load(cls, path=TOKENS_FILE):
+        with open(path, newline='', encoding='utf-8') as f:
+            return cls((row['chain'], row['contract'], row['symbol'], row['decimals'], row['price_id'],
+                        row.get('stable') == '1') for row in csv.DictReader(f))
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    def add(self, chain, contract, symbol, decimals, price_id, stable=False):
+        token = Token(len(self.tokens), chain, (contract or '').lower(), symbol or None,
+                      int(decimals) if decimals not in (None, '') else None, price_id or None, stable)
+        self.tokens.append(token)
+        if token.contract:
+            self._contracts[token.contract] = token
+        else:
+            self._native[chain] = token
+        self.version += 1
+        return token
+
+    def native(self, chain):
+        return self._native.get(chain)
+
+    def get(self, contract):
+        return self._contracts.get(contract.lower())
+
+    def contracts(self, chain='ethereum'):
+        return [token for token in self.tokens if token.contract and token.chain == chain]
+
+    def record(self, row):
+        """tokentx row -> TokenTransfer, or None for tokens outside the set"""
+        token = self._contracts.get(row['contractAddress'].lower())
+        if token is None:
+            return None
+        if token.decimals is None or token.symbol is None:
+            self._resolve(token, row)
+            if token.decimals is None:
+                return None
+        return TokenTransfer(row['hash'], row['from'], row.get('to') or '', int(row.get('value') or 0),
+                             int(row.get('blockNumber') or 0), int(row.get('timeStamp') or 0), token)
+
+    def _resolve(self, token, row):
+        if token.decimals is None and row.get('tokenDecimal'):
+            token.decimals = int(row['tokenDecimal'])
+        if token.symbol is None:
+            token.symbol = row.get('tokenSymbol') or token.contract[:10]
+        self.version += 1
+        self.resolved += 1
+        logger.info(f"Resolved token {token.contract[:10]}...: {token.symbol}, {token.decimals} decimals")
+
+
+async def fetch_tokentx(client, address, api_key, *, tokens, **kwargs):
+    """Newest ERC-20 transfers of one address for tokens in `tokens`; same keywords as fetch_txlist"""
+    return await fetch_account(client, 'tokentx', address, api_key, record=tokens.record, **kwargs)
+
+
+# =============================================================================
+# PRICES
+# =============================================================================
+class PriceFeed:
+    """USD prices for a TokenSet, refreshed every `interval` seconds by run().
+
+    value(txs) prices a whole batch: each token's price / 10**decimals is
+    computed once per refresh, so a transfer costs one table lookup and one
+    multiply. Stablecoins fall back to $1 until the first refresh.
+    """
+
+    def __init__(self, tokens, *, url=PRICE_URL, interval=PRICE_INTERVAL):
+        self.tokens = tokens
+        self.url = url
+        self.interval = interval
+        self.prices = {}  # price_id -> USD
+        self.updated = None
+        self.refreshes = 0
+        self.errors = 0
+        self._scales = []
+        self._native = {}
+        self._version = None
+
+    def _rebuild(self):
+        scales = []
+        for token in self.tokens:
+            price = self.prices.get(token.price_id)
+            if price is None and token.stable:
+                price = 1.0
+            scales.append(price / 10 ** token.decimals if price is not None and token.decimals is not None else NAN)
+        scales.append(NAN)  # index -1: assets outside the set
+        self._scales = scales
+        self._native = {token.chain: token.index for token in self.tokens if not token.contract}
+        self._version = self.tokens.version
+
+    def price(self, symbol):
+        """USD price of a tracked symbol, or None"""
+        for token in self.tokens:
+            if token.symbol == symbol:
+                price = self.prices.get(token.price_id)
+                return 1.0 if price is None and token.stable else price
+        return None
+
+    def value(self, txs):
+        """Set tx.usd on every record of the batch (None when unpriced)"""
+        if self._version != self.tokens.version:
+            self._rebuild()
+        native = self._native
+        index = [tx.token.index if tx.token is not None else native.get(tx.chain, -1) for tx in txs]
+        usd = map(mul, [tx.value for tx in txs], map(self._scales.__getitem__, index))
+        for tx, value in zip(txs, usd):
+            tx.usd = value if value == value else None  # NaN: no price or decimals yet
+        return txs
+
+    async def refresh(self, client):
+        ids = sorted({token.price_id for token in self.tokens if token.price_id})
+        with upstream_call('prices', 'simple_price'):
+            response = await client.get(self.url, params={'ids': ','.join(ids), 'vs_currencies': 'usd'})
+            response.raise_for_status()
+        for price_id, quote in response.json().items():
+            if quote.get('usd') is not None:
+                self.prices[price_id] = float(quote['usd'])
+        self.updated = time.time()
+        self.refreshes += 1
+        self._rebuild()
+
+    async def run(self):
+        """Refresh forever on its own client; failures keep the last prices"""
+        import httpx
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            while True:
+                try:
+                    await self.refresh(client)
+                except Exception as e:
+                    self.errors += 1
+                    logger.warning(f"Price refresh failed: {e}")
+                await asyncio.sleep(self.interval)
+
+    def stats(self):
+        return {
+            'tokens': len(self.tokens),
+            'prices': len(self.prices),
+            'resolved': self.tokens.resolved,
+            'refreshes': self.refreshes,
+            'errors': self.errors,
+            'age': round(time.time() - self.updated, 1) if self.updated else None,
+        }
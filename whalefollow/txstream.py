@@ -0,0 +1,177 @@
+"""
+WhaleFollow Pro - streaming txlist parser
+- Parses an Etherscan txlist body chunk by chunk, one transaction at a time
+- Keeps only the fields we use, in a slotted Tx record
+- Optional filter and early stop: skipped rows never become records
+"""
+
+import re
+import json
+import codecs
+
+from whalefollow.registry import same_address
+
+_RESULT = re.compile(r'"result"\s*:\s*')
+_SKIP = re.compile(r'[\s,]*')
+_decode = json.JSONDecoder().raw_decode
+
+
+class Tx:
+    """One transfer: hash, from, to, value (wei), block, timestamp.
+
+    Reads like the Etherscan dict it came from (tx['from'], tx.get('to')),
+    so callers written against raw rows keep working. Other chains subclass
+    it with their own chain/symbol/decimals (see chains.SolTransfer).
+    """
+
+    __slots__ = ('hash', 'sender', 'to', 'value', 'block', 'timestamp', 'usd')
+
+    chain = 'ethereum'
+    symbol = 'ETH'
+    decimals = 18
+    token = None  # tokens.Token for token transfers, None for the chain's native coin
+    explorer = 'https://etherscan.io/tx/'
+    explorer_name = 'Etherscan'
+
+    _KEYS = {'hash': 'hash', 'from': 'sender', 'to': 'to', 'value': 'value',
+             'blockNumber': 'block', 'timeStamp': 'timestamp'}
+
+    def __init__(self, hash, sender, to, value, block, timestamp):
+        self.hash = hash
+        self.sender = sender
+        self.to = to
+        self.value = value
+        self.block = block
+        self.timestamp = timestamp
+        self.usd = None  # set by tokens.PriceFeed.value()
+
+    @classmethod
+    def from_row(cls, row):
+        """Etherscan txlist dict -> Tx"""
+        return cls(row['hash'], row['from'], row.get('to') or '', int(row.get('value') or 0),
+                   int(row.get('blockNumber') or 0), int(row.get('timeStamp') or 0))
+
+    def __getitem__(self, key):
+        return getattr(self, self._KEYS[key])
+
+    def get(self, key, default=None):
+        attr = self._KEYS.get(key)
+        return getattr(self, attr) if attr else default
+
+    @property
+    def amount(self):
+        """value in whole coins"""
+        return self.value / 10 ** self.decimals
+
+    @property
+    def url(self):
+        return self.explorer + self.hash
+
+    def is_from(self, address):
+        return same_address(self.sender, address)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.hash[:10]}... block {self.block}, {self.amount:,.2f} {self.symbol})"
+
+
+class TxlistParser:
+    """Incremental parser for {"status": .., "message": .., "result": [{tx}, ..]}.
+
+    feed(bytes) returns the records completed by that chunk; close()
+    returns the envelope (status, message, and result when it isn't a list,
+    e.g. an error string). Only the unparsed tail of the body is buffered.
+    """
+
+    def __init__(self, keep=None, record=None):
+        self.keep = keep  # Tx -> bool, rows it rejects are dropped
+        self.record = record or Tx.from_row  # row dict -> record, or None to skip the row
+        self.scanned = 0
+        self.kept = 0
+        self.done = False  # closing ']' of the result array seen
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ''
+        self._head = None  # body up to the result array, once found
+        self._scalar = False  # result is not an array
+
+    def feed(self, data):
+        self._buf += self._text.decode(data)
+        if self._head is None:
+            if self._scalar or not self._find_result():
+                return []
+        if self.done:
+            return []
+        return self._items()
+
+    def close(self):
+        self._buf += self._text.decode(b'', final=True)
+        if self._head is None:
+            return json.loads(self._buf) if self._buf.strip() else {}
+        if not self.done:
+            raise ValueError("Truncated txlist response")
+        envelope = json.loads(self._head + '[]' + self._buf)
+        envelope.pop('result', None)
+        return envelope
+
+    def _find_result(self):
+        match = _RESULT.search(self._buf)
+        if match is None or match.end() >= len(self._buf):
+            return False
+        if self._buf[match.end()] != '[':
+            self._scalar = True  # e.g. "result": "Max rate limit reached"; parsed whole in close()
+            return False
+        self._head = self._buf[:match.end()]
+        self._buf = self._buf[match.end() + 1:]
+        return True
+
+    def _items(self):
+        buf = self._buf
+        pos = _SKIP.match(buf).end()
+        rows = []
+        # Rows are flat objects: everything up to the last '}' is usually whole
+        # rows, decoded in one call; fall back to row by row if it isn't
+        end = buf.rfind('}')
+        before = buf[:end].rstrip()
+        if before.endswith(']'):  # that '}' closes the envelope; stop at the last row
+            end = buf.rfind('}', 0, len(before))
+        end += 1
+        if end > pos:
+            try:
+                rows = json.loads('[' + buf[pos:end] + ']')
+                pos = end
+            except json.JSONDecodeError:
+                rows = []
+        while True:
+            pos = _SKIP.match(buf, pos).end()
+            if pos >= len(buf):
+                break
+            if buf[pos] == ']':
+                self.done = True
+                pos += 1
+                break
+            try:
+                row, pos = _decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # row continues in the next chunk
+            rows.append(row)
+        self._buf = buf[pos:]
+
+        self.scanned += len(rows)
+        record = self.record
+        found = [tx for tx in map(record, rows) if tx is not None]
+        if self.keep is not None:
+            found = [tx for tx in found if self.keep(tx)]
+        self.kept += len(found)
+        return found
+
+
+def iter_txlist(chunks, keep=None, limit=None):
+    """Yield Tx records from an iterable of body chunks, stopping after `limit` kept rows"""
+    parser = TxlistParser(keep)
+    count = 0
+    for chunk in chunks:
+        for tx in parser.feed(chunk):
+            yield tx
+            count += 1
+            if limit and count >= limit:
+                return
+    parser.close()
@@ -0,0 +1,154 @@
+"""
+WhaleFollow Pro - per-user watchlists
+- /watch <address>: any chat can follow its own addresses, up to WATCH_LIMIT
+- Every watchlist merges into one deduplicated polling set per chain: an
+  address is fetched once however many chats watch it
+- Inverted index (chain, address) -> chats: each transfer goes to the
+  watchers of its sender and recipient only, found with two dict lookups
+- Watchlists persist in the settings store (settings.SettingsStore.watches)
+"""
+
+import os
+import re
+import logging
+
+from whalefollow.registry import address_key
+
+logger = logging.getLogger(__name__)
+
+WATCH_LIMIT = int(os.environ.get('WATCH_LIMIT', 10))  # addresses per chat
+WATCH_MIN_USD = float(os.environ.get('WATCH_MIN_USD', 0))  # smaller watched transfers are not sent
+
+SOLANA_ADDRESS = re.compile(r'[1-9A-HJ-NP-Za-km-z]{32,44}')  # base58
+
+
+def parse_address(text):
+    """(chain, address) of an Ethereum (lowercased) or Solana address, or None"""
+    text = (text or '').strip()
+    if text[:2] in ('0x', '0X'):
+        key = address_key(text)
+        return ('ethereum', '0x' + key.hex()) if key is not None else None
+    if SOLANA_ADDRESS.fullmatch(text):
+        return 'solana', text
+    return None
+
+
+def short_address(address):
+    return f"{address[:6]}...{address[-4:]}"
+
+
+def add_watch(store, chat_id, text, limit=WATCH_LIMIT):
+    """Validate and store one /watch; returns (status, chain, address).
+
+    status: 'added', 'exists', 'limit' (watchlist full) or 'invalid'.
+    """
+    parsed = parse_address(text)
+    if parsed is None:
+        return 'invalid', None, None
+    chain, address = parsed
+    watched = store.watches(chat_id)
+    if any(w[1:] == parsed for w in watched):
+        return 'exists', chain, address
+    if len(watched) >= limit:
+        return 'limit', chain, address
+    store.watch(chat_id, chain, address)
+    return 'added', chain, address
+
+
+class WatchIndex:
+    """Watchlists of every chat: chat -> {(chain, address)} and the inverse.
+
+    `version` changes whenever the polling set (the unique addresses) does;
+    a chat adding an address someone already watches leaves it alone.
+    """
+
+    def __init__(self, rows=()):
+        self._watchers = {}  # (chain, address) -> {chat_id}
+        self._lists = {}  # chat_id -> {(chain, address)}
+        self.version = 0
+        self.routed = 0
+        self.sent = 0
+        self.load(rows)
+
+    def __len__(self):
+        return len(self._watchers)
+
+    def load(self, rows):
+        """Replace the contents with (chat_id, chain, address) rows"""
+        before = set(self._watchers)
+        self._watchers, self._lists = {}, {}
+        for chat_id, chain, address in rows:
+            self._watchers.setdefault((chain, address), set()).add(chat_id)
+            self._lists.setdefault(chat_id, set()).add((chain, address))
+        if set(self._watchers) != before:
+            self.version += 1
+
+    def add(self, chat_id, chain, address):
+        """Returns True if the address is new to the polling set"""
+        key = (chain, address)
+        self._lists.setdefault(chat_id, set()).add(key)
+        chats = self._watchers.get(key)
+        if chats is None:
+            self._watchers[key] = {chat_id}
+            self.version += 1
+            return True
+        chats.add(chat_id)
+        return False
+
+    def remove(self, chat_id, chain=None, address=None):
+        """Drop one address (chain None: on any chain) or the whole watchlist; returns how many"""
+        watched = self._lists.get(chat_id, set())
+        dropped = {key for key in watched if address is None or (key[1] == address and chain in (None, key[0]))}
+        for key in dropped:
+            chats = self._watchers[key]
+            chats.discard(chat_id)
+            if not chats:
+                del self._watchers[key]
+                self.version += 1
+        watched -= dropped
+        if not watched:
+            self._lists.pop(chat_id, None)
+        return len(dropped)
+
+    def addresses(self, chain):
+        """The polling set of one chain"""
+        return [address for c, address in self._watchers if c == chain]
+
+    def watchers_of(self, tx):
+        """Chats watching either side of a transfer"""
+        sender, to = (tx.sender.lower(), tx.to.lower()) if tx.chain == 'ethereum' else (tx.sender, tx.to)
+        chats = self._watchers.get((tx.chain, sender), ())
+        other = self._watchers.get((tx.chain, to), ()) if to else ()
+        return chats | other if chats and other else chats or other
+
+    def route(self, rows, min_usd=WATCH_MIN_USD):
+        """(chat_ids, row) for (name, address, tx) stream rows (newest first) with watchers, oldest first.
+
+        A transfer between a tracked and a watched wallet arrives once, as the
+        tracked wallet's row: matching both sides still finds its watchers.
+        """
+        routed = []
+        for row in reversed(rows):
+            tx = row[2]
+            chats = self.watchers_of(tx)
+            if not chats or (min_usd and (tx.usd or 0.0) < min_usd):
+                continue
+            routed.append((sorted(chats), row))
+            self.sent += len(chats)
+        self.routed += len(routed)
+        return routed
+
+    async def run(self, reader, on_match):
+        """Consume a chains.StreamReader forever; awaits on_match(chat_ids, row) per watched transfer"""
+        while True:
+            for chats, row in self.route(await reader.poll()):
+                await on_match(chats, row)
+
+    def stats(self):
+        return {
+            'chats': len(self._lists),
+            'addresses': len(self._watchers),
+            'watches': sum(len(chats) for chats in self._watchers.values()),
+            'routed': self.routed,
+            'sent': self.sent,
+        }
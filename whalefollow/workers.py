@@ -0,0 +1,176 @@
+"""
+WhaleFollow Pro - webhook worker processes
+- The webhook front shards updates by chat_id over N worker processes: a
+  chat always lands on the same worker, so its updates stay in order and
+  its settings are only ever written by one process
+- One socketpair per worker, one JSON object per line, both directions
+- ChatOrderedProcessor: PTB update processor that runs different chats
+  concurrently and one chat's updates one after another
+"""
+
+import os
+import json
+import socket
+import asyncio
+import logging
+import multiprocessing
+
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_WORKERS = int(os.environ.get('WEBHOOK_WORKERS', 0))  # 0: handle updates in the front process
+
+# Update fields that carry a chat (or, for the rest, a user) to shard on
+_CHAT_FIELDS = ('message', 'edited_message', 'channel_post', 'edited_channel_post', 'callback_query',
+                'my_chat_member', 'chat_member', 'chat_join_request', 'message_reaction',
+                'message_reaction_count', 'chat_boost', 'removed_chat_boost')
+
+
+def update_chat_id(update):
+    """Chat id of a raw update dict; the sender for chat-less updates, else the update id"""
+    for field in _CHAT_FIELDS:
+        item = update.get(field)
+        if item:
+            chat = item.get('chat') or (item.get('message') or {}).get('chat')
+            if chat:
+                return chat['id']
+            if item.get('from'):
+                return item['from']['id']
+    for item in update.values():
+        if isinstance(item, dict) and item.get('from'):
+            return item['from']['id']
+    return update.get('update_id', 0)
+
+
+class ChatOrderedProcessor(BaseUpdateProcessor):
+    """Up to `max_concurrent_updates` at once, but never two of the same chat.
+
+    PTB starts update tasks in arrival order and asyncio locks are FIFO, so
+    a chat's updates are handled in the order they arrived. An update only
+    takes one of the `limit` slots once its chat's turn has come: PTB's own
+    semaphore (held around do_process_update) is left unbounded, so one
+    busy chat queues behind itself without starving the others.
+    """
+
+    __slots__ = ('_chats', 'limit', '_slots')
+
+    def __init__(self, max_concurrent_updates):
+        super().__init__(2**31)  # PTB's semaphore: never waited on
+        self.limit = max_concurrent_updates
+        self._slots = asyncio.Semaphore(max_concurrent_updates)
+        self._chats = {}  # chat_id -> [lock, updates holding or waiting for it]
+
+    async def do_process_update(self, update, coroutine):
+        chat = getattr(update, 'effective_chat', None)
+        if chat is None:
+            async with self._slots:
+                await coroutine
+            return
+        entry = self._chats.get(chat.id)
+        if entry is None:
+            entry = self._chats[chat.id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0], self._slots:
+                await coroutine
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chats[chat.id]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+
+async def open_link(sock):
+    """asyncio streams over one end of a worker socketpair"""
+    return await asyncio.open_connection(sock=sock, limit=2**24)
+
+
+def write_frame(writer, message):
+    writer.write(json.dumps(message, separators=(',', ':')).encode() + b'\n')
+
+
+async def read_frames(reader, on_message):
+    """Call `on_message(dict)` for every frame until the other end closes"""
+    while line := await reader.readline():
+        await on_message(json.loads(line))
+
+
+def chat_shard(chat_id, count):
+    """The worker (of `count`) that owns a chat: handles its updates and writes its settings"""
+    return hash(chat_id) % count
+
+
+class WorkerPool:
+    """`count` processes running target(index, count, sock), fed updates by chat shard.
+
+    `target` must be importable by a fresh interpreter (spawn start method:
+    no forked copy of the running event loop). `on_message(dict)` receives
+    the frames workers send back.
+    """
+
+    def __init__(self, count, target, on_message=None):
+        self.count = count
+        self.target = target
+        self.on_message = on_message
+        self.processes = []
+        self.writers = []
+        self.dispatched = [0] * count
+        self._readers = []
+
+    async def start(self):
+        context = multiprocessing.get_context('spawn')
+        for index in range(self.count):
+            front, back = socket.socketpair()
+            process = context.Process(target=self.target, args=(index, self.count, back), daemon=True,
+                                      name=f'webhook-worker-{index}')
+            process.start()
+            back.close()
+            reader, writer = await open_link(front)
+            self.processes.append(process)
+            self.writers.append(writer)
+            if self.on_message is not None:
+                self._readers.append(asyncio.create_task(read_frames(reader, self.on_message)))
+        logger.info(f"Started {self.count} webhook workers")
+
+    def shard(self, chat_id):
+        return chat_shard(chat_id, self.count)
+
+    async def dispatch(self, update):
+        """Queue a raw update on its chat's worker; waits only while that worker's pipe is full"""
+        index = self.shard(update_chat_id(update))
+        writer = self.writers[index]
+        write_frame(writer, {'update': update})
+        self.dispatched[index] += 1
+        await writer.drain()
+
+    def send(self, index, message):
+        write_frame(self.writers[index], message)
+
+    def broadcast(self, message):
+        for writer in self.writers:
+            write_frame(writer, message)
+
+    async def stop(self, timeout=10.0):
+        """Close the pipes (workers finish what they have and exit), then reap them"""
+        for writer in self.writers:
+            writer.close()
+        loop = asyncio.get_running_loop()
+        for process in self.processes:
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                process.terminate()
+        for task in self._readers:
+            task.cancel()
+        await asyncio.gather(*self._readers, return_exceptions=True)
+        self.processes, self.writers, self._readers = [], [], []
+
+    def stats(self):
+        return [{'alive': process.is_alive(), 'dispatched': dispatched,
+                 'buffered': writer.transport.get_write_buffer_size()}
+                for process, writer, dispatched in zip(self.processes, self.writers, self.dispatched)]